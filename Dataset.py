@@ -1,8 +1,11 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import uuid
 
+from dados import ocorrencias_compartilhadas
+from filtros import PERIODOS, ultimos_dias
+import consultas
+
 # Configuração da página 
 st.set_page_config(
     page_title="Delegacia Inteligente - Home",
@@ -10,40 +13,38 @@ st.set_page_config(
     layout="wide"
 )
 
-# Função para carregar os dados
-@st.cache_data
+# Função para carregar os dados: o frame é compartilhado entre sessões e páginas
+# (armazenamento colunar + ocorrências novas incorporadas por delta)
 def carregar_dados():
-    # Adicionando um fallback simples caso o arquivo não esteja na raiz
     try:
-        df = pd.read_csv("dataset_ocorrencias_delegacia_5.csv")
+        ocorrencias = ocorrencias_compartilhadas()
+        ocorrencias.atualizar()
+        return ocorrencias
     except FileNotFoundError:
-        try:
-            df = pd.read_csv("../dataset_ocorrencias_delegacia_5.csv")
-        except FileNotFoundError:
-            st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
-            st.stop()
-    return df
+        st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
+        st.stop()
 
-# Inicializa o DataFrame e converte a coluna de data
-df = carregar_dados()
-df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'], errors='coerce')
+# Inicializa o frame compartilhado; as análises da página saem do módulo `consultas`
+ocorrencias = carregar_dados()
+# Métricas e opções dos selects vêm das estatísticas gravadas na conversão
+# (somadas aos deltas), sem percorrer as linhas a cada rerun
+estatisticas = ocorrencias.estatisticas
 
 
 # Métricas principais
 st.header("Resumo Geral dos Dados")
 col1, col2, col3, col4 = st.columns(4)
+resumo_geral = consultas.resumo_geral(ocorrencias)
+periodo_total = estatisticas.periodo()
 
 with col1:
-    st.metric("Total de Registros", f"{len(df):,}".replace(",", "."))
+    st.metric("Total de Registros", f"{resumo_geral['linhas']:,}".replace(",", "."))
 with col2:
-    data_min = df['data_ocorrencia'].min()
-    data_max = df['data_ocorrencia'].max()
-    periodo_dias = (data_max - data_min).days if not (pd.isnull(data_min) or pd.isnull(data_max)) else 0
-    st.metric("Período Coberto (Dias)", periodo_dias)
+    st.metric("Período Coberto (Dias)", resumo_geral['dias'])
 with col3:
-    st.metric("Total de Bairros Únicos", df['bairro'].nunique())
+    st.metric("Total de Bairros Únicos", resumo_geral['bairros'])
 with col4:
-    st.metric("Total de Tipos de Crime", df['tipo_crime'].nunique())
+    st.metric("Total de Tipos de Crime", resumo_geral['tipos_crime'])
 
 st.divider()
 
@@ -56,114 +57,105 @@ st.markdown(
 )
 
 # Opções de filtro
-bairros = sorted(df['bairro'].dropna().unique().tolist())
+bairros = estatisticas.valores('bairro')
 bairro_selecionado = st.selectbox("1. Escolha o Bairro", bairros)
 
-# Filtro 1: Apenas o Bairro
-df_bairro = df[df['bairro'] == bairro_selecionado].copy()
-
-# Filtro de data
-todas_datas = st.checkbox("Considerar todas as datas", value=True, key='todas_datas_home')
-data_selecionada = None
-
-if not todas_datas:
-    # Garante que as datas sejam manipuladas corretamente
-    data_min_val = df_bairro['data_ocorrencia'].min().date() if not df_bairro['data_ocorrencia'].min() is pd.NaT else datetime.now().date()
-    data_max_val = df_bairro['data_ocorrencia'].max().date() if not df_bairro['data_ocorrencia'].max() is pd.NaT else datetime.now().date()
-    
-    data_selecionada = st.date_input(
-        "2. Selecione a Data da Ocorrência",
-        value=data_min_val,
-        min_value=data_min_val,
-        max_value=data_max_val
+# Filtro de período: os últimos dias contam a partir da ocorrência mais recente;
+# o intervalo personalizado fica limitado ao período do bairro escolhido
+data_max_val = periodo_total[1].date() if periodo_total else datetime.now().date()
+periodo_bairro = estatisticas.periodo_bairro(bairro_selecionado) or periodo_total
+data_min_bairro = periodo_bairro[0].date() if periodo_bairro else datetime.now().date()
+data_max_bairro = periodo_bairro[1].date() if periodo_bairro else datetime.now().date()
+
+periodo_sel = st.selectbox("2. Período", list(PERIODOS), key='periodo_home')
+datas_bairro = None
+
+if periodo_sel == "Intervalo personalizado":
+    intervalo = st.date_input(
+        "Selecione o intervalo de datas",
+        value=(data_min_bairro, data_max_bairro),
+        min_value=data_min_bairro,
+        max_value=data_max_bairro
     )
-    
-    # Aplica filtro de data no DataFrame
-    df_bairro = df_bairro[df_bairro['data_ocorrencia'].dt.date == data_selecionada]
+    # Enquanto só a primeira data foi escolhida, o intervalo é esse único dia
+    datas_bairro = (intervalo[0], intervalo[-1]) if intervalo else None
+elif PERIODOS[periodo_sel] is not None:
+    datas_bairro = ultimos_dias(PERIODOS[periodo_sel], data_max_val)
+
+if datas_bairro is None:
+    descricao_periodo = ""
+elif datas_bairro[0] == datas_bairro[1]:
+    descricao_periodo = f" em {datas_bairro[0]}"
+else:
+    descricao_periodo = f" de {datas_bairro[0]} a {datas_bairro[1]}"
 
-if not df_bairro.empty:
+# Os informes saem de `consultas.resumo_bairro` (cubo de contagens; as linhas só
+# são lidas para a amostra de detalhes), a mesma consulta servida pela api.py
+resumo = consultas.resumo_bairro(ocorrencias, bairro_selecionado, datas_bairro)
+
+if resumo['total'] > 0:
     # Cartões de Resumo do Bairro/Data
     col1, col2, col3 = st.columns(3)
 
-    crime_mais_frequente = df_bairro['tipo_crime'].mode().iloc[0] if not df_bairro['tipo_crime'].mode().empty else 'N/A'
-    col1.info(f"**Crime Mais Frequente**: {crime_mais_frequente}")
+    col1.info(f"**Crime Mais Frequente**: {resumo['crime_mais_frequente'] or 'N/A'}")
 
     # Garante que o cálculo da hora seja feito em dados válidos
-    horario_mais_frequente = df_bairro['data_ocorrencia'].dt.hour.mode().iloc[0] if not df_bairro['data_ocorrencia'].dt.hour.mode().empty else 'N/A'
-    col2.info(f"**Horário Mais Frequente**: {horario_mais_frequente}:00")
+    horario_mais_frequente = resumo['horario_mais_frequente']
+    col2.info(f"**Horário Mais Frequente**: {'N/A' if horario_mais_frequente is None else horario_mais_frequente}:00")
 
-    total_registros_filtrados = len(df_bairro)
-    col3.success(f"**Total de Ocorrências**: {total_registros_filtrados}")
+    col3.success(f"**Total de Ocorrências**: {resumo['total']}")
 
     # Filtro 3: Crime Específico
-    top_crimes = df_bairro['tipo_crime'].value_counts().head(5).index.tolist()
+    top_crimes = resumo['top_crimes'].index.tolist()
     crime_selecionado = st.selectbox(
         "3. Filtrar por Crime (opcional)",
         ["Todos"] + top_crimes
     )
 
     if crime_selecionado != "Todos":
-        df_crime = df_bairro[df_bairro['tipo_crime'] == crime_selecionado].copy()
-        titulo_detalhes = f"### Detalhes para {bairro_selecionado} - {crime_selecionado}" + (f" em {data_selecionada}" if not todas_datas else "")
+        resumo_crime = consultas.resumo_bairro(ocorrencias, bairro_selecionado, datas_bairro, tipo_crime=crime_selecionado)
+        titulo_detalhes = f"### Detalhes para {bairro_selecionado} - {crime_selecionado}" + descricao_periodo
         st.markdown(titulo_detalhes)
 
         # Resumo do Crime Específico
         col_c1, col_c2, col_c3 = st.columns(3)
-        
-        if 'arma_utilizada' in df_crime.columns:
-             arma_mais_comum = df_crime['arma_utilizada'].mode().iloc[0] if not df_crime['arma_utilizada'].mode().empty else 'N/A'
-             col_c1.info(f"**Arma Mais Comum**: {arma_mais_comum}")
-
-        if 'sexo_suspeito' in df_crime.columns:
-            sexo_mais_frequente = df_crime['sexo_suspeito'].mode().iloc[0] if not df_crime['sexo_suspeito'].mode().empty else 'N/A'
-            col_c2.info(f"**Sexo do Suspeito**: {sexo_mais_frequente}")
-
-        horario_medio = df_crime['data_ocorrencia'].dt.hour.mean()
-        col_c3.info(f"**Horário Médio do Crime**: {horario_medio:.2f}h")
+        col_c1.info(f"**Arma Mais Comum**: {resumo_crime['arma_mais_comum'] or 'N/A'}")
+        col_c2.info(f"**Sexo do Suspeito**: {resumo_crime['sexo_mais_frequente'] or 'N/A'}")
+        col_c3.info(f"**Horário Médio do Crime**: {resumo_crime['horario_medio']:.2f}h")
 
         # Mostrar tabela de ocorrências detalhadas
-        colunas_exibir = ['data_ocorrencia', 'bairro', 'tipo_crime']
-        if 'arma_utilizada' in df_crime.columns:
-            colunas_exibir.append('arma_utilizada')
-        if 'sexo_suspeito' in df_crime.columns:
-            colunas_exibir.append('sexo_suspeito')
-
         st.markdown("##### Ocorrências Detalhadas (Amostra):")
-        st.dataframe(df_crime[colunas_exibir].head(10), use_container_width=True)
+        st.dataframe(resumo_crime['amostra'], use_container_width=True)
         
     else:
         # Detalhes do Bairro/Data sem filtro de Crime
-        titulo_detalhes = f"### Resumo dos Principais Crimes em {bairro_selecionado}" + (f" em {data_selecionada}" if not todas_datas else "")
+        titulo_detalhes = f"### Resumo dos Principais Crimes em {bairro_selecionado}" + descricao_periodo
         st.markdown(titulo_detalhes)
         
         col_r1, col_r2 = st.columns(2)
         
         with col_r1:
             st.markdown("##### Top 5 Tipos de Crime:")
-            top_crimes_tabela = df_bairro['tipo_crime'].value_counts().head(5)
-            st.table(top_crimes_tabela)
+            st.table(resumo['top_crimes'])
 
         with col_r2:
             st.markdown("##### Horário Médio por Crime (Top 5):")
-            horario_medio_por_crime = df_bairro.groupby('tipo_crime')['data_ocorrencia'].apply(lambda x: x.dt.hour.mean()).reset_index()
-            horario_medio_por_crime.columns = ['Tipo de Crime', 'Horário Médio']
-            # Filtra apenas para os Top 5 Crimes para manter o foco
-            horario_medio_por_crime = horario_medio_por_crime[horario_medio_por_crime['Tipo de Crime'].isin(top_crimes)].set_index('Tipo de Crime')
+            horario_medio_por_crime = resumo['horario_medio_por_crime'].rename_axis('Tipo de Crime').to_frame('Horário Médio')
             st.table(horario_medio_por_crime.style.format({'Horário Médio': '{:.2f}h'}))
 
 else:
-    st.warning("Não há ocorrências registradas para esta combinação de bairro/data.")
+    st.warning("Não há ocorrências registradas para esta combinação de bairro/período.")
     
 # Cadastro de Ocorrências
 st.divider()
 st.header("Cadastro de Nova Ocorrência Criminal")
-st.markdown("Use o formulário abaixo para simular o registro de um novo Boletim de Ocorrência (BO).")
+st.markdown("Use o formulário abaixo para registrar um novo Boletim de Ocorrência (BO).")
 
-# Extrai listas únicas de colunas categóricas para popular os selects
-bairros_unicos = sorted(df['bairro'].dropna().unique().tolist())
-tipos_crime_unicos = sorted(df['tipo_crime'].dropna().unique().tolist())
-opcoes_arma = sorted(df['arma_utilizada'].dropna().unique().tolist()) if 'arma_utilizada' in df.columns else ['N/A', 'Faca', 'Revólver', 'Outro']
-opcoes_sexo = sorted(df['sexo_suspeito'].dropna().unique().tolist()) if 'sexo_suspeito' in df.columns else ['Não Informado', 'MASCULINO', 'FEMININO']
+# Listas de valores distintos das estatísticas para popular os selects
+bairros_unicos = bairros
+tipos_crime_unicos = estatisticas.valores('tipo_crime')
+opcoes_arma = estatisticas.valores('arma_utilizada') or ['N/A', 'Faca', 'Revólver', 'Outro']
+opcoes_sexo = estatisticas.valores('sexo_suspeito') or ['Não Informado', 'MASCULINO', 'FEMININO']
 
 with st.form("cadastro_ocorrencia"):
     st.subheader("Dados da Ocorrência")
@@ -192,7 +184,7 @@ with st.form("cadastro_ocorrencia"):
         # Combina data e hora
         data_hora_ocorrencia = datetime.combine(data_reg, hora_reg)
         
-        # Simula o registro
+        # Monta o registro
         novo_registro = {
             'id_ocorrencia': str(uuid.uuid4()),
             'data_ocorrencia': data_hora_ocorrencia.strftime('%Y-%m-%d %H:%M:%S'),
@@ -203,6 +195,12 @@ with st.form("cadastro_ocorrencia"):
             'observacoes': observacoes
         }
         
-        st.success(f"Ocorrência registrada com sucesso!")
-        st.json(novo_registro)
-        st.info("Para fins de demonstração, o registro foi apenas exibido e **não salvo permanentemente** no arquivo CSV.")
\ No newline at end of file
+        # Grava no repositório append-only (group commit); o frame compartilhado
+        # incorpora o novo BO por delta na próxima atualização, sem reler o CSV
+        try:
+            ocorrencias_compartilhadas().repositorio.inserir(novo_registro)
+        except Exception as erro:
+            st.error(f"Não foi possível registrar a ocorrência: {erro}")
+        else:
+            st.success(f"Ocorrência registrada com sucesso!")
+            st.json(novo_registro)
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""Detecção contínua de picos de ocorrências para a página de Anomalias.
+
+Para cada combinação bairro x tipo_crime x slot semanal (dia da semana x hora,
+168 slots) o motor mantém uma média e um segundo momento exponencialmente
+ponderados (EWMA) das contagens semanais, mais a contagem da semana corrente.
+Um alerta é uma contagem da semana corrente muito acima da média esperada para
+aquele slot (z-score).
+
+- Na construção, o histórico inteiro vira o estado numa passada vetorizada: as
+  contagens por (chave, semana) são somadas com o peso alfa * (1 - alfa)^idade
+  de cada semana, que é o resultado fechado da recursão da EWMA.
+- Cada ocorrência nova (delta do repositório) atualiza o estado em O(1); quando
+  a semana vira, as contagens da semana fechada entram nas médias. A
+  compactação do frame (que também acontece quando surge um bairro ou tipo de
+  crime novo) refaz o estado na passada vetorizada.
+
+As páginas consultam só esse estado, sem reler as ocorrências.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from dados import DIAS_SEMANA
+from previsao import N_SLOTS, slot_semanal
+
+ALFA = 0.1
+LIMIAR_Z = 3.0
+MINIMO_OCORRENCIAS = 2
+# Piso da variância: uma única ocorrência num slot sem histórico não vira z infinito
+VARIANCIA_MINIMA = 0.05
+UM_DIA_NS = 86_400 * 10**9
+UMA_HORA_NS = 3_600 * 10**9
+NAO_INFORMADO = "Não informado"
+
+
+def semana_e_slot(datas_ns):
+    """Semana (desde a segunda-feira de 1969-12-29) e slot semanal de datas em ns."""
+    dias = datas_ns // UM_DIA_NS
+    # 1970-01-01 foi uma quinta-feira (Segunda = 0)
+    semanas = (dias + 3) // 7
+    slots = slot_semanal((dias + 3) % 7, (datas_ns // UMA_HORA_NS) % 24)
+    return semanas, slots
+
+
+class MotorAnomalias:
+    def __init__(self, base, alfa=ALFA):
+        self.alfa = alfa
+        self.n_linhas = self.n_indexado = len(base)
+        self.categorias = {c: base[c].cat.categories for c in ("bairro", "tipo_crime")}
+        # Posição 0 de cada eixo categórico guarda os nulos
+        self.forma = (len(self.categorias["bairro"]) + 1, len(self.categorias["tipo_crime"]) + 1, N_SLOTS)
+        tamanho = int(np.prod(self.forma))
+        self.media = np.zeros(tamanho)
+        self.momento2 = np.zeros(tamanho)
+        self.atual = np.zeros(tamanho, dtype=np.int64)
+        self.semana = None
+
+        chaves, semanas = self._chaves(base)
+        if len(chaves) == 0:
+            return
+        self.semana = int(semanas.max())
+
+        na_atual = semanas == self.semana
+        self.atual = np.bincount(chaves[na_atual], minlength=tamanho)
+
+        # Semanas fechadas: uma célula por (chave, semana) com a sua contagem
+        chaves, semanas = chaves[~na_atual], semanas[~na_atual]
+        if len(chaves):
+            primeira = semanas.min()
+            celulas, contagem = np.unique((semanas - primeira) * tamanho + chaves, return_counts=True)
+            idade = self.semana - 1 - (celulas // tamanho + primeira)
+            peso = self.alfa * (1 - self.alfa) ** idade
+            self.media = np.bincount(celulas % tamanho, weights=peso * contagem, minlength=tamanho)
+            self.momento2 = np.bincount(celulas % tamanho, weights=peso * contagem**2, minlength=tamanho)
+
+    def _chaves(self, df):
+        # Índice plano (bairro, tipo_crime, slot) e semana das linhas com data
+        datas = df["data_ocorrencia"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        com_data = datas != np.iinfo(np.int64).min
+        semanas, slots = semana_e_slot(datas[com_data])
+        bairros = df["bairro"].cat.codes.to_numpy()[com_data].astype(np.int64) + 1
+        crimes = df["tipo_crime"].cat.codes.to_numpy()[com_data].astype(np.int64) + 1
+        return np.ravel_multi_index((bairros, crimes, slots), self.forma), semanas
+
+    def atualizado(self, recentes):
+        """Motor novo com as linhas do segmento de ocorrências novas ainda não vistas, uma a uma.
+
+        O estado é copiado (bairro x tipo_crime x 168 slots) antes das
+        atualizações O(1): este motor não muda.
+        """
+        novo = copy.copy(self)
+        novo.media, novo.momento2, novo.atual = self.media.copy(), self.momento2.copy(), self.atual.copy()
+        chaves, semanas = self._chaves(recentes.iloc[self.n_linhas - self.n_indexado:])
+        for chave, semana in zip(chaves.tolist(), semanas.tolist()):
+            novo.registrar(chave, semana)
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    def registrar(self, chave, semana):
+        """Atualização O(1) do estado com uma ocorrência (chave plana, semana)."""
+        if self.semana is None:
+            self.semana = semana
+        if semana > self.semana:
+            self._avancar(semana)
+        if semana == self.semana:
+            self.atual[chave] += 1
+        else:
+            # Ocorrência retroativa (semana já fechada): entra na média com o peso
+            # da sua semana; na variância é tratada como um evento isolado
+            peso = self.alfa * (1 - self.alfa) ** (self.semana - 1 - semana)
+            self.media[chave] += peso
+            self.momento2[chave] += peso
+
+    def _avancar(self, semana):
+        # Fecha a semana corrente e aplica o decaimento das semanas sem ocorrências
+        self.media = (1 - self.alfa) * self.media + self.alfa * self.atual
+        self.momento2 = (1 - self.alfa) * self.momento2 + self.alfa * self.atual.astype(np.float64) ** 2
+        vazias = semana - self.semana - 1
+        if vazias > 0:
+            self.media *= (1 - self.alfa) ** vazias
+            self.momento2 *= (1 - self.alfa) ** vazias
+        self.atual = np.zeros_like(self.atual)
+        self.semana = semana
+
+    # --- Consultas ---
+
+    def inicio_semana(self):
+        """Data (Timestamp) da segunda-feira da semana corrente, ou None sem ocorrências."""
+        if self.semana is None:
+            return None
+        return pd.Timestamp(np.datetime64(self.semana * 7 - 3, "D"))
+
+    def alertas(self, limiar_z=LIMIAR_Z, minimo=MINIMO_OCORRENCIAS, por_slot=True):
+        """Combinações com pico na semana corrente, da mais anômala para a menos.
+
+        Com `por_slot=False` as contagens e médias dos 168 slots são somadas e o
+        alerta é da semana inteira de cada bairro x tipo_crime.
+        """
+        media = self.media.reshape(self.forma)
+        variancia = np.maximum(self.momento2.reshape(self.forma) - media**2, 0)
+        atual = self.atual.reshape(self.forma)
+        if not por_slot:
+            media, variancia, atual = (a.sum(axis=2, keepdims=True) for a in (media, variancia, atual))
+
+        # Piso de Poisson (variância >= média) para slots de histórico raro
+        desvio = np.sqrt(np.maximum(np.maximum(variancia, media), VARIANCIA_MINIMA))
+        z = (atual - media) / desvio
+        bairros, crimes, slots = np.nonzero((atual >= minimo) & (z >= limiar_z))
+
+        alertas = pd.DataFrame({
+            "bairro": _rotulos(self.categorias["bairro"], bairros),
+            "tipo_crime": _rotulos(self.categorias["tipo_crime"], crimes),
+            "ocorrencias": atual[bairros, crimes, slots],
+            "media_esperada": media[bairros, crimes, slots],
+            "z": z[bairros, crimes, slots],
+        })
+        if por_slot:
+            alertas.insert(2, "dia_semana", np.asarray(DIAS_SEMANA)[slots // 24])
+            alertas.insert(3, "hora_dia", slots % 24)
+        return alertas.sort_values("z", ascending=False, ignore_index=True)
+
+    def resumo(self):
+        return {
+            "semana": self.inicio_semana(),
+            "ocorrencias_semana": int(self.atual.sum()),
+            "combinacoes_monitoradas": int(np.count_nonzero((self.media > 0) | (self.atual > 0))),
+        }
+
+
+def _rotulos(categorias, codigos):
+    # Código 0 é o nulo; os demais são deslocados de +1 (0 - 1 cai no último rótulo)
+    rotulos = np.asarray(categorias.astype(str).tolist() + [NAO_INFORMADO], dtype=object)
+    return rotulos[codigos - 1]
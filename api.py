@@ -0,0 +1,264 @@
+"""API HTTP/JSON local com as consultas do dashboard, sem sessão do Streamlit.
+
+Uso (processo separado do Streamlit; escuta só em 127.0.0.1 por padrão):
+    python api.py --porta 8502
+
+Rotas:
+
+- GET /saude: linhas do frame, período coberto e modelo carregado;
+- GET /consultas: consultas disponíveis e seus parâmetros;
+- POST /consultas: lote de consultas, respondidas na ordem do lote:
+
+    {"consultas": [
+        {"consulta": "contagens", "por": "bairro", "ultimos_dias": 30},
+        {"consulta": "tendencia", "filtros": {"tipo_crime": ["Furto"]}, "datas": ["2025-01-01", "2025-06-30"]},
+        {"consulta": "prever", "categoricas": {"bairro": ["Pina"]}, "dia_semana": "Sexta", "hora_dia": 22}
+    ]}
+
+  A resposta é {"resultados": [{"ok": true, "resultado": ...} ou {"ok": false,
+  "erro": "..."}, ...]}; o erro de uma consulta não derruba as outras.
+
+Cada consulta é uma função de `consultas.py` (as mesmas usadas pelas páginas),
+chamada com os demais campos como parâmetros. `datas` vem como [início, fim]
+(AAAA-MM-DD) e `ultimos_dias` como número de dias até a ocorrência mais
+recente. O frame compartilhado recebe as ocorrências novas uma vez por lote;
+os índices (filtros, cubo, séries) são reaproveitados entre lotes e os
+resultados ficam num cache por versão do frame e do modelo. Séries viram
+listas de [chave, valor] e DataFrames listas de registros.
+"""
+import argparse
+import inspect
+import json
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import consultas
+from dados import CAMINHO_CSV, ocorrencias_compartilhadas
+from registro_modelos import CAMINHO_MODELO, RegistroModelos
+from repositorio import CAMINHO_BANCO
+
+PORTA_PADRAO = 8502
+MAX_CONSULTAS_LOTE = 100
+MAX_CORPO = 1 << 20
+# Resultados mantidos no cache (os mais antigos saem primeiro)
+MAX_CACHE = 256
+
+# Consultas expostas: nome -> (função de `consultas`, precisa do modelo)
+CONSULTAS = {
+    "resumo_geral": (consultas.resumo_geral, False),
+    "resumo_bairro": (consultas.resumo_bairro, False),
+    "contagens": (consultas.contagens, False),
+    "media_hora": (consultas.media_hora, False),
+    "tendencia": (consultas.tendencia, False),
+    "mapa_calor": (consultas.mapa_calor, False),
+    "buscar": (consultas.buscar, False),
+    "prever": (consultas.prever, True),
+    "horizonte": (consultas.horizonte, True),
+    "superficie_risco": (consultas.superficie_risco, True),
+}
+
+
+class ServicoConsultas:
+    """Executa lotes de consultas sobre o frame compartilhado e o modelo publicado."""
+
+    def __init__(self, caminho_csv=CAMINHO_CSV, caminho_banco=CAMINHO_BANCO, caminho_modelo=CAMINHO_MODELO,
+                 max_cache=MAX_CACHE):
+        self.caminho_csv = caminho_csv
+        self.caminho_banco = caminho_banco
+        self.caminho_modelo = caminho_modelo
+        self.registro = RegistroModelos()
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._trava = threading.Lock()
+
+    def ocorrencias(self):
+        ocorrencias = ocorrencias_compartilhadas(self.caminho_csv, self.caminho_banco)
+        ocorrencias.atualizar()
+        return ocorrencias
+
+    def modelo(self):
+        """Versão atual do modelo, ou None se o arquivo não existe."""
+        try:
+            return self.registro.obter(self.caminho_modelo)
+        except FileNotFoundError:
+            return None
+
+    def saude(self):
+        ocorrencias = self.ocorrencias()
+        versao = self.modelo()
+        return {
+            "estado": "ok",
+            **para_json(consultas.resumo_geral(ocorrencias)),
+            "seq": ocorrencias.seq,
+            "modelo": versao.hash if versao is not None else None,
+            "falha_modelo": self.registro.falha(self.caminho_modelo),
+        }
+
+    def executar_lote(self, lote):
+        """Resultados (na ordem) de uma lista de consultas {"consulta": nome, **parâmetros}."""
+        ocorrencias = self.ocorrencias()
+        versao = None
+        if any(isinstance(c, dict) and CONSULTAS.get(c.get("consulta"), (None, False))[1] for c in lote):
+            versao = self.modelo()
+        # A versão do frame e a do modelo entram na chave: deltas e modelos novos invalidam o cache
+        versao_dados = (ocorrencias.n_linhas, ocorrencias.seq, versao.hash if versao is not None else None)
+        return [self._executar(ocorrencias, versao, versao_dados, consulta) for consulta in lote]
+
+    def _executar(self, ocorrencias, versao, versao_dados, consulta):
+        try:
+            chave = (versao_dados, json.dumps(consulta, sort_keys=True, ensure_ascii=False))
+            with self._trava:
+                if chave in self._cache:
+                    self._cache.move_to_end(chave)
+                    return self._cache[chave]
+            resposta = {"ok": True, "resultado": para_json(self._chamar(ocorrencias, versao, consulta))}
+            with self._trava:
+                self._cache[chave] = resposta
+                while len(self._cache) > self.max_cache:
+                    self._cache.popitem(last=False)
+            return resposta
+        except Exception as erro:
+            return {"ok": False, "erro": f"{type(erro).__name__}: {erro}"}
+
+    def _chamar(self, ocorrencias, versao, consulta):
+        if not isinstance(consulta, dict) or consulta.get("consulta") not in CONSULTAS:
+            raise ValueError(f"consulta desconhecida; disponíveis: {', '.join(CONSULTAS)}")
+        funcao, precisa_modelo = CONSULTAS[consulta["consulta"]]
+        parametros = {nome: valor for nome, valor in consulta.items() if nome != "consulta"}
+        if "ultimos_dias" in parametros:
+            parametros["datas"] = consultas.periodo_recente(ocorrencias, int(parametros.pop("ultimos_dias")))
+        elif parametros.get("datas") is not None:
+            inicio, fim = parametros["datas"]
+            parametros["datas"] = (pd.Timestamp(inicio).date(), pd.Timestamp(fim).date())
+        if parametros.get("intervalos"):
+            parametros["intervalos"] = {coluna: tuple(faixa) for coluna, faixa in parametros["intervalos"].items()}
+        if precisa_modelo:
+            if versao is None:
+                raise FileNotFoundError(f"modelo '{self.caminho_modelo}' não encontrado")
+            return funcao(ocorrencias, versao.pipeline, **parametros)
+        return funcao(ocorrencias, **parametros)
+
+
+def descrever_consultas():
+    """Parâmetros de cada consulta (sem os que a API preenche: frame e pipeline)."""
+    descricao = {}
+    for nome, (funcao, precisa_modelo) in CONSULTAS.items():
+        parametros = list(inspect.signature(funcao).parameters.values())[2 if precisa_modelo else 1:]
+        descricao[nome] = {
+            "parametros": {
+                p.name: (None if p.default is inspect.Parameter.empty else para_json(p.default)) for p in parametros
+            },
+            "obrigatorios": [p.name for p in parametros if p.default is inspect.Parameter.empty],
+            "modelo": precisa_modelo,
+            "descricao": (inspect.getdoc(funcao) or "").split("\n")[0],
+        }
+    return descricao
+
+
+def para_json(valor):
+    """Converte resultados das consultas (pandas, numpy, datas) em valores serializáveis."""
+    if isinstance(valor, pd.DataFrame):
+        return [{coluna: para_json(v) for coluna, v in registro.items()} for registro in valor.to_dict("records")]
+    if isinstance(valor, pd.Series):
+        return [[para_json(chave), para_json(v)] for chave, v in valor.items()]
+    if isinstance(valor, dict):
+        return {str(chave): para_json(v) for chave, v in valor.items()}
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return [para_json(v) for v in valor]
+    if isinstance(valor, (pd.Timestamp, datetime, date)):
+        return None if pd.isna(valor) else valor.isoformat()
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if valor is pd.NA or valor is pd.NaT:
+        return None
+    return valor
+
+
+class ManipuladorConsultas(BaseHTTPRequestHandler):
+    servico = None
+
+    def do_GET(self):
+        if self.path == "/saude":
+            self._responder(200, self.servico.saude())
+        elif self.path == "/consultas":
+            self._responder(200, {"consultas": descrever_consultas()})
+        else:
+            self._responder(404, {"erro": "rota não encontrada"})
+
+    def do_POST(self):
+        if self.path != "/consultas":
+            self._responder(404, {"erro": "rota não encontrada"})
+            return
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > MAX_CORPO:
+            self._responder(413, {"erro": f"corpo maior que {MAX_CORPO} bytes"})
+            return
+        try:
+            corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+        except json.JSONDecodeError as erro:
+            self._responder(400, {"erro": f"JSON inválido: {erro}"})
+            return
+        lote = corpo.get("consultas") if isinstance(corpo, dict) else None
+        if not isinstance(lote, list):
+            self._responder(400, {"erro": "o corpo deve ter a lista 'consultas'"})
+            return
+        if len(lote) > MAX_CONSULTAS_LOTE:
+            self._responder(400, {"erro": f"no máximo {MAX_CONSULTAS_LOTE} consultas por lote"})
+            return
+        inicio = time.perf_counter()
+        resultados = self.servico.executar_lote(lote)
+        self._responder(200, {"resultados": resultados, "duracao_ms": round((time.perf_counter() - inicio) * 1e3, 1)})
+
+    def _responder(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def criar_servidor(servico, host="127.0.0.1", porta=PORTA_PADRAO):
+    manipulador = type("Manipulador", (ManipuladorConsultas,), {"servico": servico})
+    return ThreadingHTTPServer((host, porta), manipulador)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve as consultas do dashboard por HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (127.0.0.1 = só local)")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV (ou diretório particionado) da base")
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="Repositório das ocorrências cadastradas")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Pipeline publicado")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    servico = ServicoConsultas(args.dataset, args.banco, args.modelo)
+    inicio = time.perf_counter()
+    saude = servico.saude()
+    print(f"📦 {saude['linhas']:,} ocorrências carregadas em {time.perf_counter() - inicio:.1f}s")
+    servidor = criar_servidor(servico, args.host, args.porta)
+    print(f"🌐 Consultas em http://{args.host}:{args.porta}/consultas ({len(CONSULTAS)} disponíveis)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Encerrando")
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Benchmark da floresta compilada contra o `predict_proba` do scikit-learn.
+
+Uso:
+    python benchmark_floresta.py --modelo modelo.pkl --lotes 1 168 1000
+
+Para cada tamanho de lote mede a latência p50/p99 dos dois caminhos sobre a
+mesma matriz já codificada (só o custo do modelo), a diferença máxima entre as
+probabilidades e a concordância das classes previstas. O scikit-learn roda com
+um só núcleo, como na página.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from dados import CAMINHO_CSV, carregar_ocorrencias
+from floresta import MAX_LINHAS, compilar
+from preprocessamento import PipelineOcorrencias
+
+TOLERANCIA = 1e-6
+
+
+def medir(funcao, X, repeticoes):
+    funcao(X)  # aquecimento
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(X)
+        tempos.append(time.perf_counter() - inicio)
+    return np.percentile(tempos, 50) * 1e3, np.percentile(tempos, 99) * 1e3
+
+
+def bytes_arvores(modelo):
+    total = 0
+    for estimador in modelo.estimators_:
+        estado = estimador.tree_.__getstate__()
+        total += estado["nodes"].nbytes + estado["values"].nbytes
+    return total
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compara a floresta compilada com o predict_proba do scikit-learn.")
+    parser.add_argument("--modelo", default="modelo.pkl", help="Pipeline treinado (treinar_modelo.py)")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV de ocorrências usado como entrada")
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 168, MAX_LINHAS, 1000])
+    parser.add_argument("--repeticoes", type=int, default=30)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pipeline = PipelineOcorrencias.carregar(args.modelo)
+    modelo = pipeline.modelo
+    if "n_jobs" in modelo.get_params():
+        modelo.set_params(n_jobs=1)
+
+    inicio = time.perf_counter()
+    compilada = compilar(modelo)
+    tempo_compilacao = time.perf_counter() - inicio
+    if compilada is None:
+        print(f"❌ O modelo em {args.modelo} ({type(modelo).__name__}) não é uma floresta compilável.")
+        return 1
+
+    X = pipeline.transformar(carregar_ocorrencias(args.dataset))
+    print(f"🌲 {compilada.n_arvores} árvores, {len(compilada.nos):,} nós; compilada em {tempo_compilacao:.2f} s")
+    print(f"💾 Memória: scikit-learn {bytes_arvores(modelo) / 1e6:.1f} MB | compilada {compilada.nbytes / 1e6:.1f} MB")
+
+    # Diferença máxima sobre todo o dataset
+    esperado = modelo.predict_proba(X)
+    obtido = compilada.predict_proba(X)
+    diferenca = float(np.abs(esperado - obtido).max())
+    concordancia = float((esperado.argmax(axis=1) == obtido.argmax(axis=1)).mean())
+    print(f"🎯 {len(X):,} linhas: diferença máxima {diferenca:.2e} | classes iguais em {concordancia:.2%}")
+
+    print(f"\n{'Lote':>6} | {'sklearn p50':>11} | {'compilada p50':>13} | {'p99 sk/comp':>15} | Ganho")
+    for tamanho in args.lotes:
+        lote = X[:min(tamanho, len(X))]
+        repeticoes = max(3, args.repeticoes // max(1, tamanho // 200))
+        sk_p50, sk_p99 = medir(modelo.predict_proba, lote, repeticoes)
+        comp_p50, comp_p99 = medir(compilada.predict_proba, lote, repeticoes)
+        print(
+            f"{len(lote):>6} | {sk_p50:>8.2f} ms | {comp_p50:>10.2f} ms | "
+            f"{sk_p99:>6.1f}/{comp_p99:<6.1f}ms | {sk_p50 / comp_p50:.1f}x"
+        )
+    print(f"\nℹ️ O pipeline usa a floresta compilada em lotes de até {MAX_LINHAS} linhas.")
+
+    if diferenca > TOLERANCIA:
+        print(f"❌ Probabilidades fora da tolerância ({TOLERANCIA:g}).")
+        return 1
+    print("✅ Probabilidades dentro da tolerância.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
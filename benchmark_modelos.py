@@ -0,0 +1,101 @@
+"""Benchmark de classificadores candidatos para a previsão de tipo de crime.
+
+Uso:
+    python benchmark_modelos.py --dataset dataset_ocorrencias_delegacia_5.csv \\
+        --modelos rf_50 rf_200 hist_gb logreg frequencia --processos 2
+
+Todos os candidatos usam o mesmo `PipelineOcorrencias` (mesma codificação das
+features) e a mesma divisão treino/teste do `treinar_modelo.py`. Para cada um
+são registrados tempo de treino, latência p50/p99 de uma linha e de um lote do
+tamanho que a página pontua, tamanho em disco, memória do modelo carregado e
+pico do processo, junto de acurácia e F1. A latência é medida duas vezes: pelo
+pipeline inteiro (registros brutos, como a página chama) e só pelo modelo, sobre
+a matriz já codificada; a codificação custa o mesmo para todos os candidatos e,
+sozinha, deixa as latências do pipeline parecidas. Os resultados vão para
+`benchmark_modelos.json`, lido pela página de Modelos.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from dados import CAMINHO_CSV
+from preprocessamento import PipelineOcorrencias
+from treinar_modelo import buscar, medir_pipeline
+
+CAMINHO_RESULTADOS = "benchmark_modelos.json"
+
+# Fábricas dos candidatos: recebem o n_jobs do trabalhador
+MODELOS = {
+    "rf_50": lambda n_jobs: RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=n_jobs),
+    "rf_100": lambda n_jobs: RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=n_jobs),
+    "rf_200": lambda n_jobs: RandomForestClassifier(n_estimators=200, random_state=42, n_jobs=n_jobs),
+    "rf_200_prof_20": lambda n_jobs: RandomForestClassifier(
+        n_estimators=200, max_depth=20, random_state=42, n_jobs=n_jobs
+    ),
+    "hist_gb": lambda n_jobs: HistGradientBoostingClassifier(random_state=42),
+    "logreg": lambda n_jobs: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000)),
+    # Linha de base: sempre a frequência de cada classe no treino
+    "frequencia": lambda n_jobs: DummyClassifier(strategy="prior"),
+}
+
+
+def avaliar_modelo(nome, n_jobs, diretorio_saida):
+    """Treina e mede o candidato `nome`; roda dentro do processo trabalhador."""
+    resultado = medir_pipeline(PipelineOcorrencias(MODELOS[nome](n_jobs)), diretorio_saida)
+    # O benchmark só guarda as métricas; o pipeline salvo serviu para medir tamanho e memória
+    os.remove(resultado.pop("caminho_modelo"))
+    return {"modelo": nome, **resultado}
+
+
+def ler_resultados(caminho=CAMINHO_RESULTADOS):
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compara custo e qualidade de classificadores candidatos.")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV de ocorrências")
+    parser.add_argument("--saida", default=CAMINHO_RESULTADOS, help="Arquivo JSON com os resultados")
+    parser.add_argument("--modelos", nargs="+", default=list(MODELOS), choices=list(MODELOS))
+    parser.add_argument("--processos", type=int, default=1, help="Candidatos medidos em paralelo")
+    parser.add_argument("--orcamento", type=float, default=float("inf"), help="Orçamento total em segundos")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    diretorio_saida = os.path.dirname(os.path.abspath(args.saida))
+
+    inicio = time.perf_counter()
+    resultados = buscar(args.dataset, args.modelos, args.processos, args.orcamento, diretorio_saida, avaliar_modelo)
+    if not resultados:
+        print("❌ Nenhum candidato terminou dentro do orçamento.")
+        return 1
+
+    relatorio = {
+        "dataset": args.dataset,
+        "executado_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "tempo_total_s": time.perf_counter() - inicio,
+        # Processos em paralelo dividem os núcleos: o tempo de treino depende disso
+        "processos": args.processos,
+        "resultados": sorted(
+            resultados, key=lambda r: args.modelos.index(r["modelo"])
+        ),
+    }
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ {len(resultados)} candidatos medidos; resultados em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
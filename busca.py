@@ -0,0 +1,191 @@
+"""Busca textual por palavras-chave no modus operandi e nas observações.
+
+O índice invertido é construído uma vez por versão do frame, sobre termos
+normalizados (minúsculas, sem acentos, sem palavras vazias):
+
+- vocabulário: termo -> códigos das categorias de cada coluna de texto que o
+  contêm. As colunas de texto são categóricas, então só os textos distintos
+  são quebrados em termos (uma vez cada), não as linhas;
+- listas de linhas por código no mesmo formato CSR do `IndiceFiltros`;
+- termos ordenados, para consultas por prefixo com busca binária.
+
+Uma consulta junta as listas dos códigos de cada termo e intersecta os termos,
+sem varrer o texto das linhas. As ocorrências cadastradas depois da construção
+entram incrementalmente: os textos novos são quebrados em termos e as linhas
+ficam numa cauda verificada pelos códigos; o CSR é reconstruído na compactação
+do frame. Os ids devolvidos podem ser passados a `IndiceFiltros.consultar(ids=...)`
+para combinar a busca com os filtros de bairro, crime e período.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import copy
+
+import numpy as np
+
+COLUNAS_BUSCA = ["descricao_modus_operandi", "observacoes"]
+PALAVRAS_VAZIAS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "um", "uma", "com", "por", "para", "ao", "aos", "que", "se",
+}
+MAX_SUGESTOES = 10
+
+_TERMO = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto):
+    """Texto em minúsculas e sem acentos ("Golpe Telefônico" -> "golpe telefonico")."""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def termos(texto):
+    return [termo for termo in _TERMO.findall(normalizar(texto)) if termo not in PALAVRAS_VAZIAS]
+
+
+def interpretar(consulta):
+    """Lista de (termo, prefixo) da consulta; palavras terminadas em * são prefixos ("golp*")."""
+    interpretados = []
+    for palavra in str(consulta or "").split():
+        prefixo = palavra.endswith("*")
+        partes = termos(palavra.rstrip("*"))
+        interpretados += [(termo, False) for termo in partes[:-1]]
+        if partes:
+            interpretados.append((partes[-1], prefixo))
+    return interpretados
+
+
+class IndiceTexto:
+    def __init__(self, base):
+        self.colunas = [coluna for coluna in COLUNAS_BUSCA if coluna in base.columns]
+        self.vocabulario = {}
+        self.termos = []
+        self.n_categorias = {coluna: 0 for coluna in self.colunas}
+        self.n_linhas = self.n_indexado = len(base)
+        self._estender_vocabulario(base)
+        self.listas = {}
+        for coluna in self.colunas:
+            # Deslocamento de +1 para o código -1 (nulo) virar a posição 0
+            codigos = base[coluna].cat.codes.to_numpy().astype(_tipo_codigos(self.n_categorias[coluna])) + 1
+            ordem = np.argsort(codigos, kind="stable")
+            inicios = np.searchsorted(codigos[ordem], np.arange(self.n_categorias[coluna] + 2))
+            self.listas[coluna] = (ordem, inicios)
+        # Códigos das linhas novas (segmento depois da base), verificados na consulta
+        self.codigos_cauda = {coluna: np.empty(0, dtype=np.int64) for coluna in self.colunas}
+
+    def _estender_vocabulario(self, df):
+        # Só os textos que entraram no dicionário desde a última versão são quebrados
+        # em termos; os códigos antigos não mudam (categorias novas vão para o fim).
+        # O vocabulário é trocado por um novo, com listas novas nos termos tocados:
+        # quem consulta a versão anterior não vê as listas mudarem
+        vocabulario = dict(self.vocabulario)
+        n_categorias = dict(self.n_categorias)
+        tocados = set()
+        for coluna in self.colunas:
+            categorias = df[coluna].cat.categories
+            for codigo in range(n_categorias[coluna], len(categorias)):
+                for termo in set(termos(categorias[codigo])):
+                    if termo not in tocados:
+                        vocabulario[termo] = {c: list(codigos) for c, codigos in vocabulario.get(termo, {}).items()}
+                        tocados.add(termo)
+                    vocabulario[termo].setdefault(coluna, []).append(codigo)
+            n_categorias[coluna] = len(categorias)
+        if len(vocabulario) != len(self.vocabulario):
+            self.termos = sorted(vocabulario)
+        self.vocabulario, self.n_categorias = vocabulario, n_categorias
+
+    def atualizado(self, recentes):
+        """Índice novo com o segmento de ocorrências novas (ids a partir de `n_indexado`); este não muda."""
+        novo = copy.copy(self)
+        novo._estender_vocabulario(recentes)
+        novo.codigos_cauda = {coluna: recentes[coluna].cat.codes.to_numpy() for coluna in self.colunas}
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    # --- Consulta ---
+
+    def consultar(self, consulta, colunas=None):
+        """Ids de linha (ordenados) cujo texto contém todos os termos da consulta.
+
+        Um termo casa com palavras inteiras ("golpe") ou, terminado em *, com
+        prefixos ("golp*"). `colunas` restringe a busca a algumas das colunas de
+        texto. Devolve None quando a consulta não tem termos (sem filtro).
+        """
+        interpretados = interpretar(consulta)
+        if not interpretados:
+            return None
+        colunas = [coluna for coluna in (colunas or self.colunas) if coluna in self.colunas]
+        por_termo = [self._codigos_termo(termo, prefixo, colunas) for termo, prefixo in interpretados]
+        resultado = None
+        # Do termo mais raro para o mais comum: a interseção encolhe logo no começo
+        for codigos in sorted(por_termo, key=self._estimar):
+            ids = self._ids(codigos)
+            resultado = ids if resultado is None else _intersecao(resultado, ids)
+            if len(resultado) == 0:
+                break
+        return resultado
+
+    def sugerir(self, prefixo, limite=MAX_SUGESTOES):
+        """Termos do vocabulário que começam com `prefixo` (normalizado), em ordem alfabética."""
+        prefixo = normalizar(prefixo).strip()
+        if not prefixo:
+            return []
+        inicio = bisect_left(self.termos, prefixo)
+        return [termo for termo in self.termos[inicio:inicio + limite] if termo.startswith(prefixo)]
+
+    def _codigos_termo(self, termo, prefixo, colunas):
+        # Códigos de categoria (por coluna) dos textos que contêm o termo
+        if prefixo:
+            inicio = bisect_left(self.termos, termo)
+            fim = bisect_left(self.termos, termo + "\uffff")
+            encontrados = self.termos[inicio:fim]
+        else:
+            encontrados = [termo] if termo in self.vocabulario else []
+        codigos = {}
+        for coluna in colunas:
+            partes = [self.vocabulario[t][coluna] for t in encontrados if coluna in self.vocabulario[t]]
+            if partes:
+                codigos[coluna] = np.unique(np.concatenate(partes))
+        return codigos
+
+    def _estimar(self, codigos):
+        total = 0
+        for coluna, valores in codigos.items():
+            _, inicios = self.listas[coluna]
+            validos = valores[valores + 2 < len(inicios)]
+            total += int((inicios[validos + 2] - inicios[validos + 1]).sum())
+        return total
+
+    def _ids(self, codigos):
+        partes = []
+        for coluna, valores in codigos.items():
+            ordem, inicios = self.listas[coluna]
+            partes += [ordem[inicios[c + 1]:inicios[c + 2]] for c in valores if c + 2 < len(inicios)]
+            # Cauda: linhas que chegaram depois da construção, verificadas pelo código
+            aceitos = np.zeros(self.n_categorias[coluna] + 1, dtype=bool)
+            aceitos[valores + 1] = True
+            cauda = np.flatnonzero(aceitos[self.codigos_cauda[coluna] + 1])
+            if len(cauda):
+                partes.append(cauda + self.n_indexado)
+        if not partes:
+            return np.empty(0, dtype=np.int64)
+        if len(partes) == 1:
+            return partes[0]
+        # Uma linha pode casar em mais de uma coluna (ou por mais de um texto)
+        return np.unique(np.concatenate(partes))
+
+
+def _tipo_codigos(n_categorias):
+    # int16 deixa o argsort estável usar radix sort
+    return np.int16 if n_categorias < np.iinfo(np.int16).max else np.int32
+
+
+def _intersecao(a, b):
+    """Interseção de dois arrays ordenados de ids únicos (busca binária do menor no maior)."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return a
+    posicoes = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return a[b[posicoes] == a]
@@ -0,0 +1,359 @@
+"""Agrupamento espacial (clusters de hotspots) para a página de Clusters.
+
+Dois algoritmos escaláveis, ambos sobre coordenadas projetadas em metros
+(equirretangular local):
+
+- densidade em grade: aproximação do DBSCAN por células de lado eps/√2 (duas
+  ocorrências da mesma célula estão sempre a menos de eps). A densidade de uma
+  célula é a soma das contagens das células a até eps dela, escalada para a
+  área do círculo de raio eps; células com densidade >= min_ocorrencias são
+  núcleo, núcleos adjacentes formam um cluster (componentes conexas) e células
+  não núcleo vizinhas de um núcleo viram borda. O custo depende do número de
+  células ocupadas, não de ocorrências;
+- MiniBatchKMeans treinado numa amostra; todas as ocorrências são só
+  atribuídas ao centro mais próximo.
+
+Cada resultado guarda estatísticas suficientes por grupo (contagem, somas e
+somas de quadrados das coordenadas, contagem por tipo de crime). Os resultados
+ficam em cache por filtro + parâmetros; quando chegam ocorrências novas, só o
+delta que passa no filtro é somado (células novas são reagrupadas, o k-means
+recebe `partial_fit`), sem recalcular o recorte inteiro.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import MiniBatchKMeans
+
+from espacial import METROS_POR_GRAU
+from filtros import UM_DIA_NS
+
+ALGORITMOS = ["densidade", "kmeans"]
+PARAMETROS_PADRAO = {
+    "densidade": {"eps_m": 200, "min_ocorrencias": 10},
+    "kmeans": {"n_clusters": 8},
+}
+MAX_RESULTADOS = 32
+AMOSTRA_PONTOS = 5000
+AMOSTRA_TREINO = 100_000
+# Fração do recorte que o delta pode atingir antes de um recálculo completo
+FRACAO_CAUDA = 0.1
+RUIDO = -1
+
+# Deslocamentos (linha, coluna) das células a até eps com lado eps/√2: vizinhança
+# 5 x 5 sem os quatro cantos, da mais próxima para a mais distante
+_VIZINHANCA = sorted(
+    [(dy, dx) for dy in range(-2, 3) for dx in range(-2, 3) if abs(dy) + abs(dx) < 4],
+    key=lambda d: d[0] ** 2 + d[1] ** 2,
+)
+_N_ADJACENTES = 9
+_ESCALA_DENSIDADE = np.pi / (len(_VIZINHANCA) / 2)
+
+
+def projetar(latitudes, longitudes, latitude_referencia):
+    """Coordenadas em metros (y, x) numa projeção equirretangular local."""
+    y = latitudes * METROS_POR_GRAU
+    x = longitudes * METROS_POR_GRAU * np.cos(np.radians(latitude_referencia))
+    return y, x
+
+
+def desprojetar(y, x, latitude_referencia):
+    return y / METROS_POR_GRAU, x / (METROS_POR_GRAU * np.cos(np.radians(latitude_referencia)))
+
+
+class _Estatisticas:
+    """Somas por grupo (célula ou cluster do k-means), acumuláveis por delta."""
+
+    def __init__(self, n_grupos, n_crimes):
+        self.contagem = np.zeros(n_grupos, dtype=np.int64)
+        self.somas = np.zeros((n_grupos, 4))  # y, x, y², x²
+        self.crimes = np.zeros((n_grupos, n_crimes + 1), dtype=np.int64)
+
+    def somar(self, grupos, y, x, crimes):
+        n = len(self.contagem)
+        self.contagem += np.bincount(grupos, minlength=n)
+        for i, valores in enumerate((y, x, y**2, x**2)):
+            self.somas[:, i] += np.bincount(grupos, weights=valores, minlength=n)
+        largura = self.crimes.shape[1]
+        self.crimes += np.bincount(grupos * largura + crimes + 1, minlength=n * largura).reshape(n, largura)
+
+    def copia(self):
+        copia = _Estatisticas(0, 0)
+        copia.contagem, copia.somas, copia.crimes = self.contagem.copy(), self.somas.copy(), self.crimes.copy()
+        return copia
+
+    def agregar(self, rotulos, n_clusters):
+        # Soma os grupos por cluster (rótulo RUIDO fica de fora)
+        validos = rotulos != RUIDO
+        agregadas = _Estatisticas(n_clusters, self.crimes.shape[1] - 1)
+        np.add.at(agregadas.contagem, rotulos[validos], self.contagem[validos])
+        np.add.at(agregadas.somas, rotulos[validos], self.somas[validos])
+        np.add.at(agregadas.crimes, rotulos[validos], self.crimes[validos])
+        return agregadas
+
+
+class ResultadoClusters:
+    def __init__(self, algoritmo, parametros, latitude_referencia, n_linhas, n_crimes):
+        self.algoritmo = algoritmo
+        self.parametros = parametros
+        self.latitude_referencia = latitude_referencia
+        self.n_linhas = n_linhas
+        self.n_crimes = n_crimes
+        self.n_pontos = 0
+        self.n_pontos_completo = 0
+        self.tempo_calculo = 0.0
+        self.origem = "calculado"
+        self.amostra = np.empty((0, 2))
+
+    # --- Densidade em grade ---
+
+    def _celulas(self, y, x):
+        lado = self.parametros["eps_m"] / np.sqrt(2)
+        linhas = np.floor(y / lado).astype(np.int64)
+        colunas = np.floor(x / lado).astype(np.int64)
+        return (linhas << 32) + (colunas + (1 << 31))
+
+    def _agrupar_celulas(self):
+        chaves, contagem = self.chaves, self.estatisticas.contagem
+        n = len(chaves)
+        vizinhos = []
+        for dy, dx in _VIZINHANCA:
+            alvo = chaves + (dy << 32) + dx
+            posicao = np.minimum(np.searchsorted(chaves, alvo), n - 1)
+            existe = chaves[posicao] == alvo
+            vizinhos.append(np.where(existe, posicao, -1))
+        vizinhos = np.stack(vizinhos, axis=1)
+
+        # A vizinhança cobre 21 células de área eps²/2; a soma é escalada para a
+        # área do círculo de raio eps, que é o que o DBSCAN conta
+        densidade = np.where(vizinhos >= 0, contagem[np.maximum(vizinhos, 0)], 0).sum(axis=1)
+        nucleo = densidade * _ESCALA_DENSIDADE >= self.parametros["min_ocorrencias"]
+
+        # Núcleos em células adjacentes (3 x 3) formam um cluster (componentes conexas)
+        origem, destino = np.nonzero(vizinhos[:, :_N_ADJACENTES] >= 0)
+        destino = vizinhos[origem, destino]
+        ligados = nucleo[origem] & nucleo[destino]
+        grafo = coo_matrix(
+            (np.ones(ligados.sum(), dtype=np.int8), (origem[ligados], destino[ligados])), shape=(n, n)
+        )
+        _, componentes = connected_components(grafo, directed=False)
+        rotulos = np.full(n, RUIDO, dtype=np.int64)
+        _, rotulos[nucleo] = np.unique(componentes[nucleo], return_inverse=True)
+
+        # Borda: célula não núcleo herda o cluster do núcleo vizinho mais próximo
+        for coluna in range(vizinhos.shape[1]):
+            vizinho = vizinhos[:, coluna]
+            candidata = (rotulos == RUIDO) & (vizinho >= 0)
+            candidata[candidata] = nucleo[vizinho[candidata]]
+            rotulos[candidata] = rotulos[vizinho[candidata]]
+        self.rotulos_celulas = rotulos
+        self.n_clusters = int(rotulos.max()) + 1 if n else 0
+
+    def _somar_densidade(self, y, x, crimes):
+        unicas, inverso = np.unique(self._celulas(y, x), return_inverse=True)
+        novas = np.setdiff1d(unicas, self.chaves, assume_unique=True)
+        if len(novas):
+            # Células novas entram na ordem; as estatísticas são realinhadas
+            todas = np.union1d(self.chaves, novas)
+            antigas = np.searchsorted(todas, self.chaves)
+            estatisticas = _Estatisticas(len(todas), self.n_crimes)
+            estatisticas.contagem[antigas] = self.estatisticas.contagem
+            estatisticas.somas[antigas] = self.estatisticas.somas
+            estatisticas.crimes[antigas] = self.estatisticas.crimes
+            self.chaves, self.estatisticas = todas, estatisticas
+        self.estatisticas.somar(np.searchsorted(self.chaves, unicas)[inverso], y, x, crimes)
+        self._agrupar_celulas()
+
+    # --- K-means ---
+
+    def _somar_kmeans(self, y, x, crimes):
+        self.estatisticas.somar(self.modelo.predict(np.column_stack([y, x])), y, x, crimes)
+
+    # --- Cálculo ---
+
+    def calcular(self, y, x, crimes, semente=0):
+        self.n_pontos = self.n_pontos_completo = len(y)
+        rng = np.random.default_rng(semente)
+        self.amostra = np.column_stack([y, x])[rng.choice(len(y), min(len(y), AMOSTRA_PONTOS), replace=False)]
+
+        if self.algoritmo == "densidade":
+            self.chaves = np.empty(0, dtype=np.int64)
+            self.estatisticas = _Estatisticas(0, self.n_crimes)
+            self._somar_densidade(y, x, crimes)
+            return
+
+        n_clusters = min(self.parametros["n_clusters"], len(y))
+        self.modelo = MiniBatchKMeans(n_clusters=n_clusters, batch_size=4096, n_init=3, random_state=semente)
+        treino = rng.choice(len(y), min(len(y), AMOSTRA_TREINO), replace=False)
+        self.modelo.fit(np.column_stack([y[treino], x[treino]]))
+        self.estatisticas = _Estatisticas(n_clusters, self.n_crimes)
+        self._somar_kmeans(y, x, crimes)
+        self.n_clusters = n_clusters
+
+    def com_delta(self, y, x, crimes):
+        """Resultado novo com as ocorrências novas que passaram no filtro; este não muda."""
+        novo = copy.copy(self)
+        novo.n_pontos = self.n_pontos + len(y)
+        if len(y) == 0:
+            return novo
+        novo.amostra = np.vstack([self.amostra, np.column_stack([y, x])])[-AMOSTRA_PONTOS:]
+        novo.estatisticas = self.estatisticas.copia()
+        if self.algoritmo == "densidade":
+            novo._somar_densidade(y, x, crimes)
+        else:
+            novo.modelo = copy.deepcopy(self.modelo)
+            novo.modelo.partial_fit(np.column_stack([y, x]))
+            novo._somar_kmeans(y, x, crimes)
+        return novo
+
+    # --- Saída ---
+
+    def _por_cluster(self):
+        if self.algoritmo == "densidade":
+            return self.estatisticas.agregar(self.rotulos_celulas, self.n_clusters)
+        return self.estatisticas
+
+    def tabela(self, categorias_crime):
+        """Uma linha por cluster: centro, ocorrências, raio (RMS, m) e crime predominante."""
+        estatisticas = self._por_cluster()
+        com_pontos = estatisticas.contagem > 0
+        contagem = estatisticas.contagem[com_pontos]
+        medias = estatisticas.somas[com_pontos] / contagem[:, None]
+        raio = np.sqrt(np.maximum(medias[:, 2] - medias[:, 0] ** 2 + medias[:, 3] - medias[:, 1] ** 2, 0))
+        latitudes, longitudes = desprojetar(medias[:, 0], medias[:, 1], self.latitude_referencia)
+        rotulos_crime = np.asarray(["Não informado"] + categorias_crime.astype(str).tolist(), dtype=object)
+        tabela = pd.DataFrame({
+            "cluster": np.flatnonzero(com_pontos),
+            "latitude": latitudes,
+            "longitude": longitudes,
+            "ocorrencias": contagem,
+            "raio_m": raio,
+            "crime_predominante": rotulos_crime[estatisticas.crimes[com_pontos].argmax(axis=1)],
+        })
+        return tabela.sort_values("ocorrencias", ascending=False, ignore_index=True)
+
+    def pontos(self):
+        """Amostra de ocorrências (lat, lon) com o cluster de cada uma (RUIDO = -1)."""
+        y, x = self.amostra[:, 0], self.amostra[:, 1]
+        if len(self.amostra) == 0:
+            return pd.DataFrame({"latitude": y, "longitude": x, "cluster": np.empty(0, dtype=np.int64)})
+        if self.algoritmo == "densidade":
+            posicao = np.searchsorted(self.chaves, self._celulas(y, x))
+            clusters = self.rotulos_celulas[np.minimum(posicao, len(self.chaves) - 1)]
+        else:
+            clusters = self.modelo.predict(self.amostra)
+        latitudes, longitudes = desprojetar(y, x, self.latitude_referencia)
+        return pd.DataFrame({"latitude": latitudes, "longitude": longitudes, "cluster": clusters})
+
+    def n_ruido(self):
+        if self.algoritmo != "densidade":
+            return 0
+        return int(self.estatisticas.contagem[self.rotulos_celulas == RUIDO].sum())
+
+
+class ServicoClusters:
+    """Cache de resultados de agrupamento por filtro, acompanhando os deltas do frame."""
+
+    def __init__(self, base):
+        self.n_linhas = self.n_indexado = len(base)
+        self._resultados = OrderedDict()
+        self._trava = threading.Lock()
+
+    def atualizado(self, recentes):
+        # Os resultados em cache (compartilhados com a cópia) alcançam o frame sob demanda, em `agrupar`
+        novo = copy.copy(self)
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    def agrupar(self, ocorrencias, indice_filtros, crimes=None, datas=None, algoritmo="densidade", parametros=None,
+                progresso=None):
+        """Clusters das ocorrências dos `crimes` (lista vazia = todos) no período `datas`.
+
+        `progresso(fracao, mensagem=...)`, se informado, é chamado antes e depois
+        do recálculo completo (pontos de cancelamento quando roda como tarefa).
+        A trava cobre só a consulta e a publicação no cache: os cálculos rodam
+        fora dela e cada resultado publicado é imutável (um delta gera um
+        resultado novo), então outras consultas seguem lendo a versão anterior.
+        """
+        parametros = {**PARAMETROS_PADRAO[algoritmo], **(parametros or {})}
+        crimes = sorted(crimes or [])
+        chave = (tuple(crimes), datas, algoritmo, tuple(sorted(parametros.items())))
+        n_crimes = len(indice_filtros.categorias["tipo_crime"])
+        # Linhas vistas pelo índice de filtros: o recorte e o delta param nelas
+        n_linhas = indice_filtros.n_linhas
+
+        with self._trava:
+            anterior = self._resultados.get(chave)
+            if anterior is not None:
+                self._resultados.move_to_end(chave)
+
+        if anterior is not None and anterior.n_crimes == n_crimes:
+            if anterior.n_linhas >= n_linhas:
+                resultado = copy.copy(anterior)
+                resultado.origem = "cache"
+                return resultado
+            delta = ocorrencias.linhas(np.arange(anterior.n_linhas, n_linhas))
+            delta = delta[self._filtrar_delta(delta, crimes, datas)]
+            if anterior.n_pontos - anterior.n_pontos_completo + len(delta) <= FRACAO_CAUDA * max(anterior.n_pontos_completo, 1):
+                inicio = time.perf_counter()
+                resultado = anterior.com_delta(*self._coordenadas(delta, anterior.latitude_referencia))
+                resultado.n_linhas = n_linhas
+                resultado.tempo_calculo = time.perf_counter() - inicio
+                resultado.origem = "incremental"
+                return self._publicar(chave, resultado)
+
+        if progresso is not None:
+            progresso(0.0, mensagem="selecionando o recorte")
+        inicio = time.perf_counter()
+        recorte = ocorrencias.linhas(_ids(indice_filtros, crimes, datas))
+        latitude_referencia = float(np.nanmean(recorte["latitude"].to_numpy(dtype=np.float64))) if len(recorte) else 0.0
+        resultado = ResultadoClusters(algoritmo, parametros, latitude_referencia, n_linhas, n_crimes)
+        y, x, codigos = self._coordenadas(recorte, latitude_referencia)
+        if progresso is not None:
+            progresso(0.2, mensagem=f"agrupando {len(y):,} ocorrências")
+        if len(y):
+            resultado.calcular(y, x, codigos)
+        resultado.tempo_calculo = time.perf_counter() - inicio
+        return self._publicar(chave, resultado)
+
+    def _publicar(self, chave, resultado):
+        # Cálculos concorrentes da mesma chave: fica o que cobre mais linhas
+        with self._trava:
+            atual = self._resultados.get(chave)
+            if atual is None or atual.n_linhas <= resultado.n_linhas:
+                self._resultados[chave] = resultado
+            while len(self._resultados) > MAX_RESULTADOS:
+                self._resultados.popitem(last=False)
+        return resultado
+
+    @staticmethod
+    def _filtrar_delta(delta, crimes, datas):
+        mascara = np.ones(len(delta), dtype=bool)
+        if crimes:
+            mascara &= delta["tipo_crime"].isin(crimes).to_numpy()
+        if datas is not None:
+            valores = delta["data_ocorrencia"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+            inicio = pd.Timestamp(datas[0]).normalize().value
+            fim = pd.Timestamp(datas[1]).normalize().value + UM_DIA_NS
+            mascara &= (valores >= inicio) & (valores < fim)
+        return mascara
+
+    @staticmethod
+    def _coordenadas(recorte, latitude_referencia):
+        latitudes = recorte["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        longitudes = recorte["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        validas = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        y, x = projetar(latitudes[validas], longitudes[validas], latitude_referencia)
+        return y, x, recorte["tipo_crime"].cat.codes.to_numpy()[validas].astype(np.int64)
+
+
+def _ids(indice_filtros, crimes, datas):
+    ids = indice_filtros.consultar({"tipo_crime": crimes}, datas=datas)
+    if ids is None:
+        return np.arange(indice_filtros.n_linhas)
+    return ids
@@ -0,0 +1,209 @@
+"""Consultas analíticas do dashboard, sem Streamlit.
+
+As páginas montavam filtros, contagens e previsões no próprio script, ao lado
+das chamadas `st.*`. As funções daqui recebem o frame compartilhado
+(`dados.Ocorrencias`) e, nas previsões, o pipeline do modelo; devolvem Series,
+DataFrames e dicionários, sem estado de sessão. As páginas, a API HTTP/JSON
+(`api.py`) e relatórios agendados chamam as mesmas funções e obtêm os mesmos
+resultados.
+
+Os parâmetros seguem o formato dos índices:
+
+- `filtros` (ou `categoricas`) mapeia coluna -> valores aceitos (lista vazia =
+  todos);
+- `intervalos` mapeia coluna numérica -> (mínimo, máximo), inclusive;
+- `datas` é um período (dia inicial, dia final) inclusive, ou None para todo o
+  histórico.
+
+Contagens saem do `CuboContagens`, tendências do `SeriesTemporais` e recortes
+de linhas do `IndiceFiltros`, construídos uma vez por versão do frame.
+"""
+import pandas as pd
+
+from busca import IndiceTexto
+from cubo import CuboContagens
+from dados import DIAS_SEMANA
+from espacial import NIVEL_PADRAO, NIVEIS_DETALHE, GradeRisco, agregar_frame
+from filtros import IndiceFiltros, ultimos_dias
+from previsao import perfil_entrada, prever_horizonte, prever_superficie, probabilidades_por_slot, slot_semanal
+from series import PONTOS_GRAFICO, SeriesTemporais
+
+COLUNAS_AMOSTRA = ["data_ocorrencia", "bairro", "tipo_crime", "arma_utilizada", "sexo_suspeito"]
+
+
+def periodo_recente(ocorrencias, dias):
+    """Período com os últimos `dias` dias, contados a partir da ocorrência mais recente."""
+    periodo = ocorrencias.estatisticas.periodo()
+    return ultimos_dias(dias, periodo[1] if periodo else pd.Timestamp.now())
+
+
+# --- Recortes e contagens ---
+
+def filtrar(ocorrencias, categoricas=None, intervalos=None, datas=None):
+    """Linhas do frame que atendem os filtros (a base, sem cópia, se nenhum restringe e não há linhas novas)."""
+    return ocorrencias.linhas(ocorrencias.indice(IndiceFiltros).consultar(categoricas, intervalos, datas))
+
+
+def resumo_geral(ocorrencias):
+    """Métricas da home: total de registros, período coberto, bairros e tipos de crime."""
+    estatisticas = ocorrencias.estatisticas
+    periodo = estatisticas.periodo()
+    return {
+        "linhas": estatisticas.linhas,
+        "inicio": periodo[0] if periodo else None,
+        "fim": periodo[1] if periodo else None,
+        "dias": (periodo[1] - periodo[0]).days if periodo else 0,
+        "bairros": estatisticas.n_distintos("bairro"),
+        "tipos_crime": estatisticas.n_distintos("tipo_crime"),
+    }
+
+
+def contagens(ocorrencias, por, filtros=None, datas=None, limite=None):
+    """Ocorrências agrupadas por `por` (dimensão do cubo, "hora_dia", "dia_semana" ou "data").
+
+    `limite` mantém só os maiores grupos, do maior para o menor.
+    """
+    contagem = ocorrencias.indice(CuboContagens).contar(por, filtros, datas)
+    return contagem.nlargest(limite) if limite else contagem
+
+
+def total(ocorrencias, filtros=None, datas=None):
+    return ocorrencias.indice(CuboContagens).total(filtros, datas)
+
+
+def media_hora(ocorrencias, por, filtros=None, datas=None):
+    """Hora média das ocorrências agrupada por bairro, tipo_crime ou arma_utilizada."""
+    return ocorrencias.indice(CuboContagens).media_hora(por, filtros, datas)
+
+
+def tendencia(ocorrencias, filtros=None, datas=None, pontos=PONTOS_GRAFICO, resolucao=None):
+    """Série do gráfico de tendência: resolução automática e no máximo `pontos` pontos.
+
+    Devolve {"serie", "resolucao", "periodos"} (períodos antes da redução).
+    """
+    serie, resolucao, periodos = ocorrencias.indice(SeriesTemporais).contar(filtros, datas, pontos, resolucao)
+    return {"serie": serie, "resolucao": resolucao, "periodos": periodos}
+
+
+def mapa_calor(ocorrencias, filtros=None, datas=None, nivel=NIVEL_PADRAO):
+    """Células do mapa de calor (centroide e contagem) do recorte no nível de detalhe dado."""
+    return agregar_frame(filtrar(ocorrencias, filtros, datas=datas), nivel)
+
+
+def resumo_bairro(ocorrencias, bairro, datas=None, tipo_crime=None, n_top=5, n_amostra=10):
+    """Informes da home para um bairro (e, opcionalmente, um tipo de crime) no período.
+
+    Sempre traz `total`; com ocorrências, traz o crime e o horário mais
+    frequentes, o top de crimes e a hora média de cada um. Com `tipo_crime`,
+    acrescenta a arma mais comum, o sexo do suspeito mais frequente, a hora
+    média e uma amostra das ocorrências.
+    """
+    filtros = {"bairro": [bairro]}
+    resumo = {"total": total(ocorrencias, filtros, datas)}
+    if resumo["total"] == 0:
+        return resumo
+
+    contagem_crimes = contagens(ocorrencias, "tipo_crime", filtros, datas)
+    contagem_horas = contagens(ocorrencias, "hora_dia", filtros, datas)
+    principais = contagem_crimes.nlargest(n_top)
+    resumo.update({
+        "crime_mais_frequente": contagem_crimes.idxmax() if not contagem_crimes.empty else None,
+        "horario_mais_frequente": int(contagem_horas.idxmax()) if contagem_horas.sum() > 0 else None,
+        "top_crimes": principais,
+        "horario_medio_por_crime": media_hora(ocorrencias, "tipo_crime", filtros, datas).reindex(principais.index).dropna(),
+    })
+    if tipo_crime is None:
+        return resumo
+
+    filtros_crime = {**filtros, "tipo_crime": [tipo_crime]}
+    df_crime = filtrar(ocorrencias, filtros_crime, datas=datas)
+    contagem_armas = contagens(ocorrencias, "arma_utilizada", filtros_crime, datas)
+    sexo = df_crime["sexo_suspeito"].mode()
+    resumo.update({
+        "total_crime": len(df_crime),
+        "arma_mais_comum": contagem_armas.idxmax() if not contagem_armas.empty else None,
+        "sexo_mais_frequente": sexo.iloc[0] if not sexo.empty else None,
+        "horario_medio": media_hora(ocorrencias, "tipo_crime", filtros_crime, datas).get(tipo_crime, float("nan")),
+        "amostra": df_crime[[c for c in COLUNAS_AMOSTRA if c in df_crime.columns]].head(n_amostra),
+    })
+    return resumo
+
+
+def buscar(ocorrencias, texto, filtros=None, datas=None, limite=None):
+    """Ocorrências cujo texto tem todas as palavras de `texto`, mais recentes primeiro.
+
+    Devolve None quando `texto` não tem palavras válidas.
+    """
+    ids = ocorrencias.indice(IndiceTexto).consultar(texto)
+    if ids is None:
+        return None
+    resultado = ocorrencias.linhas(ocorrencias.indice(IndiceFiltros).consultar(filtros, datas=datas, ids=ids))
+    if limite:
+        return resultado.nlargest(limite, "data_ocorrencia")
+    return resultado.sort_values("data_ocorrencia", ascending=False)
+
+
+# --- Previsão ---
+
+def slot_padrao(df_filtrado):
+    """Dia da semana mais frequente e hora média do recorte: o slot das previsões pontuais."""
+    return df_filtrado["dia_semana"].mode()[0], int(df_filtrado["hora_dia"].mean())
+
+
+def top_crimes(probabilidades_slots, classes, dia_semana, hora_dia, n=3):
+    """Os `n` crimes mais prováveis num slot, a partir da matriz (168, n_classes) da semana."""
+    probabilidades = probabilidades_slots[slot_semanal(DIAS_SEMANA.index(dia_semana), hora_dia)]
+    return pd.DataFrame({
+        "Tipo de Crime": classes,
+        "Probabilidade": probabilidades,
+    }).sort_values("Probabilidade", ascending=False).head(n)
+
+
+def prever(ocorrencias, pipeline, categoricas=None, intervalos=None, dia_semana=None, hora_dia=None, n=3):
+    """Crimes mais prováveis para o perfil do histórico filtrado.
+
+    Sem `dia_semana`/`hora_dia`, usa o slot padrão do recorte. Devolve None
+    quando o recorte não tem histórico suficiente para o perfil.
+    """
+    df_filtrado = filtrar(ocorrencias, categoricas, intervalos)
+    entrada_base = perfil_entrada(df_filtrado) if not df_filtrado.empty else None
+    if entrada_base is None:
+        return None
+    dia_padrao, hora_padrao = slot_padrao(df_filtrado)
+    dia_semana = dia_semana or dia_padrao
+    hora_dia = hora_padrao if hora_dia is None else int(hora_dia)
+    probabilidades_slots = probabilidades_por_slot(pipeline, entrada_base)
+    return {
+        "perfil": entrada_base,
+        "dia_semana": dia_semana,
+        "hora_dia": hora_dia,
+        "top": top_crimes(probabilidades_slots, pipeline.classes_, dia_semana, hora_dia, n),
+    }
+
+
+def horizonte(ocorrencias, pipeline, inicio, fim, freq="h", categoricas=None, intervalos=None):
+    """Crime previsto em cada instante de [inicio, fim] com a frequência `freq`, para o perfil do recorte."""
+    df_filtrado = filtrar(ocorrencias, categoricas, intervalos)
+    entrada_base = perfil_entrada(df_filtrado) if not df_filtrado.empty else None
+    if entrada_base is None:
+        return None
+    data_range = pd.date_range(start=inicio, end=fim, freq=freq)
+    return prever_horizonte(pipeline.classes_, probabilidades_por_slot(pipeline, entrada_base), data_range)
+
+
+def risco_do_crime(celulas, probabilidades, classes, tipo_crime):
+    """Células da grade com a probabilidade prevista de `tipo_crime` na coluna `risco`."""
+    classes = [str(classe) for classe in classes]
+    return celulas.assign(risco=probabilidades[:, classes.index(str(tipo_crime))])
+
+
+def superficie_risco(ocorrencias, pipeline, dia_semana, hora_dia, tipo_crime, categoricas=None, intervalos=None,
+                     nivel=NIVEL_PADRAO):
+    """Superfície de risco de `tipo_crime` na grade da delegacia, para o perfil do recorte."""
+    df_filtrado = filtrar(ocorrencias, categoricas, intervalos)
+    entrada_base = perfil_entrada(df_filtrado) if not df_filtrado.empty else None
+    if entrada_base is None:
+        return None
+    celulas = ocorrencias.indice(GradeRisco).celulas(NIVEIS_DETALHE[nivel])
+    probabilidades = prever_superficie(pipeline, celulas, entrada_base, dia_semana, int(hora_dia))
+    return risco_do_crime(celulas, probabilidades, pipeline.classes_, tipo_crime)
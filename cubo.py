@@ -0,0 +1,190 @@
+"""Cubo de contagens pré-agregado para os gráficos do dashboard.
+
+Quase todo gráfico das páginas é uma contagem (ou média de hora) agrupada por
+bairro, tipo de crime, arma, data, hora ou dia da semana. O cubo guarda essas
+contagens uma vez por versão do frame, em duas formas:
+
+- um array denso bairro x tipo_crime x arma_utilizada x hora_dia, que responde
+  as consultas sem recorte de datas somando eixos;
+- células esparsas (data, bairro, tipo_crime, arma, hora) ordenadas por data,
+  recortadas por busca binária quando a consulta tem intervalo de datas.
+
+A média de hora sai das próprias contagens por hora (soma de hora x contagem
+dividida pela contagem). O custo de uma consulta depende do número de células,
+não do número de ocorrências. Linhas novas (deltas) são somadas ao array denso
+e entram numa cauda de células, incorporada quando a compactação do frame
+reconstrói o cubo (um valor novo de bairro, crime ou arma também compacta).
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from dados import DIAS_SEMANA
+
+DIMENSOES = ["bairro", "tipo_crime", "arma_utilizada"]
+HORAS = 24
+
+
+class CuboContagens:
+    def __init__(self, base):
+        self.n_linhas = self.n_indexado = len(base)
+        self.categorias = {d: base[d].cat.categories for d in DIMENSOES}
+        # Posição 0 de cada eixo guarda os nulos (código -1, hora -1)
+        self.forma = tuple(len(self.categorias[d]) + 1 for d in DIMENSOES) + (HORAS + 1,)
+
+        planos, dias = self._planificar(base)
+        self.densa = np.bincount(planos, minlength=np.prod(self.forma)).reshape(self.forma)
+        self.celulas = _agrupar_celulas(planos, dias, np.prod(self.forma))
+        self.cauda = _celulas_vazias()
+
+    def _planificar(self, df):
+        # Índice plano de cada linha no array denso + dia (datetime64[D] como int)
+        eixos = [df[d].cat.codes.to_numpy().astype(np.int64) + 1 for d in DIMENSOES]
+        eixos.append(df["hora_dia"].to_numpy().astype(np.int64) + 1)
+        planos = np.ravel_multi_index(eixos, self.forma)
+        dias = df["data_ocorrencia"].to_numpy().astype("datetime64[D]").astype(np.int64)
+        dias[pd.isna(df["data_ocorrencia"]).to_numpy()] = _DIA_NULO
+        return planos, dias
+
+    def atualizado(self, recentes):
+        """Cubo novo com as linhas do segmento de ocorrências novas ainda não vistas; este não muda."""
+        planos, dias = self._planificar(recentes.iloc[self.n_linhas - self.n_indexado:])
+        novo = copy.copy(self)
+        novo.densa = self.densa + np.bincount(planos, minlength=self.densa.size).reshape(self.forma)
+        novo.cauda = _concatenar_celulas(self.cauda, _agrupar_celulas(planos, dias, self.densa.size))
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    # --- Seleção ---
+
+    def _mascaras(self, filtros):
+        mascaras = []
+        for dimensao, tamanho in zip(DIMENSOES, self.forma):
+            valores = (filtros or {}).get(dimensao)
+            if not valores:
+                mascaras.append(np.ones(tamanho, dtype=bool))
+                continue
+            mascara = np.zeros(tamanho, dtype=bool)
+            codigos = self.categorias[dimensao].get_indexer(list(valores))
+            mascara[codigos[codigos >= 0] + 1] = True
+            mascaras.append(mascara)
+        horas = (filtros or {}).get("hora_dia")
+        mascara_horas = np.ones(HORAS + 1, dtype=bool)
+        if horas is not None:
+            mascara_horas[:] = False
+            mascara_horas[np.arange(horas[0], horas[1] + 1) + 1] = True
+        mascaras.append(mascara_horas)
+        return mascaras
+
+    def _celulas_no_periodo(self, datas):
+        # Células do período [início, fim] (inclusive) que passam pelas máscaras
+        inicio, fim = (np.datetime64(d, "D").astype(np.int64) for d in datas)
+        i, j = np.searchsorted(self.celulas["dia"], [inicio, fim + 1])
+        principais = {chave: valores[i:j] for chave, valores in self.celulas.items()}
+        na_cauda = (self.cauda["dia"] >= inicio) & (self.cauda["dia"] <= fim)
+        cauda = {chave: valores[na_cauda] for chave, valores in self.cauda.items()}
+        return _concatenar_celulas(principais, cauda)
+
+    def _densa_filtrada(self, filtros, datas):
+        if datas is None:
+            densa = self.densa
+        else:
+            celulas = self._celulas_no_periodo(datas)
+            densa = np.bincount(
+                celulas["plano"], weights=celulas["contagem"], minlength=self.densa.size
+            ).reshape(self.forma)
+        # Zera as células fora dos filtros mantendo a forma (os rótulos seguem os eixos)
+        for eixo, mascara in enumerate(self._mascaras(filtros)):
+            forma = [1] * densa.ndim
+            forma[eixo] = -1
+            densa = densa * mascara.reshape(forma)
+        return densa
+
+    # --- Consultas ---
+
+    def contar(self, por, filtros=None, datas=None):
+        """Contagem de ocorrências agrupada por `por`.
+
+        `por` é uma das DIMENSOES, "hora_dia", "dia_semana" ou "data".
+        `filtros` mapeia dimensão -> valores aceitos (e "hora_dia" -> (min, max));
+        `datas` é um intervalo (início, fim) inclusive, ou None para todo o período.
+        Dimensões categóricas voltam sem as categorias de contagem zero (como
+        `contagem_valores`).
+        """
+        if por in ("dia_semana", "data"):
+            return self._contar_por_data(por, filtros, datas)
+
+        densa = self._densa_filtrada(filtros, datas)
+        if por == "hora_dia":
+            contagem = densa.sum(axis=(0, 1, 2))[1:]
+            return pd.Series(contagem.astype(np.int64), index=pd.RangeIndex(HORAS, name="hora_dia"), name="count")
+        eixo = DIMENSOES.index(por)
+        outros = tuple(e for e in range(densa.ndim) if e != eixo)
+        contagem = densa.sum(axis=outros)[1:].astype(np.int64)
+        serie = pd.Series(contagem, index=pd.Index(self.categorias[por].astype(str), name=por), name="count")
+        return serie[serie > 0]
+
+    def _contar_por_data(self, por, filtros, datas):
+        celulas = self._celulas_no_periodo(datas) if datas is not None else _concatenar_celulas(self.celulas, self.cauda)
+        celulas = {chave: valores[celulas["dia"] != _DIA_NULO] for chave, valores in celulas.items()}
+        eixos = np.unravel_index(celulas["plano"], self.forma)
+        mascaras = self._mascaras(filtros)
+        selecionadas = np.logical_and.reduce([m[e] for m, e in zip(mascaras, eixos)])
+        dias = celulas["dia"][selecionadas]
+        contagem = celulas["contagem"][selecionadas]
+        if por == "dia_semana":
+            # 1970-01-01 foi uma quinta-feira (Segunda = 0)
+            dia_semana = (dias + 3) % 7
+            soma = np.bincount(dia_semana, weights=contagem, minlength=7).astype(np.int64)
+            return pd.Series(soma, index=pd.Index(DIAS_SEMANA, name="dia_semana"), name="count")
+        unicos, inverso = np.unique(dias, return_inverse=True)
+        soma = np.bincount(inverso, weights=contagem, minlength=len(unicos)).astype(np.int64)
+        return pd.Series(soma, index=pd.Index(unicos.astype("datetime64[D]"), name="data"), name="count")
+
+    def media_hora(self, por, filtros=None, datas=None):
+        """Hora média das ocorrências agrupada por uma das DIMENSOES."""
+        densa = self._densa_filtrada(filtros, datas)[..., 1:]
+        eixo = DIMENSOES.index(por)
+        outros = tuple(e for e in range(densa.ndim - 1) if e != eixo)
+        por_hora = densa.sum(axis=outros)[1:]
+        total = por_hora.sum(axis=1)
+        soma_horas = por_hora @ np.arange(HORAS)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = soma_horas / total
+        serie = pd.Series(media, index=pd.Index(self.categorias[por].astype(str), name=por))
+        return serie[total > 0]
+
+    def total(self, filtros=None, datas=None):
+        return int(self._densa_filtrada(filtros, datas).sum())
+
+
+_DIA_NULO = np.iinfo(np.int64).min
+
+
+def _celulas_vazias():
+    return {
+        "dia": np.empty(0, dtype=np.int64),
+        "plano": np.empty(0, dtype=np.int64),
+        "contagem": np.empty(0, dtype=np.int64),
+    }
+
+
+def _agrupar_celulas(planos, dias, tamanho_plano):
+    # Uma célula por (dia, índice plano), ordenadas por dia; linhas sem data
+    # ficam fora (só contam no array denso)
+    validos = dias != _DIA_NULO
+    if not validos.any():
+        return _celulas_vazias()
+    dias, planos = dias[validos], planos[validos]
+    primeiro_dia = dias.min()
+    chaves, contagem = np.unique((dias - primeiro_dia) * tamanho_plano + planos, return_counts=True)
+    return {
+        "dia": chaves // tamanho_plano + primeiro_dia,
+        "plano": chaves % tamanho_plano,
+        "contagem": contagem.astype(np.int64),
+    }
+
+
+def _concatenar_celulas(a, b):
+    return {chave: np.concatenate([a[chave], b[chave]]) for chave in a}
@@ -0,0 +1,652 @@
+"""Camada de dados compartilhada pelas páginas do app.
+
+O CSV de ocorrências é convertido uma única vez para um armazenamento colunar
+em disco (um arquivo binário por coluna + metadados em JSON), lido em blocos
+com esquema explícito para que exportações grandes não precisem caber na
+memória (`ingestao.py` faz a conversão pela linha de comando). As colunas
+categóricas são gravadas como códigos inteiros, as numéricas em tipos compactos
+e as colunas de tempo derivadas (dia_semana, hora_dia, mes, ano) já vêm
+calculadas. A leitura é feita por memory-map, então vários processos do
+Streamlit compartilham as mesmas páginas de memória. A conversão também grava
+as estatísticas do dataset (`estatisticas.py`), usadas pelas métricas e
+filtros das páginas sem ler as linhas.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from estatisticas import EstatisticasOcorrencias, ler_estatisticas
+from repositorio import CAMINHO_BANCO, RepositorioOcorrencias
+
+# Fonte das ocorrências: um CSV ou um diretório particionado (particoes.py);
+# OCORRENCIAS_DADOS troca a fonte de todo o app sem mudar o código
+CAMINHO_CSV = os.environ.get("OCORRENCIAS_DADOS", "dataset_ocorrencias_delegacia_5.csv")
+VERSAO_FORMATO = 2
+FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+
+COLUNAS_CATEGORICAS = [
+    "bairro",
+    "tipo_crime",
+    "descricao_modus_operandi",
+    "arma_utilizada",
+    "sexo_suspeito",
+    "orgao_responsavel",
+    "status_investigacao",
+]
+
+# Texto livre que só existe nas ocorrências cadastradas no app: entra no frame
+# compartilhado como categórica (sem categorias na base), para a busca textual
+COLUNAS_TEXTO = ["observacoes"]
+
+# Inteiros pequenos; valores ausentes são gravados como -1
+COLUNAS_INTEIRAS = {
+    "quantidade_vitimas": "int16",
+    "quantidade_suspeitos": "int16",
+    "idade_suspeito": "int16",
+}
+
+COLUNAS_COORDENADAS = ["latitude", "longitude"]
+
+# Esquema explícito do CSV: categóricas lidas direto como category (dicionário
+# por bloco), números convertidos pelo próprio parser e a data como texto,
+# convertida com FORMATO_DATA
+ESQUEMA_CSV = {
+    "id_ocorrencia": str,
+    "data_ocorrencia": str,
+    **{coluna: "category" for coluna in COLUNAS_CATEGORICAS},
+    **{coluna: "float64" for coluna in list(COLUNAS_INTEIRAS) + COLUNAS_COORDENADAS},
+}
+# Se algum valor numérico não for número o parser falha; a ingestão então refaz
+# a leitura com os números como texto, e os inválidos viram ausentes
+ESQUEMA_CSV_TOLERANTE = {
+    coluna: str if tipo == "float64" else tipo for coluna, tipo in ESQUEMA_CSV.items()
+}
+LINHAS_POR_BLOCO = 100_000
+# Ocorrências novas: capacidade inicial do buffer e fração da base que ele pode
+# atingir antes de ser compactado nela
+CAPACIDADE_INICIAL = 1024
+FRACAO_CAUDA = 0.1
+
+DIAS_SEMANA = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
+
+# O identificador é único por linha e nenhuma página o exibe, então ele fica no
+# armazenamento mas só é carregado quando pedido explicitamente
+COLUNAS_PADRAO = (
+    ["data_ocorrencia"] + COLUNAS_CATEGORICAS + list(COLUNAS_INTEIRAS)
+    + COLUNAS_COORDENADAS + ["dia_semana", "hora_dia", "mes", "ano"]
+)
+
+
+def localizar_csv(caminho=CAMINHO_CSV):
+    # Mesmo fallback das páginas: procura na raiz e no diretório acima
+    for candidato in (caminho, os.path.join("..", caminho)):
+        if os.path.exists(candidato):
+            return candidato
+    raise FileNotFoundError(f"Arquivo '{caminho}' não encontrado.")
+
+
+def diretorio_colunar(caminho_csv):
+    base, _ = os.path.splitext(caminho_csv)
+    return base + ".colunar"
+
+
+def _assinatura(caminho_csv):
+    info = os.stat(caminho_csv)
+    return {"tamanho": info.st_size, "modificado": info.st_mtime_ns}
+
+
+def _tipo_codigos(n_categorias):
+    return "int8" if n_categorias < np.iinfo(np.int8).max else "int16"
+
+
+def colunas_derivadas(datas):
+    """Colunas de tempo calculadas a partir de um vetor datetime64."""
+    datas = pd.DatetimeIndex(datas)
+    return {
+        # Segunda = 0, como em dt.dayofweek
+        "dia_semana": np.asarray(datas.dayofweek, dtype="int8"),
+        "hora_dia": np.asarray(datas.hour, dtype="int8"),
+        "mes": np.asarray(datas.month, dtype="int8"),
+        "ano": np.asarray(datas.year, dtype="int16"),
+    }
+
+
+def _inteiro_compacto(serie, dtype):
+    valores = pd.to_numeric(serie, errors="coerce")
+    limite = np.iinfo(dtype).max
+    valores = valores.where((valores >= 0) & (valores <= limite))
+    return valores.fillna(-1).to_numpy().astype(dtype)
+
+
+def converter_para_colunar(caminho_csv, destino=None, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """Converte o CSV em blocos para o armazenamento colunar em `destino`.
+
+    O CSV é lido em blocos de `linhas_por_bloco` linhas com o esquema explícito
+    `ESQUEMA_CSV`; cada bloco é validado, tipado e anexado aos arquivos das
+    colunas, então o pico de memória depende do bloco e não do tamanho do
+    arquivo. `progresso`, se dado, é chamado com (linhas, segundos) a cada bloco.
+
+    Os números são lidos direto como float pelo parser; se algum bloco tiver um
+    valor não numérico a conversão recomeça com `ESQUEMA_CSV_TOLERANTE`.
+    """
+    destino = destino or diretorio_colunar(caminho_csv)
+    os.makedirs(destino, exist_ok=True)
+    inicio = time.perf_counter()
+    try:
+        return _converter(caminho_csv, destino, ESQUEMA_CSV, linhas_por_bloco, progresso, inicio)
+    except ValueError:
+        return _converter(caminho_csv, destino, ESQUEMA_CSV_TOLERANTE, linhas_por_bloco, progresso, inicio)
+
+
+def _converter(caminho_csv, destino, esquema_csv, linhas_por_bloco, progresso, inicio):
+    origem = _assinatura(caminho_csv)
+
+    escrita = _EscritaColunar(destino)
+    estatisticas = EstatisticasOcorrencias()
+    dicionarios = {coluna: {} for coluna in COLUNAS_CATEGORICAS}
+    invalidos = dict.fromkeys(["data_ocorrencia"] + list(COLUNAS_INTEIRAS) + COLUNAS_COORDENADAS, 0)
+    blocos_id = []
+    linhas = 0
+    try:
+        blocos = pd.read_csv(
+            caminho_csv, usecols=list(esquema_csv), dtype=esquema_csv, chunksize=linhas_por_bloco
+        )
+        for bloco in blocos:
+            datas = pd.to_datetime(bloco["data_ocorrencia"], format=FORMATO_DATA, errors="coerce")
+            invalidos["data_ocorrencia"] += int((datas.isna() & bloco["data_ocorrencia"].notna()).sum())
+
+            # A largura do identificador varia por bloco; fica registrada para o ajuste final
+            ids = np.array(bloco["id_ocorrencia"].fillna("").str.encode("utf-8").to_numpy(), dtype=bytes)
+            blocos_id.append((len(ids), ids.dtype.itemsize))
+            escrita.anexar("id_ocorrencia", ids)
+            escrita.anexar("data_ocorrencia", datas.to_numpy().astype("datetime64[ns]").view("int64"))
+
+            # Colunas tipadas do bloco para as estatísticas do dataset
+            tipado = {"data_ocorrencia": datas}
+
+            # Códigos provisórios na ordem de chegada; ordenados no fim
+            for coluna in COLUNAS_CATEGORICAS:
+                tipado[coluna] = bloco[coluna]
+                dicionario = dicionarios[coluna]
+                valores = bloco[coluna].cat
+                traducao = np.array(
+                    [dicionario.setdefault(valor, len(dicionario)) for valor in valores.categories] + [-1],
+                    dtype=np.int32,
+                )
+                escrita.anexar(coluna, traducao[valores.codes.to_numpy()])
+
+            for coluna, dtype in COLUNAS_INTEIRAS.items():
+                valores = _inteiro_compacto(bloco[coluna], dtype)
+                invalidos[coluna] += int(((valores < 0) & bloco[coluna].notna().to_numpy()).sum())
+                escrita.anexar(coluna, valores)
+                tipado[coluna] = valores
+
+            for coluna in COLUNAS_COORDENADAS:
+                valores = pd.to_numeric(bloco[coluna], errors="coerce").to_numpy().astype("float32")
+                invalidos[coluna] += int((np.isnan(valores) & bloco[coluna].notna().to_numpy()).sum())
+                escrita.anexar(coluna, valores)
+                tipado[coluna] = valores
+
+            # Linhas com data inválida ficam com NaT; as derivadas recebem -1
+            invalidas = datas.isna().to_numpy()
+            for coluna, valores in colunas_derivadas(datas).items():
+                valores[invalidas] = -1
+                escrita.anexar(coluna, valores)
+                tipado[coluna] = valores
+            tipado["dia_semana"] = pd.Categorical.from_codes(
+                tipado["dia_semana"], dtype=pd.CategoricalDtype(DIAS_SEMANA), validate=False
+            )
+            estatisticas.somar(pd.DataFrame(tipado, copy=False))
+
+            linhas += len(bloco)
+            if progresso is not None:
+                progresso(linhas, time.perf_counter() - inicio)
+    finally:
+        escrita.fechar()
+
+    categorias = {"dia_semana": DIAS_SEMANA}
+    esquema = {
+        "data_ocorrencia": "<i8",
+        **{coluna: np.dtype(dtype).str for coluna, dtype in COLUNAS_INTEIRAS.items()},
+        **{coluna: "<f4" for coluna in COLUNAS_COORDENADAS},
+        **{coluna: valores.dtype.str for coluna, valores in colunas_derivadas(pd.DatetimeIndex([])).items()},
+    }
+    for coluna in esquema:
+        escrita.publicar(coluna)
+
+    largura = max((largura for _, largura in blocos_id), default=1)
+    esquema["id_ocorrencia"] = np.dtype(f"S{largura}").str
+    escrita.regravar("id_ocorrencia", [(n, np.dtype(f"S{w}")) for n, w in blocos_id], lambda ids: ids.astype(f"S{largura}"))
+
+    # Dicionários em ordem alfabética, como no factorize(sort=True); os códigos provisórios são traduzidos
+    for coluna in COLUNAS_CATEGORICAS:
+        chegada = list(dicionarios[coluna])
+        categorias[coluna] = sorted(chegada)
+        posicao = {valor: i for i, valor in enumerate(categorias[coluna])}
+        dtype = _tipo_codigos(len(chegada))
+        traducao = np.array([posicao[valor] for valor in chegada] + [-1], dtype=dtype)
+        esquema[coluna] = np.dtype(dtype).str
+        escrita.regravar(coluna, [(linhas, np.dtype(np.int32))], lambda codigos: traducao[codigos], linhas_por_bloco)
+
+    segundos = time.perf_counter() - inicio
+    meta = {
+        "versao_formato": VERSAO_FORMATO,
+        "origem": origem,
+        "linhas": linhas,
+        "esquema": esquema,
+        "categorias": categorias,
+        "ingestao": {
+            "segundos": round(segundos, 3),
+            "linhas_por_segundo": round(linhas / segundos) if segundos > 0 else None,
+            "invalidos": invalidos,
+            "leitura_tolerante": esquema_csv is ESQUEMA_CSV_TOLERANTE,
+        },
+    }
+    estatisticas.gravar(destino)
+    # O meta.json é gravado por último: sem ele o diretório é considerado incompleto
+    temporario = os.path.join(destino, "meta.json.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temporario, os.path.join(destino, "meta.json"))
+    return meta
+
+
+class _EscritaColunar:
+    """Arquivos das colunas sendo gravados em blocos (sufixo .parcial até o fim)."""
+
+    def __init__(self, destino):
+        self.destino = destino
+        self._arquivos = {}
+
+    def _caminho(self, coluna, sufixo=".parcial"):
+        return os.path.join(self.destino, coluna + ".bin" + sufixo)
+
+    def anexar(self, coluna, valores):
+        if coluna not in self._arquivos:
+            self._arquivos[coluna] = open(self._caminho(coluna), "wb")
+        valores.tofile(self._arquivos[coluna])
+
+    def fechar(self):
+        for arquivo in self._arquivos.values():
+            arquivo.close()
+
+    def publicar(self, coluna):
+        # Sem nenhum bloco (CSV só com cabeçalho) a coluna fica vazia
+        if coluna not in self._arquivos:
+            open(self._caminho(coluna), "wb").close()
+        os.replace(self._caminho(coluna), self._caminho(coluna, ""))
+
+    def regravar(self, coluna, segmentos, converter, linhas_por_bloco=None):
+        """Relê o arquivo parcial em partes (n, dtype), converte e publica o resultado."""
+        if coluna not in self._arquivos:
+            open(self._caminho(coluna), "wb").close()
+        with open(self._caminho(coluna), "rb") as origem, open(self._caminho(coluna, ".tmp"), "wb") as destino:
+            for n, dtype in segmentos:
+                passo = linhas_por_bloco or max(n, 1)
+                for inicio in range(0, n, passo):
+                    converter(np.fromfile(origem, dtype=dtype, count=min(passo, n - inicio))).tofile(destino)
+        os.remove(self._caminho(coluna))
+        os.replace(self._caminho(coluna, ".tmp"), self._caminho(coluna, ""))
+
+
+def ler_meta(destino):
+    try:
+        with open(os.path.join(destino, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _atualizado(meta, caminho_csv):
+    return (
+        meta is not None
+        and meta.get("versao_formato") == VERSAO_FORMATO
+        and meta.get("origem") == _assinatura(caminho_csv)
+    )
+
+
+def _mapear(destino, coluna, meta):
+    dtype = np.dtype(meta["esquema"][coluna])
+    if meta["linhas"] == 0:
+        return np.empty(0, dtype=dtype)
+    caminho = os.path.join(destino, coluna + ".bin")
+    # np.asarray devolve um ndarray comum que continua apontando para o mmap
+    return np.asarray(np.memmap(caminho, dtype=dtype, mode="r", shape=(meta["linhas"],)))
+
+
+def _montar_coluna(coluna, valores, meta):
+    if coluna == "data_ocorrencia":
+        return valores.view("datetime64[ns]")
+    if coluna in meta["categorias"]:
+        tipo = pd.CategoricalDtype(meta["categorias"][coluna])
+        return pd.Categorical.from_codes(valores, dtype=tipo, validate=False)
+    if coluna == "id_ocorrencia":
+        return np.char.decode(valores, "utf-8").astype(object)
+    if coluna in COLUNAS_INTEIRAS:
+        ausentes = valores < 0
+        if ausentes.any():
+            return pd.arrays.IntegerArray(valores, ausentes)
+    return valores
+
+
+def colunar_atualizado(caminho_csv):
+    return _atualizado(ler_meta(diretorio_colunar(caminho_csv)), caminho_csv)
+
+
+def preparar_colunar(caminho_csv):
+    """Meta do armazenamento colunar de `caminho_csv`, convertendo o CSV se preciso."""
+    destino = diretorio_colunar(caminho_csv)
+    meta = ler_meta(destino)
+    if not _atualizado(meta, caminho_csv):
+        meta = converter_para_colunar(caminho_csv, destino)
+    return meta
+
+
+def ler_colunar(caminho_csv, meta, colunas=None):
+    destino = diretorio_colunar(caminho_csv)
+    colunas = colunas or COLUNAS_PADRAO
+    dados = {
+        coluna: _montar_coluna(coluna, _mapear(destino, coluna, meta), meta)
+        for coluna in colunas
+    }
+    return pd.DataFrame(dados, copy=False)
+
+
+def carregar_ocorrencias(caminho_csv=CAMINHO_CSV, colunas=None):
+    """Carrega as ocorrências a partir do armazenamento colunar.
+
+    O armazenamento é (re)gerado automaticamente quando não existe ou quando o
+    CSV de origem mudou desde a última conversão. `caminho_csv` também pode
+    ser um diretório particionado por delegacia e mês (ver `particoes.py`).
+    """
+    caminho_csv = localizar_csv(caminho_csv)
+    if os.path.isdir(caminho_csv):
+        # Importado aqui: particoes depende deste módulo
+        from particoes import carregar_particionado
+
+        return carregar_particionado(caminho_csv, colunas=colunas)
+    return ler_colunar(caminho_csv, preparar_colunar(caminho_csv), colunas)
+
+
+def estatisticas_da_fonte(caminho_csv=CAMINHO_CSV):
+    """Estatísticas gravadas na conversão (somadas entre as partições), ou None se faltarem."""
+    caminho_csv = localizar_csv(caminho_csv)
+    if os.path.isdir(caminho_csv):
+        from particoes import estatisticas_particionado
+
+        return estatisticas_particionado(caminho_csv)
+    preparar_colunar(caminho_csv)
+    return ler_estatisticas(diretorio_colunar(caminho_csv))
+
+
+def tipar_registros(registros, categorias):
+    """Converte registros brutos (texto/números soltos) para o esquema do frame.
+
+    `categorias` traz o dicionário atual de cada coluna categórica; valores
+    novos entram no fim do dicionário. Devolve o frame tipado e o dicionário
+    estendido.
+    """
+    datas = pd.to_datetime(registros["data_ocorrencia"], format=FORMATO_DATA, errors="coerce")
+    colunas = {"data_ocorrencia": datas.to_numpy().astype("datetime64[ns]")}
+    categorias = dict(categorias)
+
+    for coluna in COLUNAS_CATEGORICAS + COLUNAS_TEXTO:
+        valores = registros[coluna].astype(object).where(registros[coluna].notna())
+        if coluna in COLUNAS_TEXTO:
+            # Texto em branco do formulário conta como ausente
+            valores = valores.where(valores.astype(str).str.strip() != "")
+        conhecidas = categorias.get(coluna, [])
+        novas = sorted(set(valores.dropna()) - set(conhecidas))
+        categorias[coluna] = list(conhecidas) + novas
+        colunas[coluna] = pd.Categorical(valores, categories=categorias[coluna])
+
+    for coluna, dtype in COLUNAS_INTEIRAS.items():
+        valores = pd.to_numeric(registros[coluna], errors="coerce")
+        valores = valores.where((valores >= 0) & (valores <= np.iinfo(dtype).max))
+        colunas[coluna] = pd.array(valores.round(), dtype=dtype.capitalize())
+
+    for coluna in COLUNAS_COORDENADAS:
+        colunas[coluna] = pd.to_numeric(registros[coluna], errors="coerce").to_numpy().astype("float32")
+
+    invalidas = datas.isna().to_numpy()
+    for coluna, valores in colunas_derivadas(datas).items():
+        valores[invalidas] = -1
+        colunas[coluna] = valores
+    colunas["dia_semana"] = pd.Categorical.from_codes(
+        colunas["dia_semana"], dtype=pd.CategoricalDtype(DIAS_SEMANA), validate=False
+    )
+    return pd.DataFrame(colunas)[COLUNAS_PADRAO + COLUNAS_TEXTO], categorias
+
+
+class _BufferAnexos:
+    """Ocorrências novas em arrays com folga, cuja capacidade dobra quando enchem.
+
+    Cada coluna guarda a representação numpy do frame tipado: códigos nas
+    categóricas (com o dicionário mais recente) e valores + máscara nos
+    inteiros com ausentes. Anexar copia só as linhas do delta; `frame()` monta
+    um DataFrame sobre as primeiras `n` posições, sem copiar. Frames montados
+    antes continuam válidos: as linhas que eles veem não são regravadas.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_INICIAL):
+        self.n = 0
+        self.capacidade = capacidade
+        self._arrays = {}
+        self._tipos = {}
+
+    def anexar(self, delta):
+        necessaria = self.n + len(delta)
+        if necessaria > self.capacidade:
+            while self.capacidade < necessaria:
+                self.capacidade *= 2
+            self._arrays = {nome: _realocar(valores, self.capacidade) for nome, valores in self._arrays.items()}
+        for coluna in delta.columns:
+            serie = delta[coluna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                self._tipos[coluna] = serie.dtype
+                partes = {coluna: serie.cat.codes.to_numpy().astype(_tipo_codigos_pandas(len(serie.cat.categories)))}
+            elif isinstance(serie.dtype, pd.api.extensions.ExtensionDtype):
+                self._tipos[coluna] = serie.dtype
+                partes = {
+                    coluna: serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0),
+                    coluna + ".ausentes": serie.isna().to_numpy(),
+                }
+            else:
+                self._tipos[coluna] = serie.dtype
+                partes = {coluna: serie.to_numpy()}
+            for nome, valores in partes.items():
+                atual = self._arrays.get(nome)
+                if atual is None or atual.dtype != valores.dtype:
+                    # Coluna nova ou códigos que passaram a pedir um inteiro maior
+                    dtype = valores.dtype if atual is None else np.result_type(atual, valores)
+                    atual = self._arrays[nome] = _realocar(atual, self.capacidade, dtype)
+                atual[self.n:necessaria] = valores
+        self.n = necessaria
+
+    def frame(self, inicio):
+        """DataFrame (sem cópia) das linhas anexadas, com índice a partir de `inicio`."""
+        colunas = {}
+        for coluna, tipo in self._tipos.items():
+            valores = self._arrays[coluna][:self.n]
+            if isinstance(tipo, pd.CategoricalDtype):
+                colunas[coluna] = pd.Categorical.from_codes(valores, dtype=tipo, validate=False)
+            elif isinstance(tipo, pd.api.extensions.ExtensionDtype):
+                colunas[coluna] = pd.arrays.IntegerArray(valores, self._arrays[coluna + ".ausentes"][:self.n])
+            else:
+                colunas[coluna] = valores
+        return pd.DataFrame(colunas, index=pd.RangeIndex(inicio, inicio + self.n), copy=False)
+
+
+def _tipo_codigos_pandas(n_categorias):
+    # Mesmo tipo que o pandas escolhe para os códigos: assim o Categorical não os copia
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categorias < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _realocar(valores, capacidade, dtype=None):
+    novo = np.zeros(capacidade, dtype=dtype if dtype is not None else valores.dtype)
+    if valores is not None:
+        novo[:len(valores)] = valores
+    return novo
+
+
+class Ocorrencias:
+    """Frame analítico compartilhado em dois segmentos: base colunar + ocorrências novas.
+
+    A base vem do armazenamento colunar (memory-map, páginas compartilhadas
+    entre processos). As ocorrências cadastradas no app ficam no repositório
+    append-only e entram por deltas: `atualizar()` lê só as linhas com `seq`
+    maior que a última incorporada e as anexa ao buffer de `recentes`, sem
+    copiar a base. Os ids de linha são globais: os de `recentes` começam em
+    `len(base)`. Quando `recentes` passa de `FRACAO_CAUDA` da base (ou um delta
+    traz um valor novo numa coluna categórica) os dois segmentos são
+    compactados numa base nova e os índices são reconstruídos sobre ela.
+    As `estatisticas` gravadas na conversão recebem os mesmos deltas.
+    """
+
+    def __init__(self, caminho_csv=CAMINHO_CSV, repositorio=None):
+        base = carregar_ocorrencias(caminho_csv)
+        for coluna in COLUNAS_TEXTO:
+            base[coluna] = pd.Categorical.from_codes(
+                np.full(len(base), -1, dtype=np.int8), categories=pd.Index([], dtype=object)
+            )
+        # Os dois segmentos são publicados juntos, numa só atribuição
+        self._segmentos = (base, base.iloc[:0])
+        self._anexos = _BufferAnexos()
+        # Sem o arquivo (armazenamento antigo ou apagado) as estatísticas saem do frame, uma vez
+        self.estatisticas = estatisticas_da_fonte(caminho_csv) or EstatisticasOcorrencias().somar(base)
+        self.repositorio = repositorio
+        self.seq = 0
+        self._indices = {}
+        self._trava = threading.Lock()
+
+    @property
+    def base(self):
+        return self._segmentos[0]
+
+    @property
+    def recentes(self):
+        return self._segmentos[1]
+
+    @property
+    def n_linhas(self):
+        base, recentes = self._segmentos
+        return len(base) + len(recentes)
+
+    def categorias(self, coluna):
+        """Dicionário atual de uma coluna categórica (o da base é um prefixo dele)."""
+        return self.recentes[coluna].cat.categories
+
+    def atualizar(self):
+        """Incorpora as ocorrências gravadas desde a última chamada."""
+        if self.repositorio is None:
+            return
+        with self._trava:
+            if self.repositorio.ultimo_seq() > self.seq:
+                novos = self.repositorio.ler_desde(self.seq)
+                if not novos.empty:
+                    self._mesclar(novos)
+
+    def _mesclar(self, novos):
+        base, recentes = self._segmentos
+        categorias = {
+            coluna: recentes[coluna].cat.categories.tolist() for coluna in COLUNAS_CATEGORICAS + COLUNAS_TEXTO
+        }
+        delta, categorias = tipar_registros(novos, categorias)
+        self._anexos.anexar(delta)
+        novas_categorias = any(
+            len(categorias[coluna]) != len(base[coluna].cat.categories) for coluna in COLUNAS_CATEGORICAS
+        )
+        if novas_categorias or self._anexos.n > FRACAO_CAUDA * max(len(base), 1):
+            self._compactar()
+        else:
+            self._segmentos = (base, self._anexos.frame(len(base)))
+        # Nova instância: as páginas que já leram as estatísticas continuam com a anterior inteira
+        self.estatisticas = self.estatisticas.somado(delta)
+        self.seq = int(novos["seq"].max())
+
+    def _compactar(self):
+        # Única cópia da base: amortizada sobre FRACAO_CAUDA x base linhas anexadas
+        base = _juntar(self.base, self._anexos.frame(len(self.base)))
+        self._segmentos = (base, base.iloc[:0])
+        self._anexos = _BufferAnexos()
+        self._indices = {}
+
+    def linhas(self, ids=None):
+        """Linhas do frame pelos ids globais ordenados de um índice (None = todas as linhas).
+
+        Sem ocorrências novas, None devolve a própria base, sem cópia; com
+        elas, os dois segmentos são juntados nessa chamada.
+        """
+        base, recentes = self._segmentos
+        if ids is None:
+            return base if recentes.empty else _juntar(base, recentes)
+        # Ids além do fim vêm de um índice mais novo que os segmentos lidos
+        ids = ids[:np.searchsorted(ids, len(base) + len(recentes))]
+        corte = np.searchsorted(ids, len(base))
+        if corte == len(ids):
+            return base.take(ids)
+        return _juntar(base.take(ids[:corte]), recentes.take(ids[corte:] - len(base)))
+
+    def indice(self, tipo):
+        """Índice derivado do frame (ex.: `IndiceFiltros`), construído uma vez por base.
+
+        O índice é criado com `tipo(base)` sobre a base; depois de um delta,
+        `atualizado(recentes)` recebe o segmento inteiro de ocorrências novas
+        (ids a partir de `len(base)`) e devolve um índice novo, estendido só com
+        as linhas que ainda não foram vistas. Um índice publicado nunca muda:
+        quem já o obteve continua consultando a mesma versão, sem trava,
+        enquanto a versão nova substitui a anterior aqui. Uma compactação
+        descarta os índices, refeitos sobre a base nova.
+        """
+        with self._trava:
+            base, recentes = self._segmentos
+            indice = self._indices.get(tipo)
+            if indice is None:
+                indice = tipo(base)
+            if indice.n_linhas != len(base) + len(recentes):
+                indice = indice.atualizado(recentes)
+            self._indices[tipo] = indice
+            return indice
+
+
+def _juntar(base, recentes):
+    # Os dicionários de `recentes` estendem os da base (categorias novas no fim);
+    # com o mesmo dicionário nos dois lados a coluna continua categórica
+    base = base.copy(deep=False)
+    for coluna in base.columns:
+        tipo = recentes[coluna].dtype
+        if isinstance(tipo, pd.CategoricalDtype) and base[coluna].dtype != tipo:
+            base[coluna] = base[coluna].cat.set_categories(tipo.categories)
+    return pd.concat([base, recentes])
+
+
+_compartilhadas = {}
+_trava_compartilhadas = threading.Lock()
+
+
+def ocorrencias_compartilhadas(caminho_csv=CAMINHO_CSV, caminho_banco=CAMINHO_BANCO):
+    """Instância única de `Ocorrencias` por processo, usada por todas as páginas."""
+    chave = (caminho_csv, caminho_banco)
+    with _trava_compartilhadas:
+        if chave not in _compartilhadas:
+            _compartilhadas[chave] = Ocorrencias(caminho_csv, RepositorioOcorrencias(caminho_banco))
+        return _compartilhadas[chave]
+
+
+def contagem_valores(serie):
+    """value_counts sem as categorias de contagem zero e com índice de texto.
+
+    Em colunas categóricas o value_counts do pandas lista todas as categorias,
+    inclusive as que não aparecem no recorte filtrado.
+    """
+    contagem = serie.value_counts()
+    contagem = contagem[contagem > 0]
+    contagem.index = contagem.index.astype(str)
+    return contagem
@@ -0,0 +1,340 @@
+"""Agregação e consultas espaciais das ocorrências.
+
+Os mapas de calor não recebem mais um ponto por ocorrência: as coordenadas são
+agrupadas, de forma vetorizada, em uma grade regular de latitude/longitude e
+cada célula vira um único ponto (centroide das ocorrências da célula) com peso
+igual à contagem. O tamanho do que vai para o navegador depende do número de
+células, não do número de ocorrências.
+
+Cada nível de detalhe é um tamanho de célula; se um recorte ainda gerar células
+demais, a grade é engrossada até caber em `MAX_CELULAS`.
+
+As consultas de proximidade (raio, polígono, mais próximas) usam
+`IndiceEspacial`, uma grade uniforme com os ids de linha agrupados por célula:
+só as células que tocam a área consultada são lidas e a distância exata
+(haversine) é calculada apenas para esses candidatos.
+
+`GradeRisco` cobre a área da delegacia com uma grade regular (centro e bairro
+de cada célula), pontuada pelo modelo para o mapa de risco previsto.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+# Tamanho da célula em graus (1 grau de latitude ~ 111 km)
+NIVEIS_DETALHE = {
+    "Cidade (~1 km)": 0.01,
+    "Bairro (~250 m)": 0.0025,
+    "Rua (~50 m)": 0.0005,
+}
+NIVEL_PADRAO = "Bairro (~250 m)"
+MAX_CELULAS = 20000
+# Acima deste número de células possíveis na caixa dos dados, a contagem usa
+# np.unique em vez de um bincount denso
+MAX_CELULAS_DENSAS = 1 << 22
+
+# Célula do índice espacial em graus (~550 m de latitude)
+PASSO_INDICE = 0.005
+RAIO_TERRA_M = 6_371_008.8
+METROS_POR_GRAU = RAIO_TERRA_M * np.pi / 180
+# Células pontuadas pelo modelo na superfície de risco (uma chamada de predict_proba)
+MAX_CELULAS_RISCO = 2500
+# Quantis das coordenadas que delimitam a caixa da grade de risco
+QUANTIL_CAIXA = 0.005
+
+
+def coordenadas_validas(df):
+    """Latitudes e longitudes (float64) das linhas com as duas coordenadas."""
+    latitudes = df["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+    longitudes = df["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+    validas = ~(np.isnan(latitudes) | np.isnan(longitudes))
+    return latitudes[validas], longitudes[validas]
+
+
+def agregar_pontos(latitudes, longitudes, passo, max_celulas=MAX_CELULAS):
+    """Centroides e contagens das células de `passo` graus que têm ocorrências.
+
+    Devolve um DataFrame com latitude, longitude (centroide das ocorrências da
+    célula) e peso (contagem), ordenado do maior peso para o menor.
+    """
+    if len(latitudes) == 0:
+        return pd.DataFrame({
+            "latitude": np.empty(0), "longitude": np.empty(0), "peso": np.empty(0, dtype=np.int64)
+        })
+
+    while True:
+        linhas = np.floor(latitudes / passo).astype(np.int64)
+        colunas = np.floor(longitudes / passo).astype(np.int64)
+        linhas -= linhas.min()
+        colunas -= colunas.min()
+        largura = int(colunas.max()) + 1
+        chaves = linhas * largura + colunas
+        possiveis = (int(linhas.max()) + 1) * largura
+
+        if possiveis <= MAX_CELULAS_DENSAS:
+            # Caixa pequena: as próprias chaves indexam as somas por célula
+            contagem = np.bincount(chaves, minlength=possiveis)
+            ocupadas = np.flatnonzero(contagem)
+            contagem = contagem[ocupadas]
+        else:
+            ocupadas, chaves, contagem = np.unique(chaves, return_inverse=True, return_counts=True)
+            possiveis = len(ocupadas)
+            ocupadas = np.arange(possiveis)
+
+        if len(ocupadas) <= max_celulas:
+            break
+        passo *= 2
+
+    soma_latitudes = np.bincount(chaves, weights=latitudes, minlength=possiveis)[ocupadas]
+    soma_longitudes = np.bincount(chaves, weights=longitudes, minlength=possiveis)[ocupadas]
+    celulas = pd.DataFrame({
+        "latitude": soma_latitudes / contagem,
+        "longitude": soma_longitudes / contagem,
+        "peso": contagem.astype(np.int64),
+    })
+    return celulas.sort_values("peso", ascending=False, ignore_index=True)
+
+
+def agregar_frame(df, nivel=NIVEL_PADRAO, max_celulas=MAX_CELULAS):
+    """Células do mapa de calor para as ocorrências de `df` no nível de detalhe dado."""
+    latitudes, longitudes = coordenadas_validas(df)
+    return agregar_pontos(latitudes, longitudes, NIVEIS_DETALHE[nivel], max_celulas)
+
+
+def centro(celulas):
+    """Centro do mapa: média das ocorrências (centroides ponderados pela contagem)."""
+    return [
+        float(np.average(celulas["latitude"], weights=celulas["peso"])),
+        float(np.average(celulas["longitude"], weights=celulas["peso"])),
+    ]
+
+
+def distancia_metros(latitude, longitude, latitudes, longitudes):
+    """Distância haversine (m) de um ponto a vários pontos."""
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def dentro_poligono(poligono, latitudes, longitudes):
+    """Máscara dos pontos dentro de `poligono` (lista de (lat, lon)), pela regra par-ímpar."""
+    vertices = np.asarray(poligono, dtype=np.float64)
+    dentro = np.zeros(len(latitudes), dtype=bool)
+    for (lat_a, lon_a), (lat_b, lon_b) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        cruza = (lat_a > latitudes) != (lat_b > latitudes)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            longitude_corte = lon_a + (latitudes - lat_a) * (lon_b - lon_a) / (lat_b - lat_a)
+        dentro ^= cruza & (longitudes < longitude_corte)
+    return dentro
+
+
+class IndiceEspacial:
+    """Grade uniforme sobre latitude/longitude para consultas de proximidade.
+
+    Os ids das linhas com coordenadas ficam ordenados pela chave da célula
+    (formato CSR: chaves únicas + início de cada uma na permutação). Linhas que
+    chegam depois da construção ficam numa cauda verificada por varredura, até
+    a compactação do frame reconstruir o índice.
+    """
+
+    def __init__(self, base, passo=PASSO_INDICE):
+        self.passo = passo
+        self.n_linhas = self.n_indexado = len(base)
+        latitudes = base["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        longitudes = base["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # Coordenadas em dois segmentos: base (indexada) e cauda (linhas novas)
+        self.coordenadas = (latitudes, longitudes, latitudes[:0], longitudes[:0])
+        validas = np.flatnonzero(~(np.isnan(latitudes) | np.isnan(longitudes)))
+        chaves = self._chaves(latitudes[validas], longitudes[validas])
+        ordem = np.argsort(chaves, kind="stable")
+        self.ordem = validas[ordem]
+        self.chaves, self.inicios = np.unique(chaves[ordem], return_index=True)
+        self.inicios = np.append(self.inicios, len(ordem))
+
+    def atualizado(self, recentes):
+        """Índice novo com o segmento de ocorrências novas (ids a partir de `n_indexado`); este não muda."""
+        latitudes, longitudes = self.coordenadas[:2]
+        novo = copy.copy(self)
+        novo.coordenadas = (
+            latitudes,
+            longitudes,
+            recentes["latitude"].to_numpy(dtype=np.float64, na_value=np.nan),
+            recentes["longitude"].to_numpy(dtype=np.float64, na_value=np.nan),
+        )
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    def _ler(self, ids):
+        # Latitudes e longitudes nos ids globais, lidas da base ou da cauda
+        latitudes, longitudes, latitudes_cauda, longitudes_cauda = self.coordenadas
+        na_base = ids < self.n_indexado
+        if na_base.all():
+            return latitudes[ids], longitudes[ids]
+        y = np.empty(len(ids))
+        x = np.empty(len(ids))
+        y[na_base], x[na_base] = latitudes[ids[na_base]], longitudes[ids[na_base]]
+        cauda = ids[~na_base] - self.n_indexado
+        y[~na_base], x[~na_base] = latitudes_cauda[cauda], longitudes_cauda[cauda]
+        return y, x
+
+    def _chaves(self, latitudes, longitudes):
+        linhas = np.floor(latitudes / self.passo).astype(np.int64)
+        colunas = np.floor(longitudes / self.passo).astype(np.int64)
+        return (linhas << 32) + (colunas + (1 << 31))
+
+    def _candidatos(self, lat_min, lat_max, lon_min, lon_max):
+        # Ids das células que tocam a caixa + a cauda inteira (ainda sem células)
+        cauda = np.arange(self.n_indexado, self.n_linhas)
+        n_linhas = np.floor(lat_max / self.passo) - np.floor(lat_min / self.passo) + 1
+        n_colunas = np.floor(lon_max / self.passo) - np.floor(lon_min / self.passo) + 1
+        if n_linhas * n_colunas > len(self.chaves):
+            # Caixa com mais células que as ocupadas: todas as linhas são candidatas
+            return np.concatenate([self.ordem, cauda])
+
+        linhas = np.arange(np.floor(lat_min / self.passo), np.floor(lat_max / self.passo) + 1, dtype=np.int64)
+        colunas = np.arange(np.floor(lon_min / self.passo), np.floor(lon_max / self.passo) + 1, dtype=np.int64)
+        chaves = ((linhas[:, None] << 32) + (colunas[None, :] + (1 << 31))).ravel()
+        posicoes = np.searchsorted(self.chaves, chaves)
+        existentes = posicoes < len(self.chaves)
+        existentes[existentes] = self.chaves[posicoes[existentes]] == chaves[existentes]
+        partes = [self.ordem[self.inicios[i]:self.inicios[i + 1]] for i in posicoes[existentes]]
+        partes.append(cauda)
+        return np.concatenate(partes)
+
+    # --- Consultas ---
+
+    def no_raio(self, latitude, longitude, raio_m):
+        """Ids (ordenados) e distâncias (m) das ocorrências a até `raio_m` do ponto."""
+        delta_lat = raio_m / METROS_POR_GRAU
+        delta_lon = raio_m / (METROS_POR_GRAU * max(np.cos(np.radians(latitude)), 1e-6))
+        ids = self._candidatos(latitude - delta_lat, latitude + delta_lat, longitude - delta_lon, longitude + delta_lon)
+        distancias = distancia_metros(latitude, longitude, *self._ler(ids))
+        # Linhas da cauda sem coordenadas dão distância NaN e ficam de fora
+        dentro = distancias <= raio_m
+        ids, distancias = ids[dentro], distancias[dentro]
+        ordem = np.argsort(ids)
+        return ids[ordem], distancias[ordem]
+
+    def no_poligono(self, poligono):
+        """Ids (ordenados) das ocorrências dentro do polígono [(lat, lon), ...]."""
+        vertices = np.asarray(poligono, dtype=np.float64)
+        ids = self._candidatos(
+            vertices[:, 0].min(), vertices[:, 0].max(), vertices[:, 1].min(), vertices[:, 1].max()
+        )
+        ids = ids[dentro_poligono(vertices, *self._ler(ids))]
+        return np.sort(ids)
+
+    def mais_proximas(self, latitude, longitude, k=10):
+        """Ids e distâncias das `k` ocorrências mais próximas, da mais perto à mais longe."""
+        raio = self.passo * METROS_POR_GRAU
+        _, _, latitudes_cauda, longitudes_cauda = self.coordenadas
+        total_com_coordenadas = len(self.ordem) + int(
+            (~(np.isnan(latitudes_cauda) | np.isnan(longitudes_cauda))).sum()
+        )
+        while True:
+            ids, distancias = self.no_raio(latitude, longitude, raio)
+            # Com k ou mais ocorrências dentro do círculo, as k mais próximas estão nele
+            if len(ids) >= min(k, total_com_coordenadas) or raio > np.pi * RAIO_TERRA_M:
+                break
+            raio *= 2
+        ordem = np.argsort(distancias, kind="stable")[:k]
+        return ids[ordem], distancias[ordem]
+
+
+class GradeRisco:
+    """Grade regular de latitude/longitude cobrindo a área da delegacia, para a superfície de risco.
+
+    A caixa da grade vai dos quantis `QUANTIL_CAIXA` a 1 - `QUANTIL_CAIXA` das
+    coordenadas (pontos isolados não esticam a área). Cada célula recebe o
+    bairro com mais ocorrências dentro dela; células sem ocorrências ficam com
+    o bairro de centro (média das coordenadas) mais próximo. As grades são
+    guardadas por tamanho de célula e só refeitas quando a compactação do frame
+    reconstrói a grade: poucas ocorrências novas quase não mudam o bairro das
+    células.
+    """
+
+    def __init__(self, base):
+        self.n_linhas = self.n_indexado = len(base)
+        latitudes = base["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        longitudes = base["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+        validas = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self.latitudes, self.longitudes = latitudes[validas], longitudes[validas]
+        self.codigos = base["bairro"].cat.codes.to_numpy().astype(np.int64)[validas]
+        self.bairros = base["bairro"].cat.categories
+        self.caixa = None
+        if len(self.latitudes):
+            lat_min, lat_max = np.quantile(self.latitudes, [QUANTIL_CAIXA, 1 - QUANTIL_CAIXA])
+            lon_min, lon_max = np.quantile(self.longitudes, [QUANTIL_CAIXA, 1 - QUANTIL_CAIXA])
+            self.caixa = (lat_min, lat_max, lon_min, lon_max)
+        self._grades = {}
+
+    def atualizado(self, recentes):
+        # Poucas ocorrências novas quase não mudam o bairro das células: a grade
+        # (e as já montadas, compartilhadas) segue a da base até a compactação do frame
+        novo = copy.copy(self)
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    def celulas(self, passo, max_celulas=MAX_CELULAS_RISCO):
+        """DataFrame com latitude e longitude do centro e bairro de cada célula da grade.
+
+        Também traz a contagem histórica de ocorrências da célula. O passo
+        (graus) dobra até a grade caber em `max_celulas`; o passo usado fica em
+        `celulas.attrs["passo"]`.
+        """
+        chave = (passo, max_celulas)
+        if chave not in self._grades:
+            self._grades[chave] = self._montar(passo, max_celulas)
+        return self._grades[chave]
+
+    def _montar(self, passo, max_celulas):
+        if self.caixa is None or not len(self.bairros):
+            celulas = pd.DataFrame({"latitude": np.empty(0), "longitude": np.empty(0), "bairro": []})
+            celulas.attrs["passo"] = passo
+            return celulas
+        lat_min, lat_max, lon_min, lon_max = self.caixa
+        while True:
+            n_linhas = int(np.floor((lat_max - lat_min) / passo)) + 1
+            n_colunas = int(np.floor((lon_max - lon_min) / passo)) + 1
+            if n_linhas * n_colunas <= max_celulas:
+                break
+            passo *= 2
+
+        # Bairro predominante: contagem por (célula, bairro) das ocorrências na caixa
+        linhas = np.floor((self.latitudes - lat_min) / passo).astype(np.int64)
+        colunas = np.floor((self.longitudes - lon_min) / passo).astype(np.int64)
+        na_caixa = (linhas >= 0) & (linhas < n_linhas) & (colunas >= 0) & (colunas < n_colunas) & (self.codigos >= 0)
+        n_bairros = len(self.bairros)
+        chaves = (linhas[na_caixa] * n_colunas + colunas[na_caixa]) * n_bairros + self.codigos[na_caixa]
+        contagem = np.bincount(chaves, minlength=n_linhas * n_colunas * n_bairros).reshape(-1, n_bairros)
+        bairro_celula = contagem.argmax(axis=1)
+
+        latitudes = np.repeat(lat_min + (np.arange(n_linhas) + 0.5) * passo, n_colunas)
+        longitudes = np.tile(lon_min + (np.arange(n_colunas) + 0.5) * passo, n_linhas)
+        vazias = contagem.sum(axis=1) == 0
+        if vazias.any():
+            # Bairro de centro mais próximo (distância em graus, longitude corrigida pela latitude)
+            com_bairro = self.codigos >= 0
+            ocorrencias = np.bincount(self.codigos[com_bairro], minlength=n_bairros)
+            centros_lat = np.bincount(self.codigos[com_bairro], weights=self.latitudes[com_bairro], minlength=n_bairros)
+            centros_lon = np.bincount(self.codigos[com_bairro], weights=self.longitudes[com_bairro], minlength=n_bairros)
+            existentes = np.flatnonzero(ocorrencias)
+            centros_lat = centros_lat[existentes] / ocorrencias[existentes]
+            centros_lon = centros_lon[existentes] / ocorrencias[existentes]
+            escala = np.cos(np.radians((lat_min + lat_max) / 2))
+            distancias = (
+                (latitudes[vazias, None] - centros_lat[None, :]) ** 2
+                + ((longitudes[vazias, None] - centros_lon[None, :]) * escala) ** 2
+            )
+            bairro_celula[vazias] = existentes[distancias.argmin(axis=1)]
+
+        celulas = pd.DataFrame({
+            "latitude": latitudes,
+            "longitude": longitudes,
+            "bairro": np.asarray(self.bairros.astype(str))[bairro_celula],
+            "ocorrencias": contagem.sum(axis=1),
+        })
+        celulas.attrs["passo"] = passo
+        return celulas
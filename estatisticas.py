@@ -0,0 +1,233 @@
+"""Estatísticas do dataset gravadas junto do armazenamento colunar.
+
+A conversão do CSV (`dados.converter_para_colunar`) soma cada bloco a um
+`EstatisticasOcorrencias` e grava o resultado em `estatisticas.json`, ao lado
+do meta.json. O arquivo guarda:
+
+- total de linhas e período coberto (data mínima e máxima, datas nulas);
+- dicionário de valores distintos com frequência de cada coluna categórica;
+- período (primeira e última ocorrência) de cada bairro;
+- faixa (mínimo, máximo) das colunas numéricas usadas em sliders e somas para
+  as médias das coordenadas.
+
+O frame compartilhado carrega o arquivo junto com a base e soma a ele cada
+delta do repositório, então as métricas da home e as opções dos filtros das
+páginas saem daqui sem ler as linhas.
+"""
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+ARQUIVO_ESTATISTICAS = "estatisticas.json"
+COLUNAS_FREQUENCIA = [
+    "bairro",
+    "tipo_crime",
+    "descricao_modus_operandi",
+    "arma_utilizada",
+    "sexo_suspeito",
+    "orgao_responsavel",
+    "status_investigacao",
+    "dia_semana",
+]
+COLUNAS_FAIXA = ["idade_suspeito"]
+COLUNAS_MEDIA = ["latitude", "longitude"]
+
+_SEM_DATA = np.iinfo(np.int64).max
+
+
+class EstatisticasOcorrencias:
+    def __init__(self):
+        self.linhas = 0
+        self.datas_nulas = 0
+        # Datas em ns (int64), None enquanto não há data válida
+        self.data_minima = None
+        self.data_maxima = None
+        self.frequencias = {coluna: {} for coluna in COLUNAS_FREQUENCIA}
+        self.nulos = dict.fromkeys(COLUNAS_FREQUENCIA, 0)
+        self.periodos_bairro = {}
+        self.faixas = dict.fromkeys(COLUNAS_FAIXA)
+        self.somas = {coluna: [0.0, 0] for coluna in COLUNAS_MEDIA}
+
+    # --- Acumulação ---
+
+    def somar(self, df):
+        """Soma as linhas de `df` (frame tipado ou bloco da conversão) às estatísticas."""
+        self.linhas += len(df)
+        datas = df["data_ocorrencia"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        validas = datas != np.iinfo(np.int64).min
+        self.datas_nulas += int(len(datas) - validas.sum())
+        if validas.any():
+            self._estender_periodo(int(datas[validas].min()), int(datas[validas].max()))
+
+        for coluna in COLUNAS_FREQUENCIA:
+            if coluna not in df.columns:
+                continue
+            valores = df[coluna].cat
+            contagens = np.bincount(valores.codes.to_numpy().astype(np.int64) + 1, minlength=len(valores.categories) + 1)
+            self.nulos[coluna] += int(contagens[0])
+            frequencias = self.frequencias[coluna]
+            for posicao in np.flatnonzero(contagens[1:]):
+                valor = str(valores.categories[posicao])
+                frequencias[valor] = frequencias.get(valor, 0) + int(contagens[posicao + 1])
+
+        # Primeira e última data de cada bairro, pelo código da categoria
+        bairros = df["bairro"].cat
+        codigos = bairros.codes.to_numpy().astype(np.int64)
+        com_bairro = validas & (codigos >= 0)
+        minimas = np.full(len(bairros.categories), _SEM_DATA, dtype=np.int64)
+        maximas = np.full(len(bairros.categories), np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(minimas, codigos[com_bairro], datas[com_bairro])
+        np.maximum.at(maximas, codigos[com_bairro], datas[com_bairro])
+        for posicao in np.flatnonzero(minimas != _SEM_DATA):
+            bairro = str(bairros.categories[posicao])
+            atual = self.periodos_bairro.get(bairro)
+            inicio, fim = int(minimas[posicao]), int(maximas[posicao])
+            self.periodos_bairro[bairro] = [inicio, fim] if atual is None else [min(atual[0], inicio), max(atual[1], fim)]
+
+        for coluna in COLUNAS_FAIXA:
+            valores = _numeros(df[coluna])
+            # Na conversão os inteiros ausentes chegam como -1
+            valores = valores[~np.isnan(valores) & (valores >= 0)]
+            if len(valores):
+                self._estender_faixa(coluna, float(valores.min()), float(valores.max()))
+
+        for coluna in COLUNAS_MEDIA:
+            valores = _numeros(df[coluna])
+            valores = valores[~np.isnan(valores)]
+            self.somas[coluna][0] += float(valores.sum(dtype=np.float64))
+            self.somas[coluna][1] += len(valores)
+        return self
+
+    def somado(self, df):
+        """Cópia com as linhas de `df` somadas; a instância atual não muda (leitores concorrentes)."""
+        return copy.deepcopy(self).somar(df)
+
+    def juntar(self, outra):
+        """Soma as estatísticas de outra parte do dataset (ex.: outra partição)."""
+        self.linhas += outra.linhas
+        self.datas_nulas += outra.datas_nulas
+        if outra.data_minima is not None:
+            self._estender_periodo(outra.data_minima, outra.data_maxima)
+        for coluna in COLUNAS_FREQUENCIA:
+            self.nulos[coluna] += outra.nulos[coluna]
+            for valor, contagem in outra.frequencias[coluna].items():
+                self.frequencias[coluna][valor] = self.frequencias[coluna].get(valor, 0) + contagem
+        for bairro, (inicio, fim) in outra.periodos_bairro.items():
+            atual = self.periodos_bairro.get(bairro)
+            self.periodos_bairro[bairro] = [inicio, fim] if atual is None else [min(atual[0], inicio), max(atual[1], fim)]
+        for coluna, faixa in outra.faixas.items():
+            if faixa is not None:
+                self._estender_faixa(coluna, *faixa)
+        for coluna, (soma, contagem) in outra.somas.items():
+            self.somas[coluna][0] += soma
+            self.somas[coluna][1] += contagem
+        return self
+
+    def _estender_periodo(self, inicio, fim):
+        self.data_minima = inicio if self.data_minima is None else min(self.data_minima, inicio)
+        self.data_maxima = fim if self.data_maxima is None else max(self.data_maxima, fim)
+
+    def _estender_faixa(self, coluna, minimo, maximo):
+        atual = self.faixas[coluna]
+        self.faixas[coluna] = [minimo, maximo] if atual is None else [min(atual[0], minimo), max(atual[1], maximo)]
+
+    # --- Consulta ---
+
+    def periodo(self):
+        """Datas (Timestamp) da ocorrência mais antiga e da mais recente, ou None."""
+        if self.data_minima is None:
+            return None
+        return pd.Timestamp(self.data_minima), pd.Timestamp(self.data_maxima)
+
+    def periodo_bairro(self, bairro):
+        """Datas (Timestamp) da primeira e da última ocorrência do bairro, ou None."""
+        periodo = self.periodos_bairro.get(bairro)
+        if periodo is None:
+            return None
+        return pd.Timestamp(periodo[0]), pd.Timestamp(periodo[1])
+
+    def valores(self, coluna):
+        """Valores distintos (não nulos) da coluna em ordem alfabética."""
+        return sorted(self.frequencias[coluna])
+
+    def n_distintos(self, coluna):
+        return len(self.frequencias[coluna])
+
+    def contagens(self, coluna):
+        """Frequência de cada valor da coluna, da maior para a menor."""
+        frequencias = self.frequencias[coluna]
+        return pd.Series(frequencias, dtype="int64").sort_values(ascending=False, kind="stable")
+
+    def faixa(self, coluna):
+        """(mínimo, máximo) da coluna numérica, ou None sem valores."""
+        faixa = self.faixas[coluna]
+        return None if faixa is None else tuple(faixa)
+
+    def media(self, coluna):
+        soma, contagem = self.somas[coluna]
+        return soma / contagem if contagem else float("nan")
+
+    # --- Arquivo ---
+
+    def para_dict(self):
+        return {
+            "linhas": self.linhas,
+            "datas": {
+                "minima": _texto_data(self.data_minima),
+                "maxima": _texto_data(self.data_maxima),
+                "nulas": self.datas_nulas,
+            },
+            "frequencias": self.frequencias,
+            "nulos": self.nulos,
+            "periodos_bairro": {
+                bairro: [_texto_data(inicio), _texto_data(fim)] for bairro, (inicio, fim) in self.periodos_bairro.items()
+            },
+            "faixas": self.faixas,
+            "somas": self.somas,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        estatisticas = cls()
+        estatisticas.linhas = dados["linhas"]
+        estatisticas.data_minima = _data_ns(dados["datas"]["minima"])
+        estatisticas.data_maxima = _data_ns(dados["datas"]["maxima"])
+        estatisticas.datas_nulas = dados["datas"]["nulas"]
+        estatisticas.frequencias.update(dados["frequencias"])
+        estatisticas.nulos.update(dados["nulos"])
+        estatisticas.periodos_bairro = {
+            bairro: [_data_ns(inicio), _data_ns(fim)] for bairro, (inicio, fim) in dados["periodos_bairro"].items()
+        }
+        estatisticas.faixas.update(dados["faixas"])
+        estatisticas.somas.update(dados["somas"])
+        return estatisticas
+
+    def gravar(self, destino):
+        temporario = os.path.join(destino, ARQUIVO_ESTATISTICAS + ".tmp")
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(self.para_dict(), f, ensure_ascii=False)
+        os.replace(temporario, os.path.join(destino, ARQUIVO_ESTATISTICAS))
+
+
+def ler_estatisticas(destino):
+    """Estatísticas gravadas em `destino`, ou None se o arquivo não existe."""
+    try:
+        with open(os.path.join(destino, ARQUIVO_ESTATISTICAS), encoding="utf-8") as f:
+            return EstatisticasOcorrencias.de_dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def _numeros(serie):
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _texto_data(valor):
+    return None if valor is None else str(pd.Timestamp(valor))
+
+
+def _data_ns(texto):
+    return None if texto is None else pd.Timestamp(texto).value
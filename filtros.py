@@ -0,0 +1,308 @@
+"""Motor de filtros por índice para as páginas do app.
+
+Em vez de montar uma máscara booleana por coluna a cada mudança de widget, o
+índice é construído uma vez por versão do frame:
+
+- colunas categóricas: lista invertida por valor (ids de linha ordenados,
+  guardados em formato CSR sobre os códigos da categoria);
+- colunas numéricas de intervalo (idade_suspeito, hora_dia): índice ordenado
+  (valores ordenados + permutação), consultado com busca binária;
+- data_ocorrencia: índice temporal ordenado (datetime64 em ns + permutação);
+  um período é localizado com duas buscas binárias e vira uma fatia.
+
+Uma consulta estima o tamanho de cada filtro, gera os ids candidatos a partir
+do mais seletivo e só verifica os demais filtros nesses candidatos. O custo
+fica proporcional ao tamanho do menor filtro, não ao número de linhas.
+
+Um conjunto de ids já calculado por outro índice (a busca textual de
+`busca.IndiceTexto`) entra na mesma consulta como mais um filtro.
+
+O índice é construído sobre a base do frame (`dados.Ocorrencias`); as linhas
+que chegam depois (segmento de ocorrências novas) ficam numa cauda verificada
+por varredura, até a compactação do frame reconstruir o índice.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+COLUNAS_CATEGORICAS_INDEXADAS = [
+    "bairro",
+    "tipo_crime",
+    "arma_utilizada",
+    "sexo_suspeito",
+    "dia_semana",
+    "orgao_responsavel",
+    "status_investigacao",
+]
+COLUNAS_INTERVALO_INDEXADAS = ["idade_suspeito", "hora_dia"]
+COLUNA_DATA = "data_ocorrencia"
+
+# Acima desta fração de linhas candidatas, uma varredura vetorizada sai mais barata
+FRACAO_VARREDURA = 0.5
+NULO_ORDENADO = np.iinfo(np.int16).max
+# NaT visto como int64; fica no começo do índice temporal, antes de qualquer período
+DATA_NULA = np.iinfo(np.int64).min
+UM_DIA_NS = 86_400 * 10**9
+
+# Opções de período das páginas (dias contados a partir da ocorrência mais recente)
+PERIODOS = {
+    "Todo o histórico": None,
+    "Últimos 7 dias": 7,
+    "Últimos 30 dias": 30,
+    "Últimos 90 dias": 90,
+    "Intervalo personalizado": None,
+}
+
+
+class IndiceFiltros:
+    def __init__(self, base):
+        self.n_linhas = self.n_indexado = len(base)
+        self.categorias = {c: base[c].cat.categories for c in COLUNAS_CATEGORICAS_INDEXADAS}
+        # Colunas lidas na verificação: (base, cauda); a cauda só tem as linhas novas
+        self.codigos = {c: _sem_cauda(base[c].cat.codes.to_numpy()) for c in COLUNAS_CATEGORICAS_INDEXADAS}
+        self.valores = {c: _sem_cauda(_valores_intervalo(base[c])) for c in COLUNAS_INTERVALO_INDEXADAS}
+        self.datas = _sem_cauda(base[COLUNA_DATA].to_numpy(dtype="datetime64[ns]").view(np.int64))
+        self._resumo_base = _resumo({c: v[0] for c, v in self.valores.items()}, self.datas[0])
+        self._resumir()
+
+        self.listas = {}
+        for coluna in COLUNAS_CATEGORICAS_INDEXADAS:
+            # Deslocamento de +1 para o código -1 (nulo) virar a posição 0
+            # (int16 deixa o argsort estável usar radix sort)
+            codigos = self.codigos[coluna][0].astype(np.int16) + 1
+            ordem = np.argsort(codigos, kind="stable")
+            inicios = np.searchsorted(codigos[ordem], np.arange(len(self.categorias[coluna]) + 2))
+            self.listas[coluna] = (ordem, inicios)
+
+        self.ordenados = {}
+        for coluna in COLUNAS_INTERVALO_INDEXADAS:
+            # Valores inteiros pequenos (idade, hora): ordenados como int16, com os
+            # nulos no maior valor possível, fora de qualquer intervalo consultado
+            valores = self.valores[coluna][0]
+            inteiros = np.where(np.isnan(valores), NULO_ORDENADO, valores).astype(np.int16)
+            ordem = np.argsort(inteiros, kind="stable")
+            self.ordenados[coluna] = (inteiros[ordem], ordem)
+
+        datas = self.datas[0]
+        ordem = np.argsort(datas, kind="stable")
+        self.datas_ordenadas = (datas[ordem], ordem)
+
+    def _resumir(self):
+        # Extremos e presença de nulos, usados para descartar filtros que não
+        # restringem; os da base são calculados uma vez e combinados com os da cauda
+        resumos = [self._resumo_base, _resumo({c: v[1] for c, v in self.valores.items()}, self.datas[1])]
+        self.sem_nulos, self.extremos = {}, {}
+        for coluna in COLUNAS_INTERVALO_INDEXADAS:
+            self.sem_nulos[coluna] = all(r["sem_nulos"][coluna] for r in resumos)
+            extremos = [r["extremos"][coluna] for r in resumos if r["extremos"][coluna] is not None]
+            self.extremos[coluna] = (
+                (min(e[0] for e in extremos), max(e[1] for e in extremos)) if extremos else (0, 0)
+            )
+        self.datas_sem_nulos = all(r["datas_sem_nulos"] for r in resumos)
+        extremos = [r["extremos_datas"] for r in resumos if r["extremos_datas"] is not None]
+        self.extremos_datas = (min(e[0] for e in extremos), max(e[1] for e in extremos)) if extremos else None
+
+    def atualizado(self, recentes):
+        """Índice novo com o segmento de ocorrências novas (ids a partir de `n_indexado`).
+
+        As estruturas da base são compartilhadas; esta instância não muda.
+        """
+        novo = copy.copy(self)
+        novo.n_linhas = self.n_indexado + len(recentes)
+        novo.codigos = {c: (base, recentes[c].cat.codes.to_numpy()) for c, (base, _) in self.codigos.items()}
+        novo.valores = {c: (base, _valores_intervalo(recentes[c])) for c, (base, _) in self.valores.items()}
+        novo.datas = (self.datas[0], recentes[COLUNA_DATA].to_numpy(dtype="datetime64[ns]").view(np.int64))
+        novo._resumir()
+        return novo
+
+    def _ler(self, segmentos, posicoes):
+        # Valores de uma coluna nas posições globais (slice(None) = todas)
+        base, cauda = segmentos
+        if isinstance(posicoes, slice):
+            return np.concatenate([base, cauda]) if len(cauda) else base
+        na_base = posicoes < self.n_indexado
+        if na_base.all():
+            return base[posicoes]
+        valores = np.empty(len(posicoes), dtype=np.result_type(base, cauda))
+        valores[na_base] = base[posicoes[na_base]]
+        valores[~na_base] = cauda[posicoes[~na_base] - self.n_indexado]
+        return valores
+
+    # --- Consulta ---
+
+    def periodo(self):
+        """Datas (Timestamp) da ocorrência mais antiga e da mais recente, ou None."""
+        if self.extremos_datas is None:
+            return None
+        return tuple(pd.Timestamp(valor) for valor in self.extremos_datas)
+
+    def consultar(self, categoricas=None, intervalos=None, datas=None, ids=None):
+        """Ids de linha (ordenados) que atendem todos os filtros.
+
+        `categoricas` mapeia coluna -> valores aceitos (lista vazia = sem filtro);
+        `intervalos` mapeia coluna -> (mínimo, máximo), inclusive; `datas` é um
+        período (dia inicial, dia final), inclusive, sobre data_ocorrencia;
+        `ids` restringe o resultado a ids já selecionados (ordenados, None =
+        sem restrição). Devolve None quando nenhum filtro restringe as linhas, para o chamador
+        usar o frame inteiro sem cópia.
+        """
+        filtros = []
+        for coluna, valores in (categoricas or {}).items():
+            if valores is None or len(valores) == 0:
+                continue
+            codigos = self.categorias[coluna].get_indexer(list(valores))
+            codigos = np.unique(codigos[codigos >= 0])
+            filtros.append(("categoria", coluna, codigos))
+        for coluna, (minimo, maximo) in (intervalos or {}).items():
+            menor, maior = self.extremos[coluna]
+            if minimo <= menor and maximo >= maior and self.sem_nulos[coluna]:
+                continue
+            # Limites no mesmo tipo do índice ordenado (int16), para a busca
+            # binária não converter o array inteiro
+            minimo = np.int16(np.clip(np.ceil(minimo), -NULO_ORDENADO, NULO_ORDENADO - 1))
+            maximo = np.int16(np.clip(np.floor(maximo), -NULO_ORDENADO, NULO_ORDENADO - 1))
+            filtros.append(("intervalo", coluna, (minimo, maximo)))
+
+        if datas is not None:
+            # Meia-abertura [início do dia inicial, início do dia seguinte ao final)
+            inicio = pd.Timestamp(datas[0]).normalize().value
+            fim = pd.Timestamp(datas[1]).normalize().value + UM_DIA_NS
+            cobre_tudo = self.extremos_datas is not None and (
+                inicio <= self.extremos_datas[0] and fim > self.extremos_datas[1]
+            )
+            if not (cobre_tudo and self.datas_sem_nulos):
+                filtros.append(("data", COLUNA_DATA, (inicio, fim)))
+
+        if ids is not None:
+            filtros.append(("ids", None, np.asarray(ids, dtype=np.int64)))
+
+        if not filtros:
+            return None
+
+        estimativas = [self._estimar(filtro) for filtro in filtros]
+        primeiro = int(np.argmin(estimativas))
+        if estimativas[primeiro] > FRACAO_VARREDURA * self.n_linhas:
+            # Todos os filtros são pouco seletivos: uma máscara vetorizada por
+            # coluna sobre o frame inteiro sai mais barata que listas de ids
+            mascara = np.ones(self.n_linhas, dtype=bool)
+            for filtro in filtros:
+                mascara &= self._mascara(filtro, slice(None))
+            return np.flatnonzero(mascara)
+
+        candidatos = np.concatenate([
+            self._gerar(filtros[primeiro]),
+            self._verificar(filtros[primeiro], np.arange(self.n_indexado, self.n_linhas)),
+        ])
+        restantes = filtros[:primeiro] + filtros[primeiro + 1:]
+
+        for filtro in sorted(restantes, key=self._estimar):
+            if len(candidatos) == 0:
+                break
+            candidatos = self._verificar(filtro, candidatos)
+        return candidatos
+
+    def _estimar(self, filtro):
+        tipo, coluna, parametro = filtro
+        if tipo == "categoria":
+            _, inicios = self.listas[coluna]
+            validos = parametro[parametro + 1 < len(inicios) - 1]
+            return int((inicios[validos + 2] - inicios[validos + 1]).sum())
+        if tipo == "data":
+            ordenadas, _ = self.datas_ordenadas
+            inicio, fim = parametro
+            return int(np.searchsorted(ordenadas, fim, "left") - np.searchsorted(ordenadas, inicio, "left"))
+        if tipo == "ids":
+            return len(parametro)
+        ordenados, _ = self.ordenados[coluna]
+        minimo, maximo = parametro
+        return int(np.searchsorted(ordenados, maximo, "right") - np.searchsorted(ordenados, minimo, "left"))
+
+    def _gerar(self, filtro):
+        # Ids da parte indexada que atendem o filtro, em ordem crescente
+        tipo, coluna, parametro = filtro
+        if tipo == "categoria":
+            ordem, inicios = self.listas[coluna]
+            partes = [
+                ordem[inicios[c + 1]:inicios[c + 2]]
+                for c in parametro if c + 2 < len(inicios)
+            ]
+            if len(partes) == 1:
+                return partes[0]
+            return np.sort(np.concatenate(partes)) if partes else np.empty(0, dtype=np.int64)
+        if tipo == "data":
+            # O período é uma fatia contígua do índice temporal
+            ordenadas, ordem = self.datas_ordenadas
+            inicio, fim = parametro
+            return np.sort(ordem[np.searchsorted(ordenadas, inicio, "left"):np.searchsorted(ordenadas, fim, "left")])
+        if tipo == "ids":
+            return parametro[:np.searchsorted(parametro, self.n_indexado)]
+        ordenados, ordem = self.ordenados[coluna]
+        minimo, maximo = parametro
+        inicio = np.searchsorted(ordenados, minimo, "left")
+        fim = np.searchsorted(ordenados, maximo, "right")
+        return np.sort(ordem[inicio:fim])
+
+    def _verificar(self, filtro, ids):
+        # Mantém só os ids que atendem o filtro, lendo as colunas nessas posições
+        return ids[self._mascara(filtro, ids)]
+
+    def _mascara(self, filtro, posicoes):
+        tipo, coluna, parametro = filtro
+        if tipo == "categoria":
+            aceitos = np.zeros(len(self.categorias[coluna]) + 1, dtype=bool)
+            aceitos[parametro + 1] = True
+            return aceitos[self._ler(self.codigos[coluna], posicoes) + 1]
+        if tipo == "data":
+            inicio, fim = parametro
+            datas = self._ler(self.datas, posicoes)
+            return (datas >= inicio) & (datas < fim)
+        if tipo == "ids":
+            if isinstance(posicoes, slice):
+                presentes = np.zeros(self.n_linhas, dtype=bool)
+                presentes[parametro[:np.searchsorted(parametro, self.n_linhas)]] = True
+                return presentes[posicoes]
+            if len(parametro) == 0:
+                return np.zeros(len(posicoes), dtype=bool)
+            encontrados = np.minimum(np.searchsorted(parametro, posicoes), len(parametro) - 1)
+            return parametro[encontrados] == posicoes
+        minimo, maximo = parametro
+        valores = self._ler(self.valores[coluna], posicoes)
+        return (valores >= minimo) & (valores <= maximo)
+
+
+def _resumo(valores, datas):
+    extremos = {}
+    for coluna, v in valores.items():
+        validos = v[~np.isnan(v)]
+        extremos[coluna] = (validos.min(), validos.max()) if len(validos) else None
+    datas_validas = datas[datas != DATA_NULA]
+    return {
+        "sem_nulos": {coluna: not np.isnan(v).any() for coluna, v in valores.items()},
+        "extremos": extremos,
+        "datas_sem_nulos": len(datas_validas) == len(datas),
+        "extremos_datas": (datas_validas.min(), datas_validas.max()) if len(datas_validas) else None,
+    }
+
+
+def _sem_cauda(valores):
+    return valores, valores[:0]
+
+
+def _valores_intervalo(serie):
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def aplicar(df, ids):
+    """Recorte do frame para os ids de `consultar` (o próprio frame se ids for None)."""
+    if ids is None:
+        return df
+    # Ids além do fim vêm de um delta que chegou depois que `df` foi obtido
+    ids = ids[:np.searchsorted(ids, len(df))]
+    return df.take(ids)
+
+
+def ultimos_dias(dias, data_final):
+    """Período (dia inicial, dia final) com os `dias` dias que terminam em `data_final`."""
+    data_final = pd.Timestamp(data_final).normalize()
+    return (data_final - pd.Timedelta(days=dias - 1)).date(), data_final.date()
@@ -0,0 +1,139 @@
+"""Representação compilada de uma floresta de decisão para inferência rápida.
+
+O `predict_proba` do RandomForest do scikit-learn percorre as árvores uma a uma
+(despacho em Python por árvore, ~20 ms por chamada com 200 árvores); nos lotes
+pequenos que a página envia (uma linha, 168 slots) esse custo fixo domina. Aqui
+todas as árvores viram arrays contíguos e um lote é percorrido de uma vez, com
+operações vetorizadas sobre todos os pares (linha, árvore).
+
+Layout dos nós: os dois filhos de um nó ficam em posições vizinhas, então o
+próximo nó é `filho + (x > limiar)`. Filho, feature e limiar de cada nó ficam
+empacotados num único int64 (filho em 23 bits, feature em 8, bits do limiar
+float32 em 32), e cada nível da travessia faz só duas leituras aleatórias: o
+nó e o valor da feature. Folhas apontam para si mesmas com limiar +inf, então
+linhas que já chegaram continuam paradas; a cada `NIVEIS_POR_PASSO` níveis as
+que chegaram saem do conjunto ativo.
+
+Os limiares são arredondados para baixo em float32: como as features chegam em
+float32 (como no scikit-learn), `x <= limiar` dá o mesmo resultado que com o
+limiar float64 original e as folhas alcançadas são as mesmas. As probabilidades
+das folhas ficam em float32 (só para as folhas) e são somadas em float64; a
+diferença para o scikit-learn fica na ordem de 1e-7.
+"""
+import numpy as np
+
+NIVEIS_POR_PASSO = 6
+# Acima disso o laço em C do scikit-learn é mais rápido que a travessia vetorizada
+MAX_LINHAS = 256
+
+_BITS_FEATURE = 8
+_BITS_FILHO = 63 - 32 - _BITS_FEATURE
+_LIMIAR_FOLHA = np.int64(np.float32(np.inf).view(np.uint32))
+
+
+class FlorestaCompilada:
+    def __init__(self, modelo):
+        arvores = [estimador.tree_ for estimador in modelo.estimators_]
+        if any(arvore.n_outputs != 1 for arvore in arvores):
+            raise ValueError("Só florestas de classificação com uma saída podem ser compiladas.")
+        if modelo.n_features_in_ > 1 << _BITS_FEATURE:
+            raise ValueError(f"Floresta com mais de {1 << _BITS_FEATURE} features.")
+        tamanhos = np.array([arvore.node_count for arvore in arvores])
+        if tamanhos.sum() > 1 << _BITS_FILHO:
+            raise ValueError(f"Floresta com mais de {1 << _BITS_FILHO} nós.")
+
+        self.classes_ = np.asarray(modelo.classes_)
+        self.n_arvores = len(arvores)
+        self.raizes = np.concatenate([[0], np.cumsum(tamanhos)[:-1]]).astype(np.int32)
+
+        nos, valores = [], []
+        for raiz, arvore in zip(self.raizes, arvores):
+            ordem, filho = _reordenar(arvore.children_left, arvore.children_right)
+            folhas = filho == 0
+            filho = np.where(folhas, np.arange(len(filho)), filho) + raiz
+            feature = np.where(folhas, 0, arvore.feature[ordem])
+            limiar = _limiar_float32(np.where(folhas, np.inf, arvore.threshold[ordem]))
+            nos.append(
+                (filho.astype(np.int64) << (32 + _BITS_FEATURE))
+                | (feature.astype(np.int64) << 32)
+                | limiar.view(np.uint32).astype(np.int64)
+            )
+            valores.append(arvore.value[ordem[folhas], 0, :])
+        self.nos = np.concatenate(nos)
+
+        # Probabilidades só das folhas; cada nó folha aponta para a sua linha
+        folhas = (self.nos & 0xFFFFFFFF) == _LIMIAR_FOLHA
+        valores = np.concatenate(valores)
+        self.valores = (valores / valores.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.indice_folha = np.full(len(self.nos), -1, dtype=np.int32)
+        self.indice_folha[folhas] = np.arange(len(self.valores), dtype=np.int32)
+
+    @property
+    def nbytes(self):
+        return self.raizes.nbytes + self.nos.nbytes + self.valores.nbytes + self.indice_folha.nbytes
+
+    def folhas(self, X):
+        """Nó folha (índice global) alcançado por cada linha em cada árvore: (n_linhas, n_arvores)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        valores_x = X.ravel()
+        nos = np.tile(self.raizes, n)
+        deslocamentos = np.repeat(np.arange(n, dtype=np.int32) * n_features, self.n_arvores)
+        ativos = np.arange(len(nos))
+        while len(ativos):
+            atuais = nos[ativos]
+            deslocamento = deslocamentos[ativos]
+            for _ in range(NIVEIS_POR_PASSO):
+                no = self.nos[atuais]
+                feature = ((no >> 32) & ((1 << _BITS_FEATURE) - 1)).astype(np.int32)
+                limiar = no.astype(np.uint32).view(np.float32)
+                atuais = (no >> (32 + _BITS_FEATURE)).astype(np.int32) + (valores_x[deslocamento + feature] > limiar)
+            nos[ativos] = atuais
+            ativos = ativos[(self.nos[atuais] & 0xFFFFFFFF) != _LIMIAR_FOLHA]
+        return nos.reshape(n, self.n_arvores)
+
+    def predict_proba(self, X):
+        folhas = self.folhas(X)
+        # Média das folhas das árvores, acumulada em float64
+        return self.valores[self.indice_folha[folhas]].sum(axis=1, dtype=np.float64) / self.n_arvores
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def compilar(modelo):
+    """`FlorestaCompilada` do modelo, ou None se ele não for uma floresta de classificação compilável."""
+    estimadores = getattr(modelo, "estimators_", None)
+    if estimadores is None or not hasattr(modelo, "classes_") or getattr(modelo, "n_outputs_", 1) != 1:
+        return None
+    if not all(hasattr(estimador, "tree_") for estimador in np.ravel(estimadores)):
+        return None
+    try:
+        return FlorestaCompilada(modelo)
+    except ValueError:
+        return None
+
+
+def _reordenar(esquerda, direita):
+    """Nova ordem dos nós com os filhos de cada nó interno lado a lado.
+
+    Devolve `ordem` (nó original de cada posição nova) e `filho` (posição nova
+    do filho esquerdo; 0 nas folhas, já que a raiz nunca é filho).
+    """
+    internos = np.flatnonzero(esquerda != -1)
+    nova_posicao = np.empty(len(esquerda), dtype=np.int64)
+    nova_posicao[0] = 0
+    nova_posicao[esquerda[internos]] = 1 + 2 * np.arange(len(internos))
+    nova_posicao[direita[internos]] = 2 + 2 * np.arange(len(internos))
+    ordem = np.argsort(nova_posicao)
+    filho = np.zeros(len(esquerda), dtype=np.int64)
+    filho[nova_posicao[internos]] = nova_posicao[esquerda[internos]]
+    return ordem, filho
+
+
+def _limiar_float32(limiar):
+    # Maior float32 <= limiar: para x float32, x <= limiar32 equivale a x <= limiar
+    limiar32 = limiar.astype(np.float32)
+    acima = limiar32.astype(np.float64) > limiar
+    limiar32[acima] = np.nextafter(limiar32[acima], np.float32(-np.inf))
+    return limiar32
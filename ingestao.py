@@ -0,0 +1,56 @@
+"""Ingestão de exportações de ocorrências para o armazenamento colunar.
+
+Uso:
+    python ingestao.py --dataset exportacao_delegacia.csv --linhas-por-bloco 200000
+
+O CSV é lido em blocos com o esquema explícito de `dados.ESQUEMA_CSV`,
+validado e gravado incrementalmente (`dados.converter_para_colunar`). O
+comando mostra o progresso em linhas/s, o pico de memória do processo e
+quantos valores inválidos foram convertidos em ausentes por coluna.
+"""
+import argparse
+import resource
+import sys
+
+from dados import CAMINHO_CSV, LINHAS_POR_BLOCO, converter_para_colunar, diretorio_colunar
+
+
+def _pico_memoria_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (pico if sys.platform == "darwin" else pico * 1024) / 1e6
+
+
+def mostrar_progresso(linhas, segundos):
+    print(f"⏳ {linhas:,} linhas | {linhas / max(segundos, 1e-9):,.0f} linhas/s | pico {_pico_memoria_mb():.0f} MB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Converte um CSV de ocorrências para o armazenamento colunar.")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV de ocorrências")
+    parser.add_argument("--destino", help="Diretório do armazenamento (padrão: <dataset>.colunar)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument("--silencioso", action="store_true", help="Não mostrar o progresso por bloco")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    destino = args.destino or diretorio_colunar(args.dataset)
+    meta = converter_para_colunar(
+        args.dataset, destino, args.linhas_por_bloco, None if args.silencioso else mostrar_progresso
+    )
+
+    ingestao = meta["ingestao"]
+    print(
+        f"✅ {meta['linhas']:,} linhas em {destino} | {ingestao['segundos']:.1f}s | "
+        f"{ingestao['linhas_por_segundo'] or 0:,} linhas/s | pico {_pico_memoria_mb():.0f} MB"
+    )
+    for coluna, quantidade in ingestao["invalidos"].items():
+        if quantidade:
+            print(f"⚠️ {coluna}: {quantidade:,} valores inválidos gravados como ausentes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import streamlit as st
+import plotly.express as px
+
+from dados import ocorrencias_compartilhadas
+from anomalias import LIMIAR_Z, MINIMO_OCORRENCIAS, MotorAnomalias
+
+# Configuração da página
+st.set_page_config(page_title="Anomalias", page_icon="🚨", layout="wide")
+
+# Função para carregar os dados: o frame é compartilhado entre sessões e páginas
+# (armazenamento colunar + ocorrências novas incorporadas por delta)
+def carregar_dados():
+    try:
+        ocorrencias = ocorrencias_compartilhadas()
+        ocorrencias.atualizar()
+        return ocorrencias
+    except FileNotFoundError:
+        st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
+        st.stop()
+
+# O motor de anomalias é construído uma vez a partir do histórico e recebe cada
+# BO cadastrado pelo delta; os alertas saem só do estado dele
+ocorrencias = carregar_dados()
+motor = ocorrencias.indice(MotorAnomalias)
+
+st.title("Detecção de Anomalias")
+st.markdown(
+    "Picos de ocorrências por **bairro e tipo de crime** na semana corrente, comparados "
+    "com a média móvel exponencial (EWMA) das semanas anteriores no mesmo dia e hora."
+)
+
+resumo = motor.resumo()
+if resumo["semana"] is None:
+    st.warning("Não há ocorrências com data para monitorar.")
+    st.stop()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Semana de Referência", resumo["semana"].strftime("%d/%m/%Y"))
+col2.metric("Ocorrências na Semana", resumo["ocorrencias_semana"])
+col3.metric("Combinações Monitoradas", f"{resumo['combinacoes_monitoradas']:,}".replace(",", "."))
+
+st.divider()
+
+# Parâmetros dos alertas
+col_p1, col_p2, col_p3 = st.columns(3)
+granularidade = col_p1.radio("Granularidade", ["Dia e hora da semana", "Semana inteira"], horizontal=True)
+limiar_z = col_p2.slider("Limiar do z-score", 1.0, 10.0, LIMIAR_Z, step=0.5)
+minimo = col_p3.number_input("Mínimo de ocorrências", min_value=1, value=MINIMO_OCORRENCIAS, step=1)
+
+alertas = motor.alertas(limiar_z=limiar_z, minimo=minimo, por_slot=granularidade == "Dia e hora da semana")
+
+st.subheader(f"Alertas Ativos ({len(alertas)})")
+
+if alertas.empty:
+    st.success("Nenhum pico anômalo na semana corrente com os parâmetros selecionados.")
+else:
+    col_g1, col_g2 = st.columns([1, 2])
+
+    with col_g1:
+        alertas_bairro = alertas.groupby('bairro').size().reset_index(name='Alertas')
+        fig_bairro = px.bar(alertas_bairro, x='Alertas', y='bairro', orientation='h',
+                            title="Alertas por Bairro", height=400,
+                            color='Alertas', color_continuous_scale=px.colors.sequential.Reds)
+        fig_bairro.update_layout(yaxis={'categoryorder': 'total ascending'}, yaxis_title="")
+        st.plotly_chart(fig_bairro, use_container_width=True)
+
+    with col_g2:
+        tabela = alertas.rename(columns={
+            'bairro': 'Bairro',
+            'tipo_crime': 'Tipo de Crime',
+            'dia_semana': 'Dia da Semana',
+            'hora_dia': 'Hora',
+            'ocorrencias': 'Ocorrências',
+            'media_esperada': 'Média Esperada',
+            'z': 'Z-score',
+        })
+        st.dataframe(
+            tabela.style.format({'Média Esperada': '{:.2f}', 'Z-score': '{:.1f}'}),
+            use_container_width=True,
+            height=400,
+        )
@@ -0,0 +1,137 @@
+import streamlit as st
+import plotly.express as px
+import time
+from datetime import datetime
+
+from dados import ocorrencias_compartilhadas, contagem_valores
+from filtros import PERIODOS, IndiceFiltros, ultimos_dias
+from busca import IndiceTexto
+
+# Configuração da página
+st.set_page_config(page_title="Busca de Ocorrências", page_icon="🔎", layout="wide")
+
+# Função para carregar os dados: o frame é compartilhado entre sessões e páginas
+# (armazenamento colunar + ocorrências novas incorporadas por delta)
+def carregar_dados():
+    try:
+        ocorrencias = ocorrencias_compartilhadas()
+        ocorrencias.atualizar()
+        return ocorrencias
+    except FileNotFoundError:
+        st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
+        st.stop()
+
+ocorrencias = carregar_dados()
+indice_filtros = ocorrencias.indice(IndiceFiltros)
+# Índice invertido dos termos do modus operandi e das observações dos BOs
+# cadastrados; recebe os textos novos a cada delta
+indice_texto = ocorrencias.indice(IndiceTexto)
+estatisticas = ocorrencias.estatisticas
+
+COLUNAS_RESULTADO = {
+    'data_ocorrencia': 'Data',
+    'bairro': 'Bairro',
+    'tipo_crime': 'Tipo de Crime',
+    'descricao_modus_operandi': 'Modus Operandi',
+    'observacoes': 'Observações',
+    'status_investigacao': 'Status',
+}
+MAX_LINHAS_TABELA = 200
+
+st.title("Busca de Ocorrências")
+st.markdown(
+    "Busca por palavras-chave no **modus operandi** e nas **observações** dos BOs cadastrados, "
+    "sem diferença de maiúsculas e acentos. Todas as palavras precisam aparecer; termine uma "
+    "palavra com `*` para buscar por prefixo (ex.: `golp*`)."
+)
+
+consulta = st.text_input("Palavras-chave", placeholder="ex.: golpe telefonico, fraud*, arma fogo")
+
+# FILTROS
+col_f1, col_f2, col_f3, col_f4 = st.columns([2, 2, 1, 2])
+
+bairros = estatisticas.valores('bairro')
+tipos_crime = estatisticas.valores('tipo_crime')
+bairros_sel = col_f1.multiselect("Bairros (vazio = todos)", bairros, default=[])
+crimes_sel = col_f2.multiselect("Tipos de Crime (vazio = todos)", tipos_crime, default=[])
+
+periodo_total = estatisticas.periodo()
+min_date = periodo_total[0].date() if periodo_total else datetime.now().date()
+max_date = periodo_total[1].date() if periodo_total else datetime.now().date()
+
+periodo_sel = col_f3.selectbox("Período", list(PERIODOS))
+datas_sel = None
+if periodo_sel == "Intervalo personalizado":
+    with col_f4:
+        intervalo = st.date_input(
+            "Selecione o intervalo de datas",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
+        )
+    # Enquanto só a primeira data foi escolhida, o intervalo é esse único dia
+    datas_sel = (intervalo[0], intervalo[-1]) if intervalo else None
+elif PERIODOS[periodo_sel] is not None:
+    # Os últimos dias contam a partir da ocorrência mais recente
+    datas_sel = ultimos_dias(PERIODOS[periodo_sel], max_date)
+
+if not consulta.strip():
+    st.info("Digite uma ou mais palavras-chave para buscar.")
+    st.stop()
+
+# A busca devolve os ids das linhas que têm todos os termos; eles entram no
+# índice de filtros como mais um filtro, junto com bairro, crime e período
+inicio = time.perf_counter()
+ids_texto = indice_texto.consultar(consulta)
+if ids_texto is None:
+    st.warning("A busca não tem palavras válidas (palavras muito comuns, como 'de' e 'com', são ignoradas).")
+    st.stop()
+ids = indice_filtros.consultar(
+    {'bairro': bairros_sel, 'tipo_crime': crimes_sel}, datas=datas_sel, ids=ids_texto
+)
+tempo_busca = time.perf_counter() - inicio
+df_resultado = ocorrencias.linhas(ids)
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Ocorrências Encontradas", f"{len(df_resultado):,}".replace(",", "."))
+col2.metric("Só pelas Palavras-chave", f"{len(ids_texto):,}".replace(",", "."))
+col3.metric("Tempo de Busca", f"{tempo_busca * 1e3:.1f} ms")
+
+if df_resultado.empty:
+    ultima = consulta.split()[-1].rstrip("*")
+    sugestoes = indice_texto.sugerir(ultima)
+    st.warning("Nenhuma ocorrência encontrada para a busca e os filtros selecionados.")
+    if sugestoes:
+        st.caption("Termos do índice com esse início: " + ", ".join(f"`{s}*`" for s in sugestoes))
+    st.stop()
+
+st.divider()
+
+col_g1, col_g2 = st.columns(2)
+
+with col_g1:
+    crimes_resultado = contagem_valores(df_resultado['tipo_crime']).head(10).reset_index()
+    crimes_resultado.columns = ['Tipo de Crime', 'Ocorrências']
+    fig_crimes = px.bar(crimes_resultado, x='Ocorrências', y='Tipo de Crime', orientation='h',
+                        title="Resultados por Tipo de Crime", height=350,
+                        color_discrete_sequence=['#CC3300'])
+    fig_crimes.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig_crimes, use_container_width=True)
+
+with col_g2:
+    bairros_resultado = contagem_valores(df_resultado['bairro']).head(10).reset_index()
+    bairros_resultado.columns = ['Bairro', 'Ocorrências']
+    fig_bairros = px.bar(bairros_resultado, x='Ocorrências', y='Bairro', orientation='h',
+                         title="Resultados por Bairro", height=350,
+                         color_discrete_sequence=['#0066CC'])
+    fig_bairros.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig_bairros, use_container_width=True)
+
+# Ocorrências mais recentes primeiro
+st.markdown(f"##### Ocorrências Encontradas (até {MAX_LINHAS_TABELA} mais recentes):")
+colunas_resultado = [c for c in COLUNAS_RESULTADO if c in df_resultado.columns]
+st.dataframe(
+    df_resultado.nlargest(MAX_LINHAS_TABELA, 'data_ocorrencia')[colunas_resultado].rename(columns=COLUNAS_RESULTADO),
+    use_container_width=True,
+    hide_index=True,
+)
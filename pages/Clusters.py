@@ -0,0 +1,179 @@
+import streamlit as st
+import pydeck as pdk
+import plotly.express as px
+from datetime import datetime
+
+from dados import ocorrencias_compartilhadas
+from filtros import PERIODOS, IndiceFiltros, ultimos_dias
+from clusters import PARAMETROS_PADRAO, RUIDO, ServicoClusters
+from tarefas import CONCLUIDA, ERRO, INTERVALO_ATUALIZACAO, acompanhar, chave_parametros, executor_compartilhado, grupo_da_sessao
+
+# Configuração da página
+st.set_page_config(page_title="Clusters de Hotspots", page_icon="📍", layout="wide")
+
+# Função para carregar os dados: o frame é compartilhado entre sessões e páginas
+# (armazenamento colunar + ocorrências novas incorporadas por delta)
+def carregar_dados():
+    try:
+        ocorrencias = ocorrencias_compartilhadas()
+        ocorrencias.atualizar()
+        return ocorrencias
+    except FileNotFoundError:
+        st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
+        st.stop()
+
+ocorrencias = carregar_dados()
+indice_filtros = ocorrencias.indice(IndiceFiltros)
+estatisticas = ocorrencias.estatisticas
+# Os resultados ficam em cache por filtro e recebem só as ocorrências novas
+servico_clusters = ocorrencias.indice(ServicoClusters)
+
+# Paleta para colorir os clusters no mapa (RGB)
+PALETA = [
+    [228, 26, 28], [55, 126, 184], [77, 175, 74], [152, 78, 163], [255, 127, 0],
+    [166, 86, 40], [247, 129, 191], [0, 139, 139], [188, 189, 34], [23, 190, 207],
+]
+COR_RUIDO = [170, 170, 170]
+
+st.title("Clusters de Hotspots")
+st.markdown(
+    "Agrupamentos espaciais das ocorrências por **tipo de crime** e **período**, "
+    "por densidade (DBSCAN em grade) ou por MiniBatch K-Means."
+)
+
+# FILTROS
+col_f1, col_f2, col_f3 = st.columns([2, 1, 2])
+
+tipos_crime = estatisticas.valores('tipo_crime')
+crimes_sel = col_f1.multiselect("Tipos de Crime (vazio = todos)", tipos_crime, default=[])
+
+periodo_total = estatisticas.periodo()
+min_date = periodo_total[0].date() if periodo_total else datetime.now().date()
+max_date = periodo_total[1].date() if periodo_total else datetime.now().date()
+
+periodo_sel = col_f2.selectbox("Período", list(PERIODOS))
+datas_sel = None
+if periodo_sel == "Intervalo personalizado":
+    with col_f3:
+        intervalo = st.date_input(
+            "Selecione o intervalo de datas",
+            value=(min_date, max_date),
+            min_value=min_date,
+            max_value=max_date
+        )
+    # Enquanto só a primeira data foi escolhida, o intervalo é esse único dia
+    datas_sel = (intervalo[0], intervalo[-1]) if intervalo else None
+elif PERIODOS[periodo_sel] is not None:
+    # Os últimos dias contam a partir da ocorrência mais recente
+    datas_sel = ultimos_dias(PERIODOS[periodo_sel], max_date)
+
+# PARÂMETROS DO ALGORITMO
+col_a1, col_a2, col_a3 = st.columns(3)
+algoritmo_rotulo = col_a1.radio("Algoritmo", ["Densidade (DBSCAN em grade)", "MiniBatch K-Means"])
+
+if algoritmo_rotulo.startswith("Densidade"):
+    algoritmo = "densidade"
+    parametros = {
+        "eps_m": col_a2.slider("Raio de vizinhança (m)", 50, 1000, PARAMETROS_PADRAO["densidade"]["eps_m"], step=50),
+        "min_ocorrencias": col_a3.slider("Mínimo de ocorrências no raio", 2, 100, PARAMETROS_PADRAO["densidade"]["min_ocorrencias"]),
+    }
+else:
+    algoritmo = "kmeans"
+    parametros = {
+        "n_clusters": col_a2.slider("Número de clusters", 2, 30, PARAMETROS_PADRAO["kmeans"]["n_clusters"]),
+    }
+
+# O agrupamento roda como tarefa no executor do processo: deduplicado pelos
+# parâmetros (e pela versão do frame) e cancelado se os filtros mudam antes do fim
+tarefa_clusters = executor_compartilhado().submeter(
+    servico_clusters.agrupar, ocorrencias, indice_filtros, crimes_sel, datas_sel, algoritmo, parametros,
+    chave=chave_parametros("clusters", indice_filtros.n_linhas, sorted(crimes_sel), datas_sel, algoritmo, parametros),
+    grupo=grupo_da_sessao("clusters"), descricao="Agrupamento",
+)
+if not tarefa_clusters.aguardar(INTERVALO_ATUALIZACAO):
+    acompanhar(tarefa_clusters, tarefa_clusters.versao)
+    st.stop()
+if tarefa_clusters.estado == ERRO:
+    st.error(f"Erro ao calcular os clusters: {tarefa_clusters.erro}")
+    st.stop()
+if tarefa_clusters.estado != CONCLUIDA:
+    st.stop()
+resultado = tarefa_clusters.resultado
+
+if resultado.n_pontos == 0:
+    st.warning("Nenhuma ocorrência com coordenadas para os filtros selecionados.")
+    st.stop()
+
+tabela = resultado.tabela(ocorrencias.categorias('tipo_crime'))
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Ocorrências Agrupadas", f"{resultado.n_pontos:,}".replace(",", "."))
+col2.metric("Clusters", len(tabela))
+col3.metric("Ruído (fora de clusters)", f"{resultado.n_ruido():,}".replace(",", "."))
+origens = {"calculado": "calculado", "cache": "do cache", "incremental": "atualização incremental"}
+col4.metric("Tempo de Cálculo", f"{resultado.tempo_calculo * 1e3:.0f} ms", origens[resultado.origem], delta_color="off")
+
+st.divider()
+
+# MAPA: amostra de ocorrências coloridas por cluster + centros dos clusters
+st.subheader("Mapa dos Clusters")
+
+pontos = resultado.pontos()
+pontos['cor'] = [COR_RUIDO if c == RUIDO else PALETA[c % len(PALETA)] for c in pontos['cluster']]
+centros = tabela.assign(cor=[PALETA[c % len(PALETA)] for c in tabela['cluster']])
+
+camada_pontos = pdk.Layer(
+    "ScatterplotLayer",
+    data=pontos,
+    get_position=["longitude", "latitude"],
+    get_fill_color="cor",
+    get_radius=25,
+    opacity=0.5,
+)
+camada_centros = pdk.Layer(
+    "ScatterplotLayer",
+    data=centros,
+    get_position=["longitude", "latitude"],
+    get_fill_color="cor",
+    get_radius="raio_m",
+    opacity=0.15,
+    stroked=True,
+    get_line_color=[60, 60, 60],
+    line_width_min_pixels=1,
+    pickable=True,
+)
+view_state = pdk.ViewState(
+    latitude=float(pontos['latitude'].mean()),
+    longitude=float(pontos['longitude'].mean()),
+    zoom=11,
+    pitch=0
+)
+st.pydeck_chart(pdk.Deck(
+    layers=[camada_pontos, camada_centros],
+    initial_view_state=view_state,
+    map_style="mapbox://styles/mapbox/light-v9",
+    tooltip={"text": "Cluster {cluster}\n{ocorrencias} ocorrências\nPredomínio: {crime_predominante}"},
+))
+st.caption(f"Mapa com uma amostra de até {len(pontos):,} ocorrências; os círculos maiores são os clusters (raio RMS).".replace(",", "."))
+
+# RESUMO DOS CLUSTERS
+col_g1, col_g2 = st.columns(2)
+
+with col_g1:
+    top_clusters = tabela.head(15).assign(Cluster=lambda t: "Cluster " + t['cluster'].astype(str))
+    fig_clusters = px.bar(top_clusters, x='ocorrencias', y='Cluster', orientation='h',
+                          color='crime_predominante', title="Maiores Clusters por Ocorrências", height=400)
+    fig_clusters.update_layout(yaxis={'categoryorder': 'total ascending'}, xaxis_title="Ocorrências",
+                               yaxis_title="", legend_title="Crime Predominante")
+    st.plotly_chart(fig_clusters, use_container_width=True)
+
+with col_g2:
+    st.markdown("##### Clusters Encontrados:")
+    st.dataframe(
+        tabela.rename(columns={
+            'cluster': 'Cluster', 'latitude': 'Latitude', 'longitude': 'Longitude',
+            'ocorrencias': 'Ocorrências', 'raio_m': 'Raio (m)', 'crime_predominante': 'Crime Predominante',
+        }).style.format({'Latitude': '{:.5f}', 'Longitude': '{:.5f}', 'Raio (m)': '{:.0f}'}),
+        use_container_width=True,
+        height=400,
+    )
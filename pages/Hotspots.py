@@ -6,32 +6,31 @@ from streamlit_folium import st_folium
 import plotly.express as px
 from datetime import datetime
 
+from dados import ocorrencias_compartilhadas, contagem_valores
+from filtros import PERIODOS, ultimos_dias
+from series import RESOLUCOES
+import consultas
+from espacial import NIVEIS_DETALHE, NIVEL_PADRAO, IndiceEspacial, agregar_frame, centro
+
 # Configuração da página
 st.set_page_config(page_title="Mapa de Hotspots", page_icon="", layout="wide")
 
-# Função para carregar os dados
-@st.cache_data
+# Função para carregar os dados: o frame é compartilhado entre sessões e páginas
+# (armazenamento colunar + ocorrências novas incorporadas por delta)
+# hora_dia e dia_semana já vêm pré-calculadas na camada de dados
 def carregar_dados():
     try:
-        df = pd.read_csv("dataset_ocorrencias_delegacia_5.csv")
+        ocorrencias = ocorrencias_compartilhadas()
+        ocorrencias.atualizar()
+        return ocorrencias
     except FileNotFoundError:
-        try:
-            df = pd.read_csv("../dataset_ocorrencias_delegacia_5.csv")
-        except FileNotFoundError:
-            st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
-            st.stop()
-    
-    df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'], errors='coerce')
-    # Prepara coluna hora_dia para gráficos
-    df['hora_dia'] = df['data_ocorrencia'].dt.hour
-    # Prepara coluna dia_semana para gráficos
-    df['dia_semana'] = df['data_ocorrencia'].dt.day_name().replace({
-        'Monday':'Segunda','Tuesday':'Terça','Wednesday':'Quarta',
-        'Thursday':'Quinta','Friday':'Sexta','Saturday':'Sábado','Sunday':'Domingo'
-    })
-    return df
-
-df = carregar_dados()
+        st.error("Arquivo 'dataset_ocorrencias_delegacia_5.csv' não encontrado.")
+        st.stop()
+
+ocorrencias = carregar_dados()
+# Opções dos filtros e centro padrão do mapa vêm das estatísticas do dataset
+estatisticas = ocorrencias.estatisticas
+indice_espacial = ocorrencias.indice(IndiceEspacial)
 
 # FILTROS
 st.title("Mapa de Hotspots de Ocorrências")
@@ -39,44 +38,48 @@ st.markdown("Use os filtros abaixo para explorar padrões de criminalidade por b
 
 col_f1, col_f2 = st.columns(2)
 
-bairros = sorted(df['bairro'].dropna().unique().tolist())
-tipos_crime = sorted(df['tipo_crime'].dropna().unique().tolist())
+bairros = estatisticas.valores('bairro')
+tipos_crime = estatisticas.valores('tipo_crime')
 
 bairro_sel = col_f1.selectbox("Selecione o Bairro", ["Todos"] + bairros)
 crime_sel = col_f2.selectbox("Selecione o Tipo de Crime", ["Todos"] + tipos_crime)
 
 st.markdown("")  # Espaçamento visual
-col_data1, col_data2 = st.columns([1, 3]) # Adicionando colunas para a checkbox e o input de data
+col_data1, col_data2 = st.columns([1, 3]) # Adicionando colunas para o período e o intervalo de datas
 
-with col_data1:
-    todas_datas = st.checkbox("Considerar todas as datas", value=True)
+# Garante que os limites não sejam NaT quando não há datas válidas
+periodo_total = estatisticas.periodo()
+min_date = periodo_total[0].date() if periodo_total else datetime.now().date()
+max_date = periodo_total[1].date() if periodo_total else datetime.now().date()
 
-data_sel = None
-if not todas_datas:
-    # Garante que o valor inicial não seja um NaT se o min() falhar
-    min_date = df['data_ocorrencia'].min() if not df['data_ocorrencia'].min() is pd.NaT else datetime.now().date()
-    max_date = df['data_ocorrencia'].max() if not df['data_ocorrencia'].max() is pd.NaT else datetime.now().date()
+with col_data1:
+    periodo_sel = st.selectbox("Período", list(PERIODOS))
 
+datas_sel = None
+if periodo_sel == "Intervalo personalizado":
     with col_data2:
-        data_sel = st.date_input(
-            "Selecione a Data (Desmarque 'Todas as Datas' para usar)",
-            value=min_date,
+        intervalo = st.date_input(
+            "Selecione o intervalo de datas",
+            value=(min_date, max_date),
             min_value=min_date,
             max_value=max_date
         )
+    # Enquanto só a primeira data foi escolhida, o intervalo é esse único dia
+    datas_sel = (intervalo[0], intervalo[-1]) if intervalo else None
+elif PERIODOS[periodo_sel] is not None:
+    # Os últimos dias contam a partir da ocorrência mais recente
+    datas_sel = ultimos_dias(PERIODOS[periodo_sel], max_date)
 
 
 # Aplicar filtros
-df_filtrado = df.copy()
-if bairro_sel != "Todos":
-    df_filtrado = df_filtrado[df_filtrado['bairro'] == bairro_sel]
-if crime_sel != "Todos":
-    df_filtrado = df_filtrado[df_filtrado['tipo_crime'] == crime_sel]
-if not todas_datas and data_sel is not None:
-    # Certifica-se que a comparação é feita corretamente
-    df_filtrado = df_filtrado[df_filtrado['data_ocorrencia'].dt.date == data_sel]
-
-if df_filtrado.empty:
+filtros_sel = {
+    'bairro': [bairro_sel] if bairro_sel != "Todos" else [],
+    'tipo_crime': [crime_sel] if crime_sel != "Todos" else [],
+}
+# Filtros, contagens e tendência saem do módulo `consultas` (cubo pré-agregado e
+# séries por resolução, as mesmas consultas da api.py); as linhas filtradas só são
+# montadas para o histograma de idade e o mapa, que precisam dos valores brutos
+if consultas.total(ocorrencias, filtros_sel, datas_sel) == 0:
     st.warning("Nenhum dado encontrado para os filtros selecionados.")
     st.stop()
 
@@ -104,16 +107,21 @@ col_g1, col_g2 = st.columns(2)
 
 with col_g1:
     # Gráfico de Linha (Tendência Temporal) - Opção fixa para ser mais visível
-    df_tempo = df_filtrado.groupby(df_filtrado['data_ocorrencia'].dt.date).size().reset_index(name='Ocorrências')
+    # A resolução (hora, dia, semana ou mês) acompanha o tamanho do período e a
+    # série é reduzida ao orçamento de pontos do gráfico (LTTB)
+    tendencia = consultas.tendencia(ocorrencias, filtros_sel, datas_sel)
+    df_tempo = tendencia['serie'].rename_axis('data_ocorrencia').reset_index(name='Ocorrências')
     fig_line = px.line(df_tempo, x='data_ocorrencia', y='Ocorrências', markers=True,
-                       title="Tendência Temporal das Ocorrências", height=350,
+                       title=f"Tendência Temporal das Ocorrências (por {RESOLUCOES[tendencia['resolucao']]})", height=350,
                        color_discrete_sequence=['#CC3300']) # Cor para destaque
     fig_line.update_layout(xaxis_title="Data", yaxis_title="Contagem")
     st.plotly_chart(fig_line, use_container_width=True)
+    if tendencia['periodos'] > len(df_tempo):
+        st.caption(f"{tendencia['periodos']} períodos reduzidos a {len(df_tempo)} pontos preservando picos e vales.")
 
 with col_g2:
     # NOVO GRÁFICO: Bairros Mais Perigosos (ranking por ocorrências)
-    ocorrencias_bairro = df_filtrado['bairro'].value_counts().head(10).reset_index()
+    ocorrencias_bairro = consultas.contagens(ocorrencias, 'bairro', filtros_sel, datas_sel, limite=10).reset_index()
     ocorrencias_bairro.columns = ['Bairro', 'Ocorrências']
     
     fig_bar_bairro = px.bar(
@@ -142,7 +150,7 @@ col_g3, col_g4 = st.columns(2)
 
 with col_g3:
     # 1. Ocorrências por Hora do Dia
-    horarios = df_filtrado['hora_dia'].value_counts().sort_index().reset_index()
+    horarios = consultas.contagens(ocorrencias, 'hora_dia', filtros_sel, datas_sel).reset_index()
     horarios.columns = ['Hora do Dia', 'Ocorrências']
     fig_hora = px.bar(horarios, x='Hora do Dia', y='Ocorrências', 
                       title="Picos de Ocorrência por Hora do Dia", height=350,
@@ -152,8 +160,7 @@ with col_g3:
 
 with col_g4:
     # 2. Ocorrências por Dia da Semana
-    ordem_dias = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-    dias = df_filtrado['dia_semana'].value_counts().reindex(ordem_dias, fill_value=0).reset_index()
+    dias = consultas.contagens(ocorrencias, 'dia_semana', filtros_sel, datas_sel).reset_index()
     dias.columns = ['Dia da Semana', 'Ocorrências']
     
     fig_dia = px.bar(dias, x='Dia da Semana', y='Ocorrências', 
@@ -163,6 +170,10 @@ with col_g4:
     st.plotly_chart(fig_dia, use_container_width=True)
 
 
+# Bairro e crime vêm do índice de filtros (listas invertidas) e o período do
+# índice temporal ordenado (busca binária), sem varrer o frame
+df_filtrado = consultas.filtrar(ocorrencias, filtros_sel, datas=datas_sel)
+
 col_g5, col_g6 = st.columns(2)
 
 with col_g5:
@@ -179,7 +190,7 @@ with col_g5:
 
 with col_g6:
     # 4. Top Tipos de Arma
-    armas = df_filtrado['arma_utilizada'].value_counts().head(5).reset_index()
+    armas = consultas.contagens(ocorrencias, 'arma_utilizada', filtros_sel, datas_sel, limite=5).reset_index()
     armas.columns = ['Arma Utilizada', 'Ocorrências']
     fig_arma = px.bar(armas, x='Ocorrências', y='Arma Utilizada', orientation='h', 
                       title="Top 5 Armas Utilizadas", height=350,
@@ -197,20 +208,100 @@ st.subheader("Mapa de Calor de Ocorrências")
 if 'latitude' not in df_filtrado.columns or 'longitude' not in df_filtrado.columns:
     st.error("O dataset precisa conter as colunas 'latitude' e 'longitude' para gerar o mapa.")
 else:
-    # Centraliza o mapa na média dos dados filtrados
-    map_center = [df_filtrado['latitude'].mean(), df_filtrado['longitude'].mean()]
-
-    mapa = folium.Map(
-        location=map_center,
-        zoom_start=12, # Zoom um pouco mais aberto para visualização inicial
-        tiles='CartoDB positron'
+    nivel_mapa = st.selectbox(
+        "Nível de detalhe do mapa", list(NIVEIS_DETALHE), index=list(NIVEIS_DETALHE).index(NIVEL_PADRAO)
     )
-    
-    # Prepara os dados para o HeatMap, garantindo que sejam válidos
-    heat_data = df_filtrado[['latitude', 'longitude']].dropna().values.tolist()
-    
-    if heat_data:
+
+    # As ocorrências são agrupadas em células da grade no servidor: o mapa recebe
+    # um ponto por célula (centroide) com peso pela contagem, não um por ocorrência
+    celulas = agregar_frame(df_filtrado, nivel_mapa)
+
+    if not celulas.empty:
+        # Centraliza o mapa na média dos dados filtrados
+        mapa = folium.Map(
+            location=centro(celulas),
+            zoom_start=12, # Zoom um pouco mais aberto para visualização inicial
+            tiles='CartoDB positron'
+        )
+
+        # Peso normalizado para [0, 1], a escala de intensidade do HeatMap
+        heat_data = celulas.assign(peso=celulas['peso'] / celulas['peso'].max()).values.tolist()
         HeatMap(heat_data, radius=15, blur=20, min_opacity=0.4).add_to(mapa)
         st_folium(mapa, width=1150, height=550)
     else:
-        st.warning("Não há dados de latitude e longitude válidos para o mapa com os filtros aplicados.")
\ No newline at end of file
+        st.warning("Não há dados de latitude e longitude válidos para o mapa com os filtros aplicados.")
+
+# CONSULTA POR PROXIMIDADE
+st.divider()
+st.subheader("Consulta por Proximidade")
+st.markdown(
+    "Ocorrências ao redor de um endereço (raio) ou dentro de uma área (polígono), "
+    "em todo o histórico, usando o índice espacial em grade."
+)
+
+modo_area = st.radio("Tipo de área", ["Raio", "Polígono"], horizontal=True)
+periodos_area = [p for p in PERIODOS if p != "Intervalo personalizado"]
+periodo_area = st.selectbox("Período (contado a partir da ocorrência mais recente)", periodos_area)
+
+latitude_padrao = estatisticas.media('latitude')
+longitude_padrao = estatisticas.media('longitude')
+distancias = None
+
+if modo_area == "Raio":
+    col_p1, col_p2, col_p3 = st.columns(3)
+    latitude_ref = col_p1.number_input("Latitude", value=latitude_padrao, format="%.6f")
+    longitude_ref = col_p2.number_input("Longitude", value=longitude_padrao, format="%.6f")
+    raio_m = col_p3.slider("Raio (metros)", 100, 5000, 500, step=100)
+    ids_area, distancias = indice_espacial.no_raio(latitude_ref, longitude_ref, raio_m)
+else:
+    texto_poligono = st.text_area(
+        "Vértices do polígono (um 'latitude, longitude' por linha, mínimo de 3)",
+        value="\n".join(
+            f"{latitude_padrao + dlat:.6f}, {longitude_padrao + dlon:.6f}"
+            for dlat, dlon in [(-0.005, -0.005), (0.005, -0.005), (0.005, 0.005), (-0.005, 0.005)]
+        ),
+    )
+    try:
+        poligono = [tuple(float(v) for v in linha.split(",")) for linha in texto_poligono.splitlines() if linha.strip()]
+        if len(poligono) < 3 or any(len(v) != 2 for v in poligono):
+            raise ValueError
+    except ValueError:
+        st.error("Informe pelo menos 3 vértices no formato 'latitude, longitude'.")
+        st.stop()
+    ids_area = indice_espacial.no_poligono(poligono)
+
+# Ids além do fim vêm de um delta que chegou depois que o frame foi lido
+dentro_do_frame = ids_area < ocorrencias.n_linhas
+df_area = ocorrencias.linhas(ids_area[dentro_do_frame])
+if distancias is not None:
+    df_area = df_area.assign(distancia_m=distancias[dentro_do_frame])
+
+if PERIODOS[periodo_area] is not None:
+    inicio_area = pd.Timestamp(ultimos_dias(PERIODOS[periodo_area], max_date)[0])
+    df_area = df_area[df_area['data_ocorrencia'] >= inicio_area]
+
+st.metric("Ocorrências na área", f"{len(df_area):,}".replace(",", "."))
+
+if df_area.empty:
+    st.info("Nenhuma ocorrência encontrada na área e período selecionados.")
+else:
+    col_a1, col_a2 = st.columns(2)
+    with col_a1:
+        crimes_area = contagem_valores(df_area['tipo_crime']).reset_index()
+        crimes_area.columns = ['Tipo de Crime', 'Ocorrências']
+        fig_area = px.bar(crimes_area, x='Ocorrências', y='Tipo de Crime', orientation='h',
+                          title="Ocorrências na Área por Tipo de Crime", height=350,
+                          color_discrete_sequence=['#CC3300'])
+        fig_area.update_layout(yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_area, use_container_width=True)
+    with col_a2:
+        colunas_area = ['data_ocorrencia', 'bairro', 'tipo_crime', 'arma_utilizada']
+        if 'distancia_m' in df_area.columns:
+            st.markdown("##### Ocorrências Mais Próximas do Ponto:")
+            st.dataframe(
+                df_area.nsmallest(10, 'distancia_m')[colunas_area + ['distancia_m']].round({'distancia_m': 0}),
+                use_container_width=True,
+            )
+        else:
+            st.markdown("##### Ocorrências na Área (Amostra):")
+            st.dataframe(df_area[colunas_area].head(10), use_container_width=True)
@@ -0,0 +1,159 @@
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import json
+import os
+
+from benchmark_modelos import CAMINHO_RESULTADOS, ler_resultados
+from retreino import CAMINHO_STATUS, ler_status
+
+# Configuração da página
+st.set_page_config(page_title="Comparação de Modelos", page_icon="📊", layout="wide")
+
+CAMINHO_RELATORIO_TREINO = "relatorio_treino.json"
+
+COLUNAS_EXIBICAO = {
+    'modelo': 'Modelo',
+    'f1_macro': 'F1 Macro',
+    'acuracia': 'Acurácia',
+    'tempo_treino_s': 'Treino (s)',
+    'latencia_linha_p50_ms': 'Linha p50 (ms)',
+    'latencia_linha_p99_ms': 'Linha p99 (ms)',
+    'latencia_lote_p50_ms': 'Lote p50 (ms)',
+    'latencia_lote_p99_ms': 'Lote p99 (ms)',
+    'latencia_modelo_linha_p50_ms': 'Só Modelo Linha p50 (ms)',
+    'latencia_modelo_linha_p99_ms': 'Só Modelo Linha p99 (ms)',
+    'latencia_modelo_lote_p50_ms': 'Só Modelo Lote p50 (ms)',
+    'latencia_modelo_lote_p99_ms': 'Só Modelo Lote p99 (ms)',
+    'tamanho_modelo_mb': 'Disco (MB)',
+    'memoria_modelo_mb': 'Memória (MB)',
+    'pico_memoria_mb': 'Pico do Processo (MB)',
+}
+
+# Os resultados são relidos só quando o arquivo muda (mtime na chave do cache)
+@st.cache_data
+def carregar_resultados(caminho, mtime):
+    return ler_resultados(caminho)
+
+st.title("Comparação de Modelos")
+st.markdown(
+    "Custo e qualidade dos classificadores candidatos para a previsão de tipo de crime: "
+    "tempo de treino, latência de inferência (uma linha e um lote de 168 slots, como na "
+    "página de predição), tamanho, memória, acurácia e F1. A latência do pipeline inclui a "
+    "codificação dos registros, de custo igual para todos; a latência só do modelo é medida "
+    "sobre a matriz já codificada."
+)
+
+# Estado do trabalhador de retreino (retreino.py), se ele já rodou
+status_retreino = ler_status(CAMINHO_STATUS)
+if status_retreino is not None:
+    st.subheader("Retreino em Segundo Plano")
+    ciclos = status_retreino.get('ciclos', [])
+    col_r1, col_r2, col_r3 = st.columns(3)
+    col_r1.metric("Estado", status_retreino.get('estado', '-'))
+    col_r2.metric("Último ciclo", ciclos[-1]['concluido_em'] if ciclos else '-')
+    col_r3.metric("Seq do repositório no modelo", ciclos[-1]['seq_treino'] if ciclos else '-')
+    if status_retreino.get('erro'):
+        st.error(f"Último ciclo falhou: {status_retreino['erro']}")
+    if ciclos:
+        st.dataframe(pd.DataFrame(ciclos[::-1]), use_container_width=True, hide_index=True)
+    st.divider()
+
+if not os.path.exists(CAMINHO_RESULTADOS):
+    st.info(
+        "Nenhum benchmark encontrado. Gere os resultados com:\n\n"
+        "`python benchmark_modelos.py --processos 2`"
+    )
+    st.stop()
+
+relatorio = carregar_resultados(CAMINHO_RESULTADOS, os.path.getmtime(CAMINHO_RESULTADOS))
+# Benchmarks anteriores à latência só do modelo não têm essas colunas
+resultados = pd.DataFrame(relatorio['resultados']).reindex(
+    columns=[*COLUNAS_EXIBICAO, 'relatorio']
+)
+tem_latencia_modelo = resultados['latencia_modelo_linha_p50_ms'].notna().any()
+
+col1, col2, col3 = st.columns(3)
+col1.metric("Executado em", relatorio['executado_em'])
+col2.metric("Candidatos", len(resultados))
+col3.metric("Dataset", os.path.basename(relatorio['dataset']))
+
+st.divider()
+
+# Tabela comparativa
+st.subheader("Resumo dos Candidatos")
+tabela = resultados[list(COLUNAS_EXIBICAO)].rename(columns=COLUNAS_EXIBICAO).set_index('Modelo')
+st.dataframe(
+    tabela.style
+    .format('{:.3f}', subset=['F1 Macro', 'Acurácia'])
+    .format('{:.2f}', subset=[c for c in tabela.columns if c not in ('F1 Macro', 'Acurácia')], na_rep='-')
+    .highlight_max(subset=['F1 Macro', 'Acurácia'], color='#c6efce')
+    .highlight_min(subset=['Só Modelo Linha p50 (ms)', 'Só Modelo Lote p50 (ms)', 'Disco (MB)'], color='#c6efce'),
+    use_container_width=True,
+)
+
+# Qualidade x custo
+col_g1, col_g2 = st.columns(2)
+
+with col_g1:
+    opcoes_latencia = ['latencia_linha_p50_ms', 'latencia_lote_p50_ms']
+    if tem_latencia_modelo:
+        opcoes_latencia = ['latencia_modelo_linha_p50_ms', 'latencia_modelo_lote_p50_ms'] + opcoes_latencia
+    metrica_latencia = st.radio(
+        "Latência no eixo X", opcoes_latencia, format_func=lambda c: COLUNAS_EXIBICAO[c], horizontal=True
+    )
+    fig_custo = px.scatter(
+        resultados, x=metrica_latencia, y='f1_macro', size='tamanho_modelo_mb', color='modelo',
+        size_max=40, hover_data=['tempo_treino_s', 'memoria_modelo_mb'],
+        title="F1 Macro x Latência (tamanho do ponto = disco)", height=400,
+    )
+    fig_custo.update_traces(marker={'sizemin': 6})
+    fig_custo.update_layout(xaxis_title=COLUNAS_EXIBICAO[metrica_latencia], yaxis_title="F1 Macro")
+    st.plotly_chart(fig_custo, use_container_width=True)
+
+with col_g2:
+    # Só o modelo, quando medido: pelo pipeline todos pagam a mesma codificação
+    prefixo = 'latencia_modelo' if tem_latencia_modelo else 'latencia'
+    latencias = resultados.melt(
+        id_vars='modelo',
+        value_vars=[f'{prefixo}_{medida}' for medida in ('linha_p50_ms', 'linha_p99_ms', 'lote_p50_ms', 'lote_p99_ms')],
+        var_name='Medida', value_name='ms',
+    )
+    latencias['Medida'] = latencias['Medida'].map(COLUNAS_EXIBICAO)
+    titulo = "Latência Só do Modelo (p50/p99)" if tem_latencia_modelo else "Latência de Inferência (p50/p99)"
+    fig_latencia = px.bar(latencias, x='modelo', y='ms', color='Medida', barmode='group', title=titulo, height=400)
+    fig_latencia.update_layout(xaxis_title="", yaxis_title="ms")
+    st.plotly_chart(fig_latencia, use_container_width=True)
+
+col_g3, col_g4 = st.columns(2)
+
+with col_g3:
+    fig_treino = px.bar(resultados, x='modelo', y='tempo_treino_s', title="Tempo de Treino", height=350,
+                        color_discrete_sequence=['#CC3300'])
+    fig_treino.update_layout(xaxis_title="", yaxis_title="Segundos")
+    st.plotly_chart(fig_treino, use_container_width=True)
+
+with col_g4:
+    memoria = resultados.melt(id_vars='modelo', value_vars=['tamanho_modelo_mb', 'memoria_modelo_mb'],
+                              var_name='Medida', value_name='MB')
+    memoria['Medida'] = memoria['Medida'].map(COLUNAS_EXIBICAO)
+    fig_memoria = px.bar(memoria, x='modelo', y='MB', color='Medida', barmode='group',
+                         title="Tamanho em Disco e Memória do Modelo Carregado", height=350)
+    fig_memoria.update_layout(xaxis_title="")
+    st.plotly_chart(fig_memoria, use_container_width=True)
+
+# Relatório de classificação de um candidato
+with st.expander("Relatório de classificação por modelo"):
+    modelo_sel = st.selectbox("Modelo", resultados['modelo'].tolist())
+    st.code(resultados.set_index('modelo').loc[modelo_sel, 'relatorio'])
+
+# Candidatos do último treino (treinar_modelo.py), se houver
+if os.path.exists(CAMINHO_RELATORIO_TREINO):
+    st.divider()
+    st.subheader("Último Treino do Modelo Publicado")
+    with open(CAMINHO_RELATORIO_TREINO, encoding='utf-8') as f:
+        relatorio_treino = json.load(f)
+    st.markdown(f"**Melhor candidato:** `{relatorio_treino['melhor']}`")
+    candidatos = pd.DataFrame(relatorio_treino['candidatos'])
+    candidatos['parametros'] = candidatos['parametros'].astype(str)
+    st.dataframe(candidatos, use_container_width=True)
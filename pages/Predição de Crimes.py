@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
-import joblib
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
 import pydeck as pdk 
+import os
+
+from dados import ocorrencias_compartilhadas, contagem_valores, DIAS_SEMANA
+from filtros import IndiceFiltros
+import consultas
+from cubo import CuboContagens
+from espacial import NIVEIS_DETALHE, NIVEL_PADRAO, GradeRisco, agregar_frame, centro
+from registro_modelos import RegistroModelos
+from previsao import faixa_idade_estatisticas, perfil_entrada, prever_em_blocos, prever_superficie, slot_semanal
+from tabela_previsoes import CAMINHO_TABELA, HORAS_PADRAO, ler_tabela
+from tarefas import CONCLUIDA, ERRO, INTERVALO_ATUALIZACAO, acompanhar, chave_parametros, executor_compartilhado, grupo_da_sessao
 
 sns.set_style("whitegrid")
 
@@ -14,34 +24,69 @@ st.title("Predição Estratégica de Crimes - DELIT")
 st.markdown("Ferramenta de previsão para planejamento policial baseado em Machine Learning.")
 
 # Carregar dataset e modelo
-@st.cache_data
+# O dataset vem da camada de dados compartilhada (armazenamento colunar, com
+# dia_semana, mes, ano e hora_dia já calculados, + ocorrências novas por delta)
 def carregar_dados():
-    # OBSERVAÇÃO: Mantenha seu carregamento de dados original aqui
-    df = pd.read_csv("dataset_ocorrencias_delegacia_5.csv")
-    df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'])
-    df['dia_semana'] = df['data_ocorrencia'].dt.day_name().replace({
-        'Monday':'Segunda','Tuesday':'Terça','Wednesday':'Quarta',
-        'Thursday':'Quinta','Friday':'Sexta','Saturday':'Sábado','Sunday':'Domingo'
-    })
-    df['mes'] = df['data_ocorrencia'].dt.month
-    df['ano'] = df['data_ocorrencia'].dt.year
-    df['hora_dia'] = df['data_ocorrencia'].dt.hour
-    return df
-
-df = carregar_dados()
-
-# Carregar modelo e colunas
+    ocorrencias = ocorrencias_compartilhadas()
+    ocorrencias.atualizar()
+    return ocorrencias
+
+ocorrencias = carregar_dados()
+indice_filtros = ocorrencias.indice(IndiceFiltros)
+cubo = ocorrencias.indice(CuboContagens)
+# Grade da área da delegacia (centro e bairro de cada célula) para o mapa de risco
+grade_risco = ocorrencias.indice(GradeRisco)
+# Opções dos filtros a partir das estatísticas do dataset (sem varrer as linhas)
+estatisticas = ocorrencias.estatisticas
+
+# Registro de modelos: uma instância por processo, compartilhada entre as sessões.
+# Cada versão do modelo.pkl é carregada uma vez e trocada automaticamente quando
+# um novo treino publica outro arquivo
+@st.cache_resource
+def carregar_registro():
+    return RegistroModelos()
+
+# Carregar o pipeline (codificador + layout das colunas + modelo)
 try:
-    modelo = joblib.load("modelo.pkl")
-    colunas = joblib.load("colunas.pkl")
+    registro_modelos = carregar_registro()
+    versao_modelo = registro_modelos.obter("modelo.pkl")
+    modelo = versao_modelo.pipeline
     classes_modelo = modelo.classes_
 except FileNotFoundError:
-    st.error("Erro: Arquivos 'modelo.pkl' ou 'colunas.pkl' não encontrados. Verifique os caminhos.")
+    st.error("Erro: Arquivo 'modelo.pkl' não encontrado. Verifique o caminho ou rode treinar_modelo.py.")
+    st.stop()
+except TypeError as erro:
+    st.error(f"Erro: {erro}")
     st.stop()
 except AttributeError:
     # Garantia em caso de erro no modelo, para que a execução continue
     classes_modelo = np.array(['Crime A', 'Crime B', 'Crime C', 'Crime D']) 
 
+# Uma versão nova que falhou ao carregar em segundo plano não derruba a página:
+# a versão anterior segue em uso e o erro fica visível aqui
+falha_modelo = registro_modelos.falha("modelo.pkl")
+if falha_modelo is not None:
+    st.warning(
+        f"A nova versão do modelo.pkl não pôde ser carregada ({falha_modelo['erro']}, "
+        f"{datetime.fromtimestamp(falha_modelo['em']):%d/%m %H:%M}); a versão anterior continua em uso."
+    )
+
+# Tabela de previsões materializada depois do treino (tabela_previsoes.py);
+# relida só quando o meta.json muda
+@st.cache_resource
+def carregar_tabela(mtime):
+    return ler_tabela(CAMINHO_TABELA)
+
+try:
+    tabela_previsoes = carregar_tabela(os.path.getmtime(os.path.join(CAMINHO_TABELA, "meta.json")))
+except OSError:
+    tabela_previsoes = None
+
+st.caption(
+    f"Modelo {versao_modelo.hash[:12]} · carregado em {versao_modelo.tempo_carga:.2f}s · "
+    f"{versao_modelo.bytes_modelo / 1e6:.0f} MB em memória"
+)
+
 # --- Seleção do horizonte de previsão ---
 st.subheader("Escolha o horizonte de previsão")
 horizonte = st.selectbox(
@@ -76,10 +121,10 @@ st.subheader("Filtros Interativos")
 # Primeira linha de filtros (Local e Tempo)
 col1, col2, col3 = st.columns(3)
 with col1:
-    bairros = df['bairro'].unique()
+    bairros = estatisticas.valores('bairro')
     bairro_selecionado = st.multiselect("Bairro", bairros, default=[]) 
 with col2:
-    dias_semana = df['dia_semana'].unique()
+    dias_semana = [dia for dia in DIAS_SEMANA if dia in estatisticas.frequencias['dia_semana']]
     dia_selecionado = st.multiselect("Dia da Semana", dias_semana, default=[]) 
 with col3:
     horas = range(0,24)
@@ -88,30 +133,36 @@ with col3:
 # Segunda linha de filtros (Características do Crime)
 col4, col5, col6, col7 = st.columns(4)
 with col4:
-    crimes = df['tipo_crime'].unique()
+    crimes = estatisticas.valores('tipo_crime')
     crime_selecionado = st.multiselect("Tipo de Crime Histórico", crimes, default=[]) 
 with col5:
-    armas = df['arma_utilizada'].unique()
+    armas = estatisticas.valores('arma_utilizada')
     arma_selecionada = st.multiselect("Arma Utilizada", armas, default=[])
 with col6:
-    generos = df['sexo_suspeito'].dropna().unique()
+    generos = estatisticas.valores('sexo_suspeito')
     genero_selecionado = st.multiselect("Gênero Suspeito", generos, default=[])
 with col7:
-    idade_min = int(df['idade_suspeito'].min()) if not df['idade_suspeito'].empty and not pd.isna(df['idade_suspeito'].min()) else 18
-    idade_max = int(df['idade_suspeito'].max()) if not df['idade_suspeito'].empty and not pd.isna(df['idade_suspeito'].max()) else 60
+    idade_min, idade_max = faixa_idade_estatisticas(estatisticas)
     idade_selecionada = st.slider("Idade do Suspeito", idade_min, idade_max, (idade_min, idade_max))
 
 
 # --- Filtrando o dataset histórico relevante ---
-df_filtrado = df[
-    (df['bairro'].isin(bairro_selecionado) if bairro_selecionado else True) &
-    (df['dia_semana'].isin(dia_selecionado) if dia_selecionado else True) &
-    (df['tipo_crime'].isin(crime_selecionado) if crime_selecionado else True) &
-    (df['arma_utilizada'].isin(arma_selecionada) if arma_selecionada else True) &
-    (df['sexo_suspeito'].isin(genero_selecionado) if genero_selecionado else True) &
-    (df['idade_suspeito'].between(idade_selecionada[0], idade_selecionada[1])) &
-    (df['hora_dia'].between(hora_selecionada[0], hora_selecionada[1]))
-]
+# O índice de filtros parte do filtro mais seletivo e só verifica os demais nos
+# candidatos. Ocorrências cadastradas sem idade (NA) não entram no recorte por idade
+df_filtrado = consultas.filtrar(
+    ocorrencias,
+    categoricas={
+        'bairro': bairro_selecionado,
+        'dia_semana': dia_selecionado,
+        'tipo_crime': crime_selecionado,
+        'arma_utilizada': arma_selecionada,
+        'sexo_suspeito': genero_selecionado,
+    },
+    intervalos={
+        'idade_suspeito': idade_selecionada,
+        'hora_dia': hora_selecionada,
+    },
+)
 
 # --- Previsão de Top N Crimes Mais Prováveis ---
 st.subheader(f"Previsão Estratégica para: {horizonte}")
@@ -119,42 +170,81 @@ st.subheader(f"Previsão Estratégica para: {horizonte}")
 if df_filtrado.empty:
     st.warning("Não há dados históricos suficientes para gerar previsão com os filtros selecionados.")
 else:
-    # Tratamento de dados: usamos dropna() para garantir que a média e moda não falhem
-    df_limpo = df_filtrado.dropna(subset=['quantidade_vitimas', 'quantidade_suspeitos', 'idade_suspeito'])
-    
-    if df_limpo.empty:
+    # --- Probabilidades para todos os slots da semana ---
+    # Com os filtros padrão (no máximo um bairro e um tipo de crime) elas vêm da
+    # tabela materializada; nas demais combinações, de uma única chamada ao
+    # modelo com a entrada base (modas/médias do histórico filtrado)
+    probabilidades_slots = None
+    entrada_base = None
+    resultado_previsao = None
+    perfil_tabela = (
+        bairro_selecionado[0] if bairro_selecionado else None,
+        crime_selecionado[0] if crime_selecionado else None,
+    )
+    filtros_padrao = (
+        len(bairro_selecionado) <= 1 and len(crime_selecionado) <= 1
+        and not dia_selecionado and not arma_selecionada and not genero_selecionado
+        and hora_selecionada == HORAS_PADRAO and idade_selecionada == (idade_min, idade_max)
+    )
+    if (
+        filtros_padrao and tabela_previsoes is not None
+        and tabela_previsoes.valida_para(versao_modelo.hash, classes_modelo, (idade_min, idade_max))
+    ):
+        probabilidades_slots = tabela_previsoes.consultar(*perfil_tabela)
+    origem_previsao = "tabela materializada" if probabilidades_slots is not None else "calculada ao vivo"
+    if probabilidades_slots is None:
+        entrada_base = perfil_entrada(df_filtrado)
+
+    if probabilidades_slots is None and entrada_base is None:
         st.warning("Os filtros selecionados resultam em dados vazios após a limpeza de valores ausentes.")
     else:
-        # Criação da entrada de dados com as médias/modas do histórico filtrado (base para a previsão)
-        entrada_base = {
-            'bairro': df_filtrado['bairro'].mode()[0],
-            'arma_utilizada': df_filtrado['arma_utilizada'].mode()[0],
-            'quantidade_vitimas': int(df_limpo['quantidade_vitimas'].mean()),
-            'quantidade_suspeitos': int(df_limpo['quantidade_suspeitos'].mean()),
-            'sexo_suspeito': df_filtrado['sexo_suspeito'].mode()[0] if not df_filtrado['sexo_suspeito'].mode().empty else 'NA',
-            'idade_suspeito': int(df_limpo['idade_suspeito'].mean()),
-            'latitude': df_filtrado['latitude'].mean(),
-            'longitude': df_filtrado['longitude'].mean()
-        }
+        # --- Range de datas e horas do horizonte (amostragem) ---
+        # Para evitar processamento muito longo, criamos uma amostra razoável
+        if horizonte in ["Próximo Mês", "Próximo Semestre"]:
+            # Amostra a cada 6 horas para meses/semestres
+            freq = '6h'
+        else:
+            # Amostra a cada 1 hora para dias/semanas
+            freq = 'h'
+            
+        data_range = pd.date_range(start=inicio, end=fim, freq=freq)
         
+        # Se o range for muito pequeno (e.g., Amanhã), vamos replicar para simular mais "ocorrências"
+        if len(data_range) < 24:
+             data_range = pd.date_range(start=inicio, end=fim + timedelta(hours=23), freq='h')
+
+        # A inferência ao vivo e a expansão do horizonte rodam como tarefa no
+        # executor do processo: deduplicada pelos parâmetros, com parciais por
+        # bloco e cancelada quando a sessão muda os filtros antes do fim
+        chave_previsao = chave_parametros(
+            "previsao", versao_modelo.hash, origem_previsao,
+            (perfil_tabela, tabela_previsoes.meta['gerada_em']) if entrada_base is None else entrada_base,
+            data_range[0], data_range[-1], data_range.freqstr,
+        )
+        tarefa_previsao = executor_compartilhado().submeter(
+            prever_em_blocos, modelo, classes_modelo, data_range,
+            probabilidades=probabilidades_slots, entrada_base=entrada_base,
+            chave=chave_previsao, grupo=grupo_da_sessao("previsao"), descricao=f"Previsão para {horizonte}",
+        )
+        # Tarefas curtas terminam dentro da espera e a página é exibida de uma vez
+        tarefa_previsao.aguardar(INTERVALO_ATUALIZACAO)
+        resultado_previsao = tarefa_previsao.resultado if tarefa_previsao.estado == CONCLUIDA else tarefa_previsao.parcial
+
+        if tarefa_previsao.estado == ERRO:
+            st.error(f"Erro ao calcular a previsão: {tarefa_previsao.erro}")
+        elif tarefa_previsao.ativa:
+            acompanhar(tarefa_previsao, tarefa_previsao.versao)
+
+    if resultado_previsao is not None:
+        st.caption(f"Previsão: {origem_previsao}")
+        probabilidades_slots = resultado_previsao['probabilidades']
+
         # --- Previsão de Top 3 (Para o texto principal) ---
         # A previsão do Top 3 deve ser feita usando as horas e dias mais prováveis/filtrados
-        entrada_media_top3 = entrada_base.copy()
-        entrada_media_top3['dia_semana'] = df_filtrado['dia_semana'].mode()[0]
-        entrada_media_top3['hora_dia'] = int(df_filtrado['hora_dia'].mean())
-        
-        entrada_df_top3 = pd.DataFrame([entrada_media_top3])
-        entrada_df_top3 = pd.get_dummies(entrada_df_top3)
-        entrada_df_top3 = entrada_df_top3.reindex(columns=colunas, fill_value=0)
+        dia_top3, hora_top3 = consultas.slot_padrao(df_filtrado)
 
-        # Usando predict_proba para obter as probabilidades
-        probabilidades = modelo.predict_proba(entrada_df_top3)[0]
-        
-        # Cria um DataFrame de resultados
-        df_prob = pd.DataFrame({
-            'Tipo de Crime': classes_modelo,
-            'Probabilidade': probabilidades
-        }).sort_values('Probabilidade', ascending=False).head(3)
+        # Probabilidades do slot na matriz da semana (predict_proba já calculado)
+        df_prob = consultas.top_crimes(probabilidades_slots, classes_modelo, dia_top3, hora_top3)
         
         # Apresentação do Top 3
         st.markdown(f"**Tipo de crime mais provável:** **{df_prob.iloc[0]['Tipo de Crime']}**")
@@ -166,62 +256,9 @@ else:
         
         st.table(df_prob.reset_index(drop=True))
 
-        # --- Geração de Dados Sintéticos de Previsão para os Gráficos ---
-        
-        # Mapeamento de dias da semana para uso no loop (NOVA LINHA)
-        dias_pt = {
-            'Monday': 'Segunda', 'Tuesday': 'Terça', 'Wednesday': 'Quarta',
-            'Thursday': 'Quinta', 'Friday': 'Sexta', 'Saturday': 'Sábado', 'Sunday': 'Domingo'
-        }
-
-        # 1. Cria um range de datas e horas para o horizonte (amostragem)
-        # Para evitar processamento muito longo, criamos uma amostra razoável
-        if horizonte in ["Próximo Mês", "Próximo Semestre"]:
-            # Amostra a cada 6 horas para meses/semestres
-            freq = '6H' 
-        else:
-            # Amostra a cada 1 hora para dias/semanas
-            freq = 'H'
-            
-        data_range = pd.date_range(start=inicio, end=fim, freq=freq)
-        
-        # Se o range for muito pequeno (e.g., Amanhã), vamos replicar para simular mais "ocorrências"
-        if len(data_range) < 24:
-             data_range = pd.date_range(start=inicio, end=fim + timedelta(hours=23), freq='H')
-
-        
-        previsao_list = []
-        
-        # 2. Loop para fazer a previsão para cada ponto no tempo
-        for dt in data_range:
-            # Pega o nome do dia da semana (que é uma string)
-            dia_semana_en = dt.day_name()
-            # Mapeia a string para o português usando .get() - CORREÇÃO
-            dia_semana_prev = dias_pt.get(dia_semana_en, dia_semana_en)
-            
-            hora_dia_prev = dt.hour
-            
-            # Cria a linha de entrada com as características do filtro + o tempo atual
-            entrada_prev = entrada_base.copy()
-            entrada_prev['dia_semana'] = dia_semana_prev
-            entrada_prev['hora_dia'] = hora_dia_prev
-            
-            # Converte para DataFrame e faz One-Hot Encoding
-            df_entrada_prev = pd.DataFrame([entrada_prev])
-            df_entrada_prev = pd.get_dummies(df_entrada_prev)
-            df_entrada_prev = df_entrada_prev.reindex(columns=colunas, fill_value=0)
-            
-            # 3. Faz a previsão
-            pred_crime = modelo.predict(df_entrada_prev)[0]
-            
-            previsao_list.append({
-                'tipo_crime_previsto': pred_crime,
-                'dia_semana_previsto': dia_semana_prev,
-                'hora_dia_previsto': hora_dia_prev
-            })
-            
-        # Cria o DataFrame de previsões
-        df_previsao = pd.DataFrame(previsao_list)
+        # --- Previsões expandidas sobre o horizonte (parciais enquanto a tarefa roda) ---
+        if not resultado_previsao['previsao'].empty:
+            df_previsao = resultado_previsao['previsao']
 
 
 # --- Gráficos de Previsão Interativos ---
@@ -266,7 +303,21 @@ else:
     with col_g3:
         # Nota: O modelo prevê o crime, mas a arma é uma das variáveis de entrada. 
         # Manter este gráfico histórico filtrado é útil para entender o *contexto* da previsão.
-        armas = df_filtrado['arma_utilizada'].value_counts().head(5)
+        # Quando os filtros cabem nas dimensões do cubo (sem dia, gênero ou recorte
+        # de idade), a contagem sai dele; senão, do recorte histórico
+        filtros_no_cubo = (
+            not dia_selecionado and not genero_selecionado
+            and idade_selecionada == (idade_min, idade_max) and indice_filtros.sem_nulos['idade_suspeito']
+        )
+        if filtros_no_cubo:
+            armas = cubo.contar('arma_utilizada', {
+                'bairro': bairro_selecionado,
+                'tipo_crime': crime_selecionado,
+                'arma_utilizada': arma_selecionada,
+                'hora_dia': hora_selecionada,
+            }).nlargest(5)
+        else:
+            armas = contagem_valores(df_filtrado['arma_utilizada']).head(5)
         fig, ax = plt.subplots(figsize=(8,3))
         sns.barplot(x=armas.values, y=armas.index, palette="Blues_r", ax=ax)
         ax.set_xlabel("Ocorrências Históricas")
@@ -291,16 +342,22 @@ else:
 # --- Mapas Lado a Lado ---
 st.subheader("Visualização Geográfica (Ocorrências Filtradas)")
 
-# Garantindo que o dataframe para o mapa só tenha lat/lon válidas
-map_data = df_filtrado[['latitude', 'longitude']].dropna()
+nivel_mapa = st.selectbox(
+    "Nível de detalhe dos mapas", list(NIVEIS_DETALHE), index=list(NIVEIS_DETALHE).index(NIVEL_PADRAO)
+)
+
+# Os mapas recebem as células da grade (centroide + contagem) já agregadas no
+# servidor, só com lat/lon válidas; o tamanho do payload é limitado pelas células
+map_data = agregar_frame(df_filtrado, nivel_mapa)
 
 if map_data.empty:
     st.warning("Não há dados de latitude/longitude válidos para exibir os mapas com os filtros selecionados.")
 else:
     # Define o estado de visualização centralizado na média dos dados filtrados
+    latitude_centro, longitude_centro = centro(map_data)
     view_state = pdk.ViewState(
-        latitude=map_data['latitude'].mean(),
-        longitude=map_data['longitude'].mean(),
+        latitude=latitude_centro,
+        longitude=longitude_centro,
         zoom=11,
         pitch=0
     )
@@ -311,6 +368,7 @@ else:
         data=map_data,
         opacity=0.8,
         get_position=["longitude", "latitude"],
+        get_weight="peso",
         threshold=0.1, 
         aggregation=pdk.types.String("SUM"),
         radius_pixels=50
@@ -330,6 +388,82 @@ else:
         st.pydeck_chart(r)
 
     with col_mapa_pontos:
-        st.markdown("**Mapa de Ocorrências (Localização Exata Histórica)**")
-        # Renderiza o mapa de pontos (st.map)
-        st.map(map_data)
\ No newline at end of file
+        st.markdown("**Mapa de Ocorrências (Células da Grade, Tamanho pela Contagem)**")
+        # Renderiza o mapa de pontos (st.map), um ponto por célula com raio pela contagem
+        raio = np.sqrt(map_data['peso'] / map_data['peso'].max()) * NIVEIS_DETALHE[nivel_mapa] * 111_000 / 2
+        st.map(map_data.assign(raio=raio.clip(lower=5)), latitude='latitude', longitude='longitude', size='raio')
+
+
+# --- Mapa de Risco Previsto ---
+st.subheader("Mapa de Risco Previsto")
+st.markdown(
+    "Probabilidade prevista pelo modelo para o tipo de crime escolhido em cada célula de uma grade "
+    "que cobre a área da delegacia, no dia da semana e hora selecionados."
+)
+
+# Perfil da entrada (arma, vítimas, suspeitos, idade...) do histórico filtrado;
+# bairro e coordenadas vêm de cada célula
+perfil_risco = None
+if not df_filtrado.empty:
+    perfil_risco = entrada_base if entrada_base is not None else perfil_entrada(df_filtrado)
+
+if perfil_risco is None:
+    st.warning("Não há histórico filtrado suficiente para montar o perfil do mapa de risco.")
+else:
+    classes_risco = [str(classe) for classe in classes_modelo]
+    crime_padrao = crime_selecionado[0] if crime_selecionado and crime_selecionado[0] in classes_risco else (
+        df_prob.iloc[0]['Tipo de Crime'] if 'df_prob' in locals() else classes_risco[0]
+    )
+    col_r1, col_r2, col_r3 = st.columns(3)
+    crime_risco = col_r1.selectbox("Tipo de crime do mapa", classes_risco, index=classes_risco.index(str(crime_padrao)))
+    dia_padrao, hora_padrao = consultas.slot_padrao(df_filtrado)
+    dia_risco = col_r2.selectbox("Dia da semana do mapa", DIAS_SEMANA, index=DIAS_SEMANA.index(dia_padrao))
+    hora_risco = col_r3.slider("Hora do mapa", 0, 23, hora_padrao)
+
+    celulas_risco = grade_risco.celulas(NIVEIS_DETALHE[nivel_mapa])
+    # Células pontuadas em partes (pontos de cancelamento), como tarefa do executor:
+    # a superfície de cada (versão do modelo, slot, perfil, grade) é calculada uma
+    # vez e reaproveitada por todas as sessões; trocar o tipo de crime só muda a
+    # coluna lida das probabilidades
+    tarefa_risco = executor_compartilhado().submeter(
+        prever_superficie, modelo, celulas_risco, perfil_risco, dia_risco, hora_risco,
+        chave=chave_parametros(
+            "superficie", versao_modelo.hash, slot_semanal(DIAS_SEMANA.index(dia_risco), hora_risco).item(),
+            perfil_risco, celulas_risco.attrs["passo"], grade_risco.n_indexado,
+        ),
+        grupo=grupo_da_sessao("superficie"), descricao="Mapa de risco",
+    )
+    tarefa_risco.aguardar(INTERVALO_ATUALIZACAO)
+
+    if tarefa_risco.estado == ERRO:
+        st.error(f"Erro ao calcular o mapa de risco: {tarefa_risco.erro}")
+    elif tarefa_risco.ativa:
+        acompanhar(tarefa_risco, tarefa_risco.versao)
+    elif tarefa_risco.estado == CONCLUIDA and not celulas_risco.empty:
+        superficie = consultas.risco_do_crime(celulas_risco, tarefa_risco.resultado, classes_risco, crime_risco)
+        camada_risco = pdk.Layer(
+            "HeatmapLayer",
+            data=superficie[['latitude', 'longitude', 'risco']],
+            opacity=0.8,
+            get_position=["longitude", "latitude"],
+            get_weight="risco",
+            aggregation=pdk.types.String("MEAN"),
+            color_range=[[255, 255, 178], [254, 204, 92], [253, 141, 60], [240, 59, 32], [189, 0, 38]],
+            radius_pixels=40
+        )
+        st.pydeck_chart(pdk.Deck(
+            layers=[camada_risco],
+            initial_view_state=pdk.ViewState(
+                latitude=float(superficie['latitude'].mean()),
+                longitude=float(superficie['longitude'].mean()),
+                zoom=11,
+                pitch=0
+            ),
+            map_style="mapbox://styles/mapbox/light-v9"
+        ))
+        maior_risco = superficie.loc[superficie['risco'].idxmax()]
+        st.caption(
+            f"{len(superficie)} células de ~{celulas_risco.attrs['passo'] * 111_000:.0f} m · "
+            f"maior risco de {crime_risco} às {hora_risco}h de {dia_risco}: {maior_risco['risco']:.1%} "
+            f"em {maior_risco['bairro']} ({maior_risco['latitude']:.4f}, {maior_risco['longitude']:.4f})"
+        )
@@ -0,0 +1,257 @@
+"""Dataset de várias delegacias particionado por delegacia e mês.
+
+Uso (gera as partições a partir de uma exportação única):
+    python particoes.py --dataset exportacao_cidade.csv --destino ocorrencias_particionadas
+
+Layout do diretório:
+
+    <raiz>/<orgao_responsavel>/<AAAA-MM>.csv
+    <raiz>/<orgao_responsavel>/<AAAA-MM>.colunar/   (gerado na primeira leitura)
+
+Linhas sem data válida ficam em `sem_data.csv` da delegacia. Cada partição é um
+CSV comum, convertido para o armazenamento colunar do `dados.py`.
+
+`carregar_particionado` descarta antes de ler as partições que não podem
+atender aos filtros: delegacia e mês pelo caminho, bairro pelo dicionário do
+meta.json da partição. As partições desatualizadas são convertidas em paralelo
+num pool de processos e as restantes são lidas (memory-map + filtro das linhas)
+num pool de threads, e os dicionários das categóricas são unificados no fim.
+Uma visão de uma delegacia num mês lê só aquela partição.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dados import (
+    COLUNAS_PADRAO, FORMATO_DATA, LINHAS_POR_BLOCO, colunar_atualizado, converter_para_colunar,
+    diretorio_colunar, ler_colunar, preparar_colunar,
+)
+from estatisticas import EstatisticasOcorrencias, ler_estatisticas
+
+SEM_DATA = "sem_data"
+SEM_ORGAO = "_sem_orgao"
+_PERIODO = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+class Particao:
+    def __init__(self, caminho, diretorio_orgao, periodo):
+        self.caminho = caminho
+        self.diretorio_orgao = diretorio_orgao
+        self.periodo = periodo
+        encontrado = _PERIODO.match(periodo)
+        if encontrado:
+            ano, mes = int(encontrado.group(1)), int(encontrado.group(2))
+            self.inicio = pd.Timestamp(ano, mes, 1)
+            self.fim = self.inicio + pd.DateOffset(months=1)
+        else:
+            self.inicio = self.fim = None
+
+    def __repr__(self):
+        return f"Particao({self.diretorio_orgao}/{self.periodo})"
+
+    def pode_conter_datas(self, datas):
+        """O mês da partição cruza o período (dia inicial, dia final), inclusive?"""
+        if datas is None:
+            return True
+        if self.inicio is None:
+            # Linhas sem data nunca entram num filtro de datas
+            return False
+        inicio, fim = pd.Timestamp(datas[0]), pd.Timestamp(datas[1]) + pd.Timedelta(days=1)
+        return self.inicio < fim and inicio < self.fim
+
+    def pode_conter(self, coluna, valores, meta):
+        return bool(set(valores) & set(meta["categorias"][coluna]))
+
+
+def nome_diretorio(orgao):
+    """Nome do diretório de uma delegacia (caracteres fora de letras, números, espaço e - viram _)."""
+    if orgao is None or pd.isna(orgao) or not str(orgao).strip():
+        return SEM_ORGAO
+    return re.sub(r"[^\w\- ]+", "_", str(orgao)).strip()
+
+
+def listar_particoes(raiz):
+    particoes = []
+    for diretorio_orgao in sorted(os.listdir(raiz)):
+        caminho_orgao = os.path.join(raiz, diretorio_orgao)
+        if not os.path.isdir(caminho_orgao):
+            continue
+        for arquivo in sorted(os.listdir(caminho_orgao)):
+            periodo, extensao = os.path.splitext(arquivo)
+            if extensao == ".csv":
+                particoes.append(Particao(os.path.join(caminho_orgao, arquivo), diretorio_orgao, periodo))
+    return particoes
+
+
+def selecionar_particoes(raiz, orgaos=None, datas=None):
+    """Partições que podem atender aos filtros de delegacia e período (só pelo caminho)."""
+    diretorios = {nome_diretorio(orgao) for orgao in orgaos} if orgaos else None
+    return [
+        particao for particao in listar_particoes(raiz)
+        if (diretorios is None or particao.diretorio_orgao in diretorios) and particao.pode_conter_datas(datas)
+    ]
+
+
+def preparar_particoes(particoes, processos=None):
+    """Converte em paralelo (processos) as partições sem armazenamento colunar atualizado."""
+    pendentes = [particao.caminho for particao in particoes if not colunar_atualizado(particao.caminho)]
+    if len(pendentes) > 1 and (processos or os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            list(executor.map(converter_para_colunar, pendentes))
+    else:
+        for caminho in pendentes:
+            converter_para_colunar(caminho)
+    return len(pendentes)
+
+
+def carregar_particionado(raiz, colunas=None, orgaos=None, bairros=None, datas=None, processos=None, threads=None):
+    """Ocorrências das partições de `raiz` que atendem aos filtros.
+
+    `orgaos` e `bairros` são listas de valores aceitos (None = sem filtro) e
+    `datas` um período (dia inicial, dia final), inclusive. Devolve o mesmo
+    frame de `dados.carregar_ocorrencias`, com as categóricas unificadas.
+    """
+    particoes = selecionar_particoes(raiz, orgaos, datas)
+    preparar_particoes(particoes, processos)
+    colunas = list(colunas or COLUNAS_PADRAO)
+    # As colunas dos filtros são lidas mesmo se não pedidas e descartadas no fim
+    leitura = colunas + [c for c in ("orgao_responsavel", "bairro", "data_ocorrencia") if c not in colunas]
+
+    def ler(particao):
+        meta = preparar_colunar(particao.caminho)
+        if bairros and not particao.pode_conter("bairro", bairros, meta):
+            return None
+        if orgaos and not particao.pode_conter("orgao_responsavel", orgaos, meta):
+            return None
+        df = ler_colunar(particao.caminho, meta, leitura)
+        mascara = _mascara(df, orgaos, bairros, datas, particao)
+        return df if mascara is None else df[mascara]
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        frames = [df for df in executor.map(ler, particoes) if df is not None]
+    if not frames:
+        # Nada atende aos filtros: frame vazio com o esquema de uma partição qualquer
+        todas = listar_particoes(raiz)
+        if not todas:
+            raise FileNotFoundError(f"Nenhuma partição encontrada em '{raiz}'.")
+        preparar_particoes(todas[:1])
+        frames = [ler_colunar(todas[0].caminho, preparar_colunar(todas[0].caminho), leitura).iloc[:0]]
+    return unificar(frames, leitura)[colunas]
+
+
+def estatisticas_particionado(raiz, processos=None):
+    """Soma das estatísticas gravadas na conversão de cada partição, ou None se faltar alguma."""
+    particoes = listar_particoes(raiz)
+    preparar_particoes(particoes, processos)
+    total = EstatisticasOcorrencias()
+    for particao in particoes:
+        estatisticas = ler_estatisticas(diretorio_colunar(particao.caminho))
+        if estatisticas is None:
+            return None
+        total.juntar(estatisticas)
+    return total
+
+
+def _mascara(df, orgaos, bairros, datas, particao):
+    mascara = np.ones(len(df), dtype=bool)
+    filtrado = False
+    if orgaos:
+        mascara &= df["orgao_responsavel"].isin(orgaos).to_numpy()
+        filtrado = True
+    if bairros:
+        mascara &= df["bairro"].isin(bairros).to_numpy()
+        filtrado = True
+    # A partição inteira dentro do período dispensa o filtro de datas
+    if datas is not None:
+        inicio, fim = pd.Timestamp(datas[0]), pd.Timestamp(datas[1]) + pd.Timedelta(days=1)
+        if not (inicio <= particao.inicio and particao.fim <= fim):
+            valores = df["data_ocorrencia"].to_numpy()
+            mascara &= (valores >= inicio.to_datetime64()) & (valores < fim.to_datetime64())
+            filtrado = True
+    return mascara if filtrado else None
+
+
+def unificar(frames, colunas):
+    """Concatena frames de partições, traduzindo os códigos para dicionários comuns."""
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+
+    unificados = {}
+    for coluna in colunas:
+        partes = [df[coluna] for df in frames]
+        if not isinstance(partes[0].dtype, pd.CategoricalDtype):
+            unificados[coluna] = pd.concat(partes, ignore_index=True)
+            continue
+        dicionarios = [parte.cat.categories for parte in partes]
+        if all(dicionario.equals(dicionarios[0]) for dicionario in dicionarios):
+            # Mesmo dicionário em todas (ex.: dia_semana): mantém a ordem original
+            categorias = dicionarios[0]
+        else:
+            categorias = pd.Index(sorted(set().union(*dicionarios)))
+        codigos = []
+        for parte, dicionario in zip(partes, dicionarios):
+            traducao = np.append(categorias.get_indexer(dicionario), -1).astype(np.int32)
+            codigos.append(traducao[parte.cat.codes.to_numpy()])
+        unificados[coluna] = pd.Categorical.from_codes(
+            np.concatenate(codigos), dtype=pd.CategoricalDtype(categorias), validate=False
+        )
+    return pd.DataFrame(unificados, copy=False)
+
+
+def particionar(caminho_csv, raiz, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Distribui um CSV de ocorrências nas partições delegacia/mês de `raiz`.
+
+    O CSV é lido em blocos e as linhas são anexadas aos CSVs das partições
+    sem conversão (o texto original é preservado). Devolve {partição: linhas}.
+    """
+    if os.path.isdir(raiz) and os.listdir(raiz):
+        raise FileExistsError(f"O diretório '{raiz}' já existe e não está vazio.")
+    os.makedirs(raiz, exist_ok=True)
+
+    contagem = {}
+    for bloco in pd.read_csv(caminho_csv, dtype=str, keep_default_na=False, chunksize=linhas_por_bloco):
+        datas = pd.to_datetime(bloco["data_ocorrencia"], format=FORMATO_DATA, errors="coerce")
+        # Chaves numéricas (ano * 100 + mês, código da delegacia); os nomes saem só das chaves distintas
+        periodos = (datas.dt.year * 100 + datas.dt.month).fillna(-1).astype(np.int64)
+        orgaos, nomes_orgaos = pd.factorize(bloco["orgao_responsavel"], use_na_sentinel=False)
+        for (orgao, periodo), linhas in bloco.groupby([orgaos, periodos.to_numpy()], sort=False):
+            diretorio_orgao = nome_diretorio(nomes_orgaos[orgao])
+            periodo = f"{periodo // 100:04d}-{periodo % 100:02d}" if periodo >= 0 else SEM_DATA
+            caminho = os.path.join(raiz, diretorio_orgao, periodo + ".csv")
+            novo = caminho not in contagem
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            linhas.to_csv(caminho, mode="w" if novo else "a", header=novo, index=False)
+            contagem[caminho] = contagem.get(caminho, 0) + len(linhas)
+    return contagem
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Particiona um CSV de ocorrências por delegacia e mês.")
+    parser.add_argument("--dataset", required=True, help="CSV de ocorrências de origem")
+    parser.add_argument("--destino", required=True, help="Diretório das partições (novo ou vazio)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=LINHAS_POR_BLOCO)
+    parser.add_argument("--processos", type=int, default=None, help="Processos na conversão para o formato colunar")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    inicio = time.perf_counter()
+    contagem = particionar(args.dataset, args.destino, args.linhas_por_bloco)
+    delegacias = {os.path.basename(os.path.dirname(caminho)) for caminho in contagem}
+    print(f"✅ {sum(contagem.values()):,} linhas em {len(contagem)} partições de {len(delegacias)} delegacias")
+
+    convertidas = preparar_particoes(listar_particoes(args.destino), args.processos)
+    print(f"✅ {convertidas} partições convertidas para o formato colunar em {time.perf_counter() - inicio:.1f}s")
+    print(f"ℹ️ Para usar no app: OCORRENCIAS_DADOS={args.destino} streamlit run Dataset.py")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
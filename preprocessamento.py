@@ -0,0 +1,199 @@
+"""Pipeline persistido de pré-processamento + modelo.
+
+Substitui o par `pd.get_dummies` + `reindex(columns=colunas)` usado no treino e
+na inferência. O pipeline guarda, num único artefato, o dicionário de
+categorias de cada feature, o layout das colunas e o modelo treinado, e
+codifica registros brutos direto para matrizes NumPy (densas ou esparsas).
+
+O layout é o mesmo do antigo `pd.get_dummies(X, drop_first=True)`: primeiro as
+features numéricas, depois uma coluna por categoria (em ordem alfabética),
+descartando a primeira categoria de cada feature.
+
+Quando o modelo é uma floresta, o pipeline guarda também a versão compilada
+dela (`floresta.FlorestaCompilada`), usada em lotes de até `MAX_LINHAS` linhas;
+lotes maiores vão para o `predict_proba` do próprio modelo.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from floresta import MAX_LINHAS, compilar as compilar_floresta
+
+FEATURES_NUMERICAS = [
+    "quantidade_vitimas",
+    "quantidade_suspeitos",
+    "idade_suspeito",
+    "hora_dia",
+    "latitude",
+    "longitude",
+]
+FEATURES_CATEGORICAS = ["bairro", "arma_utilizada", "sexo_suspeito", "dia_semana"]
+ALVO = "tipo_crime"
+VALOR_AUSENTE = "Desconhecido"
+
+
+class PipelineOcorrencias:
+    def __init__(self, modelo=None):
+        self.modelo = modelo
+        self.categorias = {}
+        self.medianas = {}
+        self.colunas = []
+        self.floresta = None
+        # Último `seq` do repositório de ocorrências incluído no treino (0 = só a base)
+        # e árvores acrescentadas por warm_start desde o último ajuste completo
+        self.seq_treino = 0
+        self.arvores_incrementais = 0
+
+    # --- Ajuste ---
+
+    def ajustar_codificador(self, df):
+        self.categorias = {}
+        for coluna in FEATURES_CATEGORICAS:
+            valores = _como_texto(df[coluna])
+            self.categorias[coluna] = sorted(pd.unique(valores).tolist())
+        self.medianas = {
+            coluna: float(pd.to_numeric(df[coluna], errors="coerce").median())
+            for coluna in FEATURES_NUMERICAS
+        }
+
+        self.colunas = list(FEATURES_NUMERICAS)
+        for coluna in FEATURES_CATEGORICAS:
+            self.colunas += [f"{coluna}_{valor}" for valor in self.categorias[coluna][1:]]
+        return self
+
+    def ajustar(self, df, y=None):
+        """Ajusta o codificador e treina o modelo sobre as ocorrências de `df`."""
+        self.ajustar_codificador(df)
+        if y is None:
+            y = _como_texto(df[ALVO])
+        self.modelo.fit(self.transformar(df), np.asarray(y))
+        self.compilar()
+        return self
+
+    def compilar(self):
+        """Gera a floresta compilada usada na inferência de lotes pequenos (None se o modelo não for uma floresta)."""
+        self.floresta = compilar_floresta(self.modelo)
+        return self.floresta
+
+    def categorias_desconhecidas(self, df):
+        """{feature: valores de `df` que o codificador não viu no ajuste}, só as que têm algum."""
+        desconhecidas = {}
+        for coluna in FEATURES_CATEGORICAS:
+            novas = set(pd.unique(_como_texto(df[coluna]))) - set(self.categorias[coluna])
+            if novas:
+                desconhecidas[coluna] = novas
+        return desconhecidas
+
+    # --- Codificação ---
+
+    def _deslocamentos(self):
+        deslocamento = len(FEATURES_NUMERICAS)
+        for coluna in FEATURES_CATEGORICAS:
+            yield coluna, deslocamento
+            deslocamento += len(self.categorias[coluna]) - 1
+
+    def _codigos(self, coluna, valores):
+        categorias = self.categorias[coluna]
+        if isinstance(valores.dtype, pd.CategoricalDtype):
+            # Caminho rápido para colunas categóricas (camada de dados colunar):
+            # traduz só o dicionário e aplica a tradução aos códigos
+            traducao = pd.Index(categorias).get_indexer(valores.cat.categories.astype(str))
+            # O último elemento atende o código -1 (nulo) do pandas
+            traducao = np.append(traducao, categorias.index(VALOR_AUSENTE) if VALOR_AUSENTE in categorias else -1)
+            return traducao[valores.cat.codes.to_numpy()]
+        return pd.Index(categorias).get_indexer(_como_texto(valores))
+
+    def _preparar(self, registros):
+        if isinstance(registros, dict):
+            registros = [registros]
+        if not isinstance(registros, pd.DataFrame):
+            registros = pd.DataFrame(registros)
+        return registros
+
+    def transformar(self, registros, esparso=False):
+        """Codifica registros (DataFrame, dict ou lista de dicts) em uma matriz.
+
+        Categorias não vistas no treino viram uma linha de zeros nas colunas da
+        feature, como acontecia no `reindex(..., fill_value=0)`.
+        """
+        registros = self._preparar(registros)
+        n = len(registros)
+
+        numericas = np.empty((n, len(FEATURES_NUMERICAS)), dtype=np.float32)
+        for j, coluna in enumerate(FEATURES_NUMERICAS):
+            valores = pd.to_numeric(registros[coluna], errors="coerce")
+            numericas[:, j] = valores.fillna(self.medianas[coluna]).to_numpy(dtype=np.float32)
+
+        linhas, colunas = [], []
+        for coluna, deslocamento in self._deslocamentos():
+            # O código 0 é a categoria descartada (drop_first) e -1 é desconhecida
+            codigos = self._codigos(coluna, registros[coluna])
+            presentes = np.flatnonzero(codigos > 0)
+            linhas.append(presentes)
+            colunas.append(deslocamento + codigos[presentes] - 1)
+        linhas = np.concatenate(linhas)
+        colunas = np.concatenate(colunas)
+
+        if esparso:
+            n_numericas = len(FEATURES_NUMERICAS)
+            densas = sparse.csr_matrix(numericas)
+            dummies = sparse.csr_matrix(
+                (np.ones(len(linhas), dtype=np.float32), (linhas, colunas - n_numericas)),
+                shape=(n, len(self.colunas) - n_numericas),
+            )
+            return sparse.hstack([densas, dummies], format="csr")
+
+        matriz = np.zeros((n, len(self.colunas)), dtype=np.float32)
+        matriz[:, :len(FEATURES_NUMERICAS)] = numericas
+        matriz[linhas, colunas] = 1.0
+        return matriz
+
+    # --- Inferência ---
+
+    @property
+    def classes_(self):
+        return self.modelo.classes_
+
+    def _estimador(self, X):
+        # Pipelines salvos antes da floresta compilada não têm o atributo
+        compilada = getattr(self, "floresta", None)
+        if compilada is not None and len(X) <= MAX_LINHAS:
+            return compilada
+        return self.modelo
+
+    def predict_proba(self, registros):
+        X = self.transformar(registros)
+        return self._estimador(X).predict_proba(X)
+
+    def predict(self, registros):
+        X = self.transformar(registros)
+        return self._estimador(X).predict(X)
+
+    # --- Persistência ---
+
+    def salvar(self, caminho):
+        # Grava em arquivo temporário e troca atomicamente: processos que já
+        # mapearam a versão anterior (mmap_mode) continuam lendo o arquivo antigo
+        temporario = caminho + ".tmp"
+        joblib.dump(self, temporario)
+        os.replace(temporario, caminho)
+
+    @staticmethod
+    def carregar(caminho):
+        pipeline = joblib.load(caminho)
+        if not isinstance(pipeline, PipelineOcorrencias):
+            raise TypeError(
+                f"'{caminho}' não contém um PipelineOcorrencias; retreine com treinar_modelo.py."
+            )
+        return pipeline
+
+
+def _como_texto(valores):
+    # Mesmo tratamento do treino original: nulos viram "Desconhecido"
+    valores = pd.Series(valores)
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        valores = valores.astype(object)
+    return valores.where(valores.notna(), VALOR_AUSENTE).astype(str).to_numpy()
@@ -0,0 +1,161 @@
+"""Previsão em lote para o horizonte da página de Predição de Crimes.
+
+Para uma `entrada_base` fixa, as únicas features que variam ao longo do
+horizonte são dia_semana e hora_dia. Existem então no máximo 7 x 24 = 168
+entradas distintas: elas são pontuadas uma única vez pelo `predict_proba` do
+pipeline e o resultado é expandido sobre os instantes do horizonte. O custo da
+inferência não depende do tamanho do horizonte.
+
+A superfície de risco segue a mesma ideia no espaço: para um slot (dia da
+semana e hora) e um perfil fixos, as células de uma `espacial.GradeRisco`
+(centro e bairro de cada célula) são pontuadas de uma vez.
+
+Quando rodam como tarefa (com `progresso`), as entradas são pontuadas em
+partes e o progresso é informado entre elas: cancelar a tarefa interrompe a
+inferência na parte seguinte, em vez de esperar a chamada inteira.
+"""
+import numpy as np
+import pandas as pd
+
+from dados import DIAS_SEMANA
+
+N_SLOTS = len(DIAS_SEMANA) * 24
+# Instantes do horizonte expandidos por bloco na previsão em segundo plano
+INSTANTES_POR_BLOCO = 168
+# Linhas por chamada a `predict_proba` nas tarefas: um dia de slots, e células da grade
+SLOTS_POR_PARTE = 24
+CELULAS_POR_PARTE = 1024
+
+
+def slot_semanal(dia_semana, hora_dia):
+    """Índice do slot semanal (0..167) para dia da semana (Segunda = 0) e hora."""
+    return np.asarray(dia_semana) * 24 + np.asarray(hora_dia)
+
+
+def faixa_idade(df):
+    """Faixa (mínima, máxima) do filtro de idade da página; 18-60 sem idades no histórico."""
+    idades = df['idade_suspeito']
+    idade_min = int(idades.min()) if not idades.empty and not pd.isna(idades.min()) else 18
+    idade_max = int(idades.max()) if not idades.empty and not pd.isna(idades.max()) else 60
+    return idade_min, idade_max
+
+
+def faixa_idade_estatisticas(estatisticas):
+    """Mesma faixa de `faixa_idade`, lida das estatísticas do dataset sem percorrer as linhas."""
+    faixa = estatisticas.faixa('idade_suspeito')
+    return (int(faixa[0]), int(faixa[1])) if faixa else (18, 60)
+
+
+def perfil_entrada(df_filtrado):
+    """Entrada base do modelo a partir do histórico filtrado (modas e médias).
+
+    Devolve None quando não sobra histórico com vítimas, suspeitos e idade
+    preenchidos para calcular as médias.
+    """
+    # Tratamento de dados: usamos dropna() para garantir que a média e moda não falhem
+    df_limpo = df_filtrado.dropna(subset=['quantidade_vitimas', 'quantidade_suspeitos', 'idade_suspeito'])
+    if df_limpo.empty:
+        return None
+    sexo = df_filtrado['sexo_suspeito'].mode()
+    return {
+        'bairro': df_filtrado['bairro'].mode()[0],
+        'arma_utilizada': df_filtrado['arma_utilizada'].mode()[0],
+        'quantidade_vitimas': int(df_limpo['quantidade_vitimas'].mean()),
+        'quantidade_suspeitos': int(df_limpo['quantidade_suspeitos'].mean()),
+        'sexo_suspeito': sexo[0] if not sexo.empty else 'NA',
+        'idade_suspeito': int(df_limpo['idade_suspeito'].mean()),
+        'latitude': df_filtrado['latitude'].mean(),
+        'longitude': df_filtrado['longitude'].mean()
+    }
+
+
+def entradas_por_slot(entrada_base):
+    """DataFrame com uma linha por slot semanal, na ordem de `slot_semanal`."""
+    entradas = pd.DataFrame([entrada_base] * N_SLOTS)
+    entradas['dia_semana'] = np.repeat(DIAS_SEMANA, 24)
+    entradas['hora_dia'] = np.tile(np.arange(24), len(DIAS_SEMANA))
+    return entradas
+
+
+def probabilidades_por_slot(pipeline, entrada_base, progresso=None, fracao=1.0):
+    """Matriz (168, n_classes) com as probabilidades de cada slot semanal.
+
+    Com `progresso`, pontua um dia por vez e informa até `fracao` do total.
+    """
+    return _pontuar(pipeline, entradas_por_slot(entrada_base), SLOTS_POR_PARTE, progresso, fracao, "pontuando slots")
+
+
+def _pontuar(pipeline, entradas, linhas_por_parte, progresso, fracao, mensagem):
+    # Sem progresso, uma chamada só; com progresso, uma por parte (ponto de cancelamento)
+    if entradas.empty:
+        return np.empty((0, len(pipeline.classes_)))
+    if progresso is None:
+        return pipeline.predict_proba(entradas)
+    partes = []
+    for inicio in range(0, len(entradas), linhas_por_parte):
+        fim = min(inicio + linhas_por_parte, len(entradas))
+        partes.append(pipeline.predict_proba(entradas.iloc[inicio:fim]))
+        progresso(fracao * fim / len(entradas), mensagem=f"{mensagem} ({fim:,}/{len(entradas):,})")
+    return np.concatenate(partes)
+
+
+def prever_horizonte(classes, probabilidades, data_range):
+    """Expande as previsões dos slots sobre os instantes de `data_range`.
+
+    Devolve o mesmo formato do antigo loop da página: uma linha por instante
+    com o crime previsto (classe de maior probabilidade), o dia da semana e a hora.
+    """
+    data_range = pd.DatetimeIndex(data_range)
+    slots = slot_semanal(data_range.dayofweek, data_range.hour)
+    previsto_por_slot = np.asarray(classes)[probabilidades.argmax(axis=1)]
+    return pd.DataFrame({
+        'tipo_crime_previsto': previsto_por_slot[slots],
+        'dia_semana_previsto': np.asarray(DIAS_SEMANA)[data_range.dayofweek],
+        'hora_dia_previsto': data_range.hour,
+    })
+
+
+def prever_em_blocos(pipeline, classes, data_range, probabilidades=None, entrada_base=None, progresso=None):
+    """Previsão do horizonte executada como tarefa (`tarefas.ExecutorTarefas`).
+
+    Usa as `probabilidades` por slot já conhecidas (tabela materializada) ou as
+    calcula a partir da `entrada_base` (um dia de slots por vez, na primeira
+    metade do progresso), e expande o horizonte em blocos de
+    `INSTANTES_POR_BLOCO` instantes. A cada bloco `progresso(fracao, parcial)`
+    recebe as probabilidades e a previsão acumulada até ali; o retorno é o
+    último parcial, com o horizonte inteiro.
+    """
+    inicio_expansao = 0.0
+    if probabilidades is None:
+        inicio_expansao = 0.5
+        probabilidades = probabilidades_por_slot(pipeline, entrada_base, progresso, inicio_expansao)
+    data_range = pd.DatetimeIndex(data_range)
+    blocos = []
+    # Primeiro parcial: só as probabilidades (o Top 3 da página já pode ser exibido)
+    parcial = {'probabilidades': probabilidades, 'previsao': prever_horizonte(classes, probabilidades, data_range[:0])}
+    if progresso is not None:
+        progresso(inicio_expansao, parcial)
+    for inicio in range(0, len(data_range), INSTANTES_POR_BLOCO):
+        fim = min(inicio + INSTANTES_POR_BLOCO, len(data_range))
+        blocos.append(prever_horizonte(classes, probabilidades, data_range[inicio:fim]))
+        parcial = {'probabilidades': probabilidades, 'previsao': pd.concat(blocos, ignore_index=True)}
+        if progresso is not None:
+            progresso(inicio_expansao + (1 - inicio_expansao) * fim / len(data_range), parcial)
+    return parcial
+
+
+def prever_superficie(pipeline, celulas, entrada_base, dia_semana, hora_dia, progresso=None):
+    """Probabilidades (n_células, n_classes) de cada célula da grade num slot semanal.
+
+    A entrada de cada célula é o perfil `entrada_base` com o bairro e as
+    coordenadas da célula. Sem `progresso`, todas as células vão numa única
+    chamada a `predict_proba`; como tarefa no executor, são pontuadas em partes
+    de `CELULAS_POR_PARTE`, com `progresso(fracao, mensagem=...)` entre elas.
+    """
+    entradas = pd.DataFrame([entrada_base] * len(celulas))
+    entradas['bairro'] = celulas['bairro'].to_numpy()
+    entradas['latitude'] = celulas['latitude'].to_numpy()
+    entradas['longitude'] = celulas['longitude'].to_numpy()
+    entradas['dia_semana'] = dia_semana
+    entradas['hora_dia'] = hora_dia
+    return _pontuar(pipeline, entradas, CELULAS_POR_PARTE, progresso, 1.0, "pontuando células").astype(np.float32)
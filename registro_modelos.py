@@ -0,0 +1,195 @@
+"""Registro de modelos compartilhado pelo processo do Streamlit.
+
+Cada versão do `modelo.pkl` é identificada pelo hash SHA-256 do conteúdo e é
+desserializada uma única vez por processo; todas as sessões recebem a mesma
+instância. A cada `obter()` o registro compara tamanho/mtime do arquivo e, se
+ele mudou (um novo treino publicou outra versão), carrega a nova versão sem
+precisar reiniciar o servidor. Quando já existe uma versão em uso, a nova é
+carregada numa thread e as sessões continuam recebendo a atual até ela ficar
+pronta, então a publicação (por exemplo pelo `retreino.py`) não trava nenhuma
+requisição.
+
+O carregamento usa `joblib.load(mmap_mode="r")`: os arrays grandes do pickle
+são lidos por memory-map em vez de copiados para buffers temporários. As
+árvores do scikit-learn copiam seus nós para memória própria ao serem
+reconstruídas, então o ganho aqui é no pico de memória do carregamento; o
+compartilhamento real de páginas entre processos vem dos arrays NumPy puros,
+como os da floresta compilada que o pipeline usa na inferência. Pipelines
+salvos antes dela são compilados ao carregar.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+
+CAMINHO_MODELO = "modelo.pkl"
+
+_log = logging.getLogger(__name__)
+
+
+class VersaoModelo:
+    def __init__(self, hash_conteudo, caminho, pipeline, tempo_carga, tamanho_arquivo, bytes_modelo):
+        self.hash = hash_conteudo
+        self.caminho = caminho
+        self.pipeline = pipeline
+        self.tempo_carga = tempo_carga
+        self.tamanho_arquivo = tamanho_arquivo
+        self.bytes_modelo = bytes_modelo
+        self.carregado_em = time.time()
+
+    def resumo(self):
+        return {
+            "hash": self.hash,
+            "caminho": self.caminho,
+            "tempo_carga_s": round(self.tempo_carga, 3),
+            "tamanho_arquivo_mb": round(self.tamanho_arquivo / 1e6, 2),
+            "memoria_modelo_mb": round(self.bytes_modelo / 1e6, 2),
+        }
+
+
+class RegistroModelos:
+    def __init__(self, mmap_mode="r", versoes_mantidas=2, troca_em_segundo_plano=True):
+        self.mmap_mode = mmap_mode
+        self.versoes_mantidas = versoes_mantidas
+        self.troca_em_segundo_plano = troca_em_segundo_plano
+        self._versoes = {}
+        self._assinaturas = {}
+        self._trocas = {}
+        self._falhas = {}
+        self._trava = threading.Lock()
+
+    def obter(self, caminho=CAMINHO_MODELO):
+        """Versão atual do modelo em `caminho`, carregando-a só se ela mudou."""
+        assinatura = _assinatura(caminho)
+        with self._trava:
+            conhecida = self._assinaturas.get(caminho)
+            if conhecida is not None and conhecida[0] == assinatura:
+                return self._versoes[conhecida[1]]
+
+            if conhecida is not None and self.troca_em_segundo_plano:
+                if assinatura not in (self._trocas.get(caminho), self._falhas.get(caminho, {}).get("assinatura")):
+                    self._trocas[caminho] = assinatura
+                    threading.Thread(target=self._trocar, args=(caminho, assinatura), daemon=True).start()
+                return self._versoes[conhecida[1]]
+
+            hash_conteudo = hash_arquivo(caminho)
+            if hash_conteudo not in self._versoes:
+                self._versoes[hash_conteudo] = self._carregar(caminho, hash_conteudo)
+            self._publicar(caminho, assinatura, hash_conteudo)
+            return self._versoes[hash_conteudo]
+
+    def trocando(self, caminho=CAMINHO_MODELO):
+        """Há uma versão nova de `caminho` sendo carregada em segundo plano?"""
+        with self._trava:
+            return caminho in self._trocas
+
+    def falha(self, caminho=CAMINHO_MODELO):
+        """Última falha ao carregar uma versão nova de `caminho` ({"erro", "em"}), ou None.
+
+        A versão anterior continua em uso; a falha é esquecida quando outra
+        versão é publicada com sucesso.
+        """
+        with self._trava:
+            falha = self._falhas.get(caminho)
+        return None if falha is None else {"erro": falha["erro"], "em": falha["em"]}
+
+    def _trocar(self, caminho, assinatura):
+        # Hash e desserialização fora da trava: obter() segue servindo a versão atual
+        try:
+            hash_conteudo = hash_arquivo(caminho)
+            versao = self._versoes.get(hash_conteudo) or self._carregar(caminho, hash_conteudo)
+        except Exception as erro:
+            # Arquivo inválido: a versão atual continua e só uma nova publicação
+            # (outra assinatura) faz o registro tentar de novo
+            _log.exception("Falha ao carregar a nova versão de %s", caminho)
+            with self._trava:
+                self._trocas.pop(caminho, None)
+                self._falhas[caminho] = {
+                    "assinatura": assinatura, "erro": f"{type(erro).__name__}: {erro}", "em": time.time(),
+                }
+            return
+        with self._trava:
+            self._versoes.setdefault(hash_conteudo, versao)
+            self._trocas.pop(caminho, None)
+            self._publicar(caminho, assinatura, hash_conteudo)
+
+    def _publicar(self, caminho, assinatura, hash_conteudo):
+        self._assinaturas[caminho] = (assinatura, hash_conteudo)
+        self._falhas.pop(caminho, None)
+        self._descartar_antigas()
+
+    def versoes(self):
+        return [versao.resumo() for versao in self._versoes.values()]
+
+    def _carregar(self, caminho, hash_conteudo):
+        # Importado aqui para o registro não depender do pickle de um módulo específico
+        from preprocessamento import PipelineOcorrencias
+
+        inicio = time.perf_counter()
+        pipeline = joblib.load(caminho, mmap_mode=self.mmap_mode)
+        tempo_carga = time.perf_counter() - inicio
+        if not isinstance(pipeline, PipelineOcorrencias):
+            raise TypeError(
+                f"'{caminho}' não contém um PipelineOcorrencias; retreine com treinar_modelo.py."
+            )
+        if getattr(pipeline, "floresta", None) is None:
+            pipeline.compilar()
+        # Mesma medida de `treinar_modelo.medir_pipeline`: a diferença de RSS de uma
+        # troca em segundo plano mistura as alocações das outras sessões
+        return VersaoModelo(
+            hash_conteudo, caminho, pipeline, tempo_carga, os.path.getsize(caminho), bytes_arrays(pipeline)
+        )
+
+    def _descartar_antigas(self):
+        # Mantém a versão em uso e as mais recentes; sessões que ainda seguram uma
+        # versão antiga continuam funcionando até soltarem a referência
+        em_uso = {hash_conteudo for _, hash_conteudo in self._assinaturas.values()}
+        ordenadas = sorted(self._versoes.values(), key=lambda v: v.carregado_em, reverse=True)
+        for versao in ordenadas[self.versoes_mantidas:]:
+            if versao.hash not in em_uso:
+                del self._versoes[versao.hash]
+
+
+def _assinatura(caminho):
+    info = os.stat(caminho)
+    return info.st_size, info.st_mtime_ns
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def bytes_arrays(objeto, _vistos=None):
+    """Bytes dos arrays NumPy alcançáveis a partir de `objeto`.
+
+    Percorre atributos, dicionários e sequências; objetos de extensão sem
+    `__dict__` (como a `Tree` do scikit-learn, com os arrays de nós e valores)
+    são lidos pelo estado do pickle. Cada array conta uma vez. Ao contrário da
+    diferença de RSS, a medida não depende do alocador nem de outras threads.
+    """
+    # id -> objeto: manter a referência impede que o id de um estado temporário
+    # (como o dict do pickle de uma árvore) seja reaproveitado por outro objeto
+    vistos = {} if _vistos is None else _vistos
+    if isinstance(objeto, (str, bytes, int, float, type(None))) or id(objeto) in vistos:
+        return 0
+    vistos[id(objeto)] = objeto
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, dict):
+        valores = objeto.values()
+    elif isinstance(objeto, (list, tuple, set)):
+        valores = objeto
+    elif hasattr(objeto, "__dict__"):
+        valores = vars(objeto).values()
+    else:
+        estado = objeto.__getstate__() if hasattr(objeto, "__getstate__") else None
+        valores = estado.values() if isinstance(estado, dict) else ()
+    return sum(bytes_arrays(valor, vistos) for valor in valores)
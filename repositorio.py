@@ -0,0 +1,195 @@
+"""Armazenamento persistente das ocorrências cadastradas pelo app.
+
+As novas ocorrências ficam em um banco SQLite em modo WAL, só com inserções
+(append-only). Cada linha recebe um número de sequência crescente (`seq`), que
+a camada de dados usa para ler apenas o que chegou desde a última leitura.
+
+Todas as gravações do processo passam por uma única thread escritora que faz
+group commit: os pedidos que chegam durante uma pequena janela são gravados
+juntos em uma só transação, então vários policiais registrando ao mesmo tempo
+pagam um único commit em vez de um por BO. Se o lote falha (um valor que o
+SQLite não aceita), os pedidos são regravados um a um e só o inválido recebe
+o erro.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import pandas as pd
+
+CAMINHO_BANCO = "ocorrencias.db"
+
+COLUNAS_REGISTRO = [
+    "id_ocorrencia",
+    "data_ocorrencia",
+    "bairro",
+    "tipo_crime",
+    "descricao_modus_operandi",
+    "arma_utilizada",
+    "quantidade_vitimas",
+    "quantidade_suspeitos",
+    "sexo_suspeito",
+    "idade_suspeito",
+    "orgao_responsavel",
+    "status_investigacao",
+    "latitude",
+    "longitude",
+    "observacoes",
+]
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ocorrencias (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id_ocorrencia TEXT,
+    data_ocorrencia TEXT,
+    bairro TEXT,
+    tipo_crime TEXT,
+    descricao_modus_operandi TEXT,
+    arma_utilizada TEXT,
+    quantidade_vitimas INTEGER,
+    quantidade_suspeitos INTEGER,
+    sexo_suspeito TEXT,
+    idade_suspeito INTEGER,
+    orgao_responsavel TEXT,
+    status_investigacao TEXT,
+    latitude REAL,
+    longitude REAL,
+    observacoes TEXT,
+    registrado_em REAL
+)
+"""
+
+
+class _Pedido:
+    def __init__(self, registros):
+        self.registros = registros
+        self.linhas = []
+        self.concluido = threading.Event()
+        self.erro = None
+
+
+class RepositorioOcorrencias:
+    def __init__(self, caminho=CAMINHO_BANCO, janela_commit=0.005, lote_maximo=1000):
+        self.caminho = caminho
+        self.janela_commit = janela_commit
+        self.lote_maximo = lote_maximo
+        self._fila = queue.Queue()
+        self._escritor = None
+        self._trava = threading.Lock()
+        with closing(self._conectar()) as conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute(_ESQUEMA)
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        # Com WAL, NORMAL só sincroniza no checkpoint; o commit continua atômico
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        return conexao
+
+    # --- Escrita ---
+
+    def inserir(self, registro, timeout=30):
+        """Grava um registro e só retorna depois do commit."""
+        self.inserir_lote([registro], timeout=timeout)
+
+    def inserir_lote(self, registros, timeout=30):
+        """Grava vários registros na mesma transação de group commit."""
+        registros = list(registros)
+        if not registros:
+            return
+        self._iniciar_escritor()
+        pedido = _Pedido(registros)
+        self._fila.put(pedido)
+        if not pedido.concluido.wait(timeout):
+            raise TimeoutError("Tempo esgotado aguardando a gravação da ocorrência.")
+        if pedido.erro is not None:
+            raise pedido.erro
+
+    def _iniciar_escritor(self):
+        with self._trava:
+            if self._escritor is None or not self._escritor.is_alive():
+                self._escritor = threading.Thread(target=self._laco_escrita, daemon=True)
+                self._escritor.start()
+
+    def _laco_escrita(self):
+        conexao = self._conectar()
+        while True:
+            pedidos = [self._fila.get()]
+            total = len(pedidos[0].registros)
+            limite = time.monotonic() + self.janela_commit
+            # Junta os pedidos que chegarem dentro da janela em um só commit
+            while total < self.lote_maximo:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                total += len(pedido.registros)
+            self._gravar(conexao, pedidos)
+
+    def _gravar(self, conexao, pedidos):
+        # Nenhuma exceção sai daqui: todo pedido é concluído e a thread escritora segue viva
+        try:
+            agora = time.time()
+            validos = []
+            for pedido in pedidos:
+                # Registros malformados (não dicionários) falham só o próprio pedido
+                try:
+                    pedido.linhas = [
+                        tuple(registro.get(coluna) for coluna in COLUNAS_REGISTRO) + (agora,)
+                        for registro in pedido.registros
+                    ]
+                except Exception as e:
+                    pedido.erro = e
+                else:
+                    validos.append(pedido)
+            try:
+                self._inserir(conexao, [linha for pedido in validos for linha in pedido.linhas])
+            except sqlite3.Error:
+                # O lote foi desfeito; cada pedido é regravado na sua própria transação
+                # para que um valor inválido não derrube as ocorrências dos outros
+                for pedido in validos:
+                    try:
+                        self._inserir(conexao, pedido.linhas)
+                    except sqlite3.Error as e:
+                        pedido.erro = e
+        except Exception as e:
+            for pedido in pedidos:
+                pedido.erro = pedido.erro or e
+        finally:
+            for pedido in pedidos:
+                pedido.concluido.set()
+
+    @staticmethod
+    def _inserir(conexao, linhas):
+        colunas = ", ".join(COLUNAS_REGISTRO + ["registrado_em"])
+        marcadores = ", ".join("?" * (len(COLUNAS_REGISTRO) + 1))
+        with conexao:
+            conexao.executemany(f"INSERT INTO ocorrencias ({colunas}) VALUES ({marcadores})", linhas)
+
+    # --- Leitura ---
+
+    def ultimo_seq(self):
+        with closing(self._conectar()) as conexao:
+            return conexao.execute("SELECT COALESCE(MAX(seq), 0) FROM ocorrencias").fetchone()[0]
+
+    def contar_entre(self, seq_inicial, seq_final):
+        """Quantidade de registros com seq_inicial < seq <= seq_final."""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT COUNT(*) FROM ocorrencias WHERE seq > ? AND seq <= ?", (seq_inicial, seq_final)
+            ).fetchone()[0]
+
+    def ler_desde(self, seq):
+        """Registros com número de sequência maior que `seq`, em ordem de chegada."""
+        with closing(self._conectar()) as conexao:
+            return pd.read_sql_query(
+                f"SELECT seq, {', '.join(COLUNAS_REGISTRO)} FROM ocorrencias WHERE seq > ? ORDER BY seq",
+                conexao,
+                params=(seq,),
+            )
@@ -0,0 +1,225 @@
+"""Retreino do modelo em segundo plano com as ocorrências cadastradas no app.
+
+Uso (processo separado do Streamlit, com prioridade baixa):
+    python retreino.py --intervalo 300 --minimo-novas 100
+
+A cada ciclo o trabalhador compara o último `seq` do repositório de ocorrências
+com o `seq_treino` do pipeline publicado. Havendo pelo menos `--minimo-novas`
+ocorrências novas:
+
+- incremental: a floresta cresce com `warm_start` (`--arvores-por-ciclo`
+  árvores novas), treinadas nas ocorrências novas mais uma amostra
+  estratificada do histórico, para que todas as classes estejam presentes;
+- completo: quando chegam classes ou categorias que o pipeline não conhece,
+  quando o modelo não suporta warm_start ou quando a floresta passaria de
+  `--max-arvores`, o pipeline é reajustado do zero sobre base + ocorrências
+  novas (o que também consolida as árvores).
+
+O pipeline novo é gravado com troca atômica (`PipelineOcorrencias.salvar`), a
+tabela de previsões é regenerada e o `RegistroModelos` do app carrega a versão
+nova em segundo plano, sem reiniciar. O treino usa um núcleo (`--n-jobs`) e
+roda com `nice`, para não disputar CPU com o servidor. O estado de cada ciclo
+vai para `retreino_status.json`, exibido na página de Modelos.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.base import clone
+
+from dados import CAMINHO_CSV, Ocorrencias
+from filtros import IndiceFiltros
+from preprocessamento import ALVO, VALOR_AUSENTE, PipelineOcorrencias
+from registro_modelos import CAMINHO_MODELO, hash_arquivo
+from repositorio import CAMINHO_BANCO, RepositorioOcorrencias
+from tabela_previsoes import CAMINHO_TABELA, gerar_tabela
+
+CAMINHO_STATUS = "retreino_status.json"
+ARVORES_POR_CICLO = 20
+MAX_ARVORES = 400
+# Linhas do histórico amostradas por ocorrência nova nas árvores incrementais
+FATOR_HISTORICO = 4
+HISTORICO_STATUS = 20
+
+
+def _rotulos(df):
+    return df[ALVO].astype(object).where(df[ALVO].notna(), VALOR_AUSENTE).astype(str).to_numpy()
+
+
+def amostra_estratificada(y, n, semente=None):
+    """Posições de uma amostra de ~`n` linhas com pelo menos uma de cada classe de `y`."""
+    if len(y) == 0:
+        return np.empty(0, dtype=np.intp)
+    rng = np.random.default_rng(semente)
+    classes, codigos = np.unique(y, return_inverse=True)
+    fracao = min(1.0, n / max(len(y), 1))
+    posicoes = []
+    for classe in range(len(classes)):
+        da_classe = np.flatnonzero(codigos == classe)
+        quantidade = max(1, int(round(len(da_classe) * fracao)))
+        posicoes.append(rng.choice(da_classe, size=quantidade, replace=False))
+    return np.sort(np.concatenate(posicoes))
+
+
+def modo_retreino(pipeline, novas, y_novas, arvores_por_ciclo, max_arvores):
+    """"incremental" ou "completo", com o motivo quando for completo."""
+    modelo = pipeline.modelo
+    if "warm_start" not in modelo.get_params() or not hasattr(modelo, "estimators_"):
+        return "completo", "modelo sem warm_start"
+    if set(y_novas) - set(str(classe) for classe in modelo.classes_):
+        return "completo", "classes novas"
+    desconhecidas = pipeline.categorias_desconhecidas(novas)
+    if desconhecidas:
+        return "completo", f"categorias novas em {', '.join(sorted(desconhecidas))}"
+    if len(modelo.estimators_) + arvores_por_ciclo > max_arvores:
+        return "completo", f"floresta passaria de {max_arvores} árvores"
+    return "incremental", None
+
+
+def retreinar(pipeline, df, n_novas, arvores_por_ciclo=ARVORES_POR_CICLO, max_arvores=MAX_ARVORES, n_jobs=1):
+    """Novo pipeline com as últimas `n_novas` linhas de `df` incorporadas. Devolve (pipeline, modo, motivo)."""
+    y = _rotulos(df)
+    novas = df.iloc[len(df) - n_novas:]
+    modo, motivo = modo_retreino(pipeline, novas, y[len(df) - n_novas:], arvores_por_ciclo, max_arvores)
+
+    if modo == "completo":
+        modelo = clone(pipeline.modelo)
+        parametros = modelo.get_params()
+        if "n_jobs" in parametros:
+            modelo.set_params(n_jobs=n_jobs)
+        if "warm_start" in parametros:
+            # Volta ao tamanho de floresta do último ajuste completo
+            modelo.set_params(
+                warm_start=False,
+                n_estimators=parametros["n_estimators"] - getattr(pipeline, "arvores_incrementais", 0),
+            )
+        novo = PipelineOcorrencias(modelo).ajustar(df, y)
+        if "n_jobs" in parametros:
+            modelo.set_params(n_jobs=parametros["n_jobs"])
+        return novo, modo, motivo
+
+    # Árvores novas: ocorrências novas + amostra estratificada do histórico
+    historico = len(df) - n_novas
+    posicoes = amostra_estratificada(y[:historico], FATOR_HISTORICO * n_novas)
+    posicoes = np.concatenate([posicoes, np.arange(historico, len(df))])
+    X = pipeline.transformar(df.iloc[posicoes])
+
+    modelo = pipeline.modelo
+    n_jobs_original = modelo.get_params().get("n_jobs")
+    modelo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + arvores_por_ciclo, n_jobs=n_jobs)
+    modelo.fit(X, y[posicoes])
+    modelo.set_params(warm_start=False, n_jobs=n_jobs_original)
+    pipeline.arvores_incrementais = getattr(pipeline, "arvores_incrementais", 0) + arvores_por_ciclo
+    pipeline.compilar()
+    return pipeline, modo, motivo
+
+
+def ciclo(caminho_modelo, caminho_csv, repositorio, minimo_novas, caminho_tabela=CAMINHO_TABELA, **opcoes):
+    """Um ciclo do trabalhador; devolve o resumo do que foi feito ou None se não havia o que treinar."""
+    pipeline = PipelineOcorrencias.carregar(caminho_modelo)
+    seq_modelo = getattr(pipeline, "seq_treino", 0)
+    if repositorio.ultimo_seq() - seq_modelo < minimo_novas:
+        return None
+
+    inicio = time.perf_counter()
+    # Base + todas as ocorrências do repositório; as do fim do frame são as novas
+    ocorrencias = Ocorrencias(caminho_csv, repositorio)
+    ocorrencias.atualizar()
+    df = ocorrencias.linhas()
+    n_novas = repositorio.contar_entre(seq_modelo, ocorrencias.seq)
+    if n_novas < minimo_novas:
+        return None
+
+    pipeline, modo, motivo = retreinar(pipeline, df, n_novas, **opcoes)
+    pipeline.seq_treino = ocorrencias.seq
+    pipeline.salvar(caminho_modelo)
+    hash_modelo = hash_arquivo(caminho_modelo)
+    gerar_tabela(pipeline, hash_modelo, df, ocorrencias.indice(IndiceFiltros), caminho_tabela)
+
+    return {
+        "concluido_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "modo": modo,
+        "motivo": motivo,
+        "novas": n_novas,
+        "seq_treino": ocorrencias.seq,
+        "linhas": len(df),
+        "arvores": len(getattr(pipeline.modelo, "estimators_", [])) or None,
+        "duracao_s": round(time.perf_counter() - inicio, 2),
+        "hash": hash_modelo,
+    }
+
+
+def registrar_status(caminho, estado, ciclo_resumo=None):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            status = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        status = {"ciclos": []}
+    status.update(estado)
+    if ciclo_resumo is not None:
+        status["ciclos"] = (status["ciclos"] + [ciclo_resumo])[-HISTORICO_STATUS:]
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def ler_status(caminho=CAMINHO_STATUS):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Retreina o modelo em segundo plano com as ocorrências novas.")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Pipeline publicado")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV (ou diretório particionado) da base")
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="Repositório das ocorrências cadastradas")
+    parser.add_argument("--tabela", default=CAMINHO_TABELA, help="Diretório da tabela de previsões")
+    parser.add_argument("--status", default=CAMINHO_STATUS, help="Arquivo de estado lido pela página de Modelos")
+    parser.add_argument("--intervalo", type=float, default=300, help="Segundos entre verificações")
+    parser.add_argument("--minimo-novas", type=int, default=100, help="Ocorrências novas para disparar o retreino")
+    parser.add_argument("--arvores-por-ciclo", type=int, default=ARVORES_POR_CICLO)
+    parser.add_argument("--max-arvores", type=int, default=MAX_ARVORES)
+    parser.add_argument("--n-jobs", type=int, default=1, help="Núcleos usados no treino")
+    parser.add_argument("--nice", type=int, default=10, help="Redução de prioridade do processo")
+    parser.add_argument("--uma-vez", action="store_true", help="Executa um único ciclo e sai")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.nice and hasattr(os, "nice"):
+        os.nice(args.nice)
+    repositorio = RepositorioOcorrencias(args.banco)
+    opcoes = {"arvores_por_ciclo": args.arvores_por_ciclo, "max_arvores": args.max_arvores, "n_jobs": args.n_jobs}
+
+    print(f"🔁 Retreino em segundo plano de {args.modelo} (mínimo de {args.minimo_novas} ocorrências novas)")
+    while True:
+        registrar_status(args.status, {"estado": "verificando", "pid": os.getpid()})
+        try:
+            resumo = ciclo(args.modelo, args.dataset, repositorio, args.minimo_novas, args.tabela, **opcoes)
+        except Exception as erro:
+            print(f"❌ Ciclo de retreino falhou: {erro}")
+            registrar_status(args.status, {"estado": "erro", "erro": str(erro)})
+        else:
+            if resumo is None:
+                registrar_status(args.status, {"estado": "aguardando", "erro": None})
+            else:
+                print(
+                    f"✅ {resumo['modo']}: {resumo['novas']} ocorrências novas | "
+                    f"{resumo['arvores']} árvores | {resumo['duracao_s']:.1f}s | modelo {resumo['hash'][:12]}"
+                )
+                registrar_status(args.status, {"estado": "aguardando", "erro": None}, resumo)
+        if args.uma_vez:
+            return 0
+        time.sleep(args.intervalo)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"""Séries temporais pré-agregadas em várias resoluções para os gráficos de tendência.
+
+O gráfico de tendência contava as ocorrências do recorte dia a dia, a cada
+rerun, e desenhava um ponto por dia: anos de histórico viram milhares de pontos
+que o gráfico não consegue mostrar. Aqui as contagens ficam agregadas uma vez
+por versão do frame, por hora, dia, semana (começando na segunda) e mês, em
+células esparsas (período, bairro, tipo_crime) ordenadas por período.
+
+Uma consulta:
+
+- escolhe a resolução mais fina em que o intervalo pedido cabe em
+  `FATOR_RESOLUCAO` x pontos (últimos 7 dias por hora, um ano por dia, todo o
+  histórico por semana ou mês);
+- recorta as células do intervalo por busca binária e soma por período,
+  preenchendo com zero os períodos sem ocorrências;
+- reduz a série ao orçamento de pontos com LTTB (Largest Triangle Three
+  Buckets), que preserva picos e vales.
+
+O custo depende do número de períodos e de combinações bairro x tipo_crime do
+intervalo, limitado pelo orçamento de pontos, e não do número de ocorrências.
+Linhas novas (deltas) entram numa cauda de células, incorporada quando a
+compactação do frame reconstrói as séries, como no `CuboContagens`.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+DIMENSOES = ["bairro", "tipo_crime"]
+# Da mais fina para a mais grossa
+RESOLUCOES = {"hora": "hora", "dia": "dia", "semana": "semana", "mes": "mês"}
+PONTOS_GRAFICO = 400
+# Períodos aceitos numa resolução antes de passar para a seguinte (antes do LTTB)
+FATOR_RESOLUCAO = 4
+UMA_HORA_NS = 3_600 * 10**9
+UM_DIA_NS = 86_400 * 10**9
+
+_DATA_NULA = np.iinfo(np.int64).min
+
+
+class SeriesTemporais:
+    def __init__(self, base):
+        self.n_linhas = self.n_indexado = len(base)
+        self.categorias = {d: base[d].cat.categories for d in DIMENSOES}
+        # Posição 0 de cada eixo guarda os nulos (código -1)
+        self.forma = tuple(len(self.categorias[d]) + 1 for d in DIMENSOES)
+        self.primeira = self.ultima = None
+
+        chaves, datas = self._planificar(base)
+        self.celulas = {r: _agrupar_celulas(chaves, _periodos(datas, r), np.prod(self.forma)) for r in RESOLUCOES}
+        self.cauda = {r: _celulas_vazias() for r in RESOLUCOES}
+        self._estender(datas)
+
+    def _planificar(self, df):
+        # Índice plano (bairro, tipo_crime) de cada linha + data em ns; linhas sem data ficam fora
+        eixos = [df[d].cat.codes.to_numpy().astype(np.int64) + 1 for d in DIMENSOES]
+        chaves = np.ravel_multi_index(eixos, self.forma)
+        datas = df["data_ocorrencia"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        validas = datas != _DATA_NULA
+        return chaves[validas], datas[validas]
+
+    def _estender(self, datas):
+        if len(datas) == 0:
+            return
+        self.primeira = int(datas.min()) if self.primeira is None else min(self.primeira, int(datas.min()))
+        self.ultima = int(datas.max()) if self.ultima is None else max(self.ultima, int(datas.max()))
+
+    def atualizado(self, recentes):
+        """Séries novas com as linhas do segmento de ocorrências novas ainda não vistas; estas não mudam."""
+        chaves, datas = self._planificar(recentes.iloc[self.n_linhas - self.n_indexado:])
+        novo = copy.copy(self)
+        novo.cauda = {
+            resolucao: _concatenar_celulas(
+                self.cauda[resolucao], _agrupar_celulas(chaves, _periodos(datas, resolucao), np.prod(self.forma))
+            )
+            for resolucao in RESOLUCOES
+        }
+        novo._estender(datas)
+        novo.n_linhas = self.n_indexado + len(recentes)
+        return novo
+
+    # --- Consulta ---
+
+    def resolucao_para(self, inicio, fim, pontos=PONTOS_GRAFICO):
+        """Resolução mais fina em que o intervalo [inicio, fim] (ns) tem até FATOR_RESOLUCAO x pontos períodos."""
+        for resolucao in RESOLUCOES:
+            primeiro, ultimo = _periodos(np.array([inicio, fim], dtype=np.int64), resolucao)
+            if ultimo - primeiro + 1 <= FATOR_RESOLUCAO * pontos:
+                return resolucao
+        return resolucao
+
+    def contar(self, filtros=None, datas=None, pontos=PONTOS_GRAFICO, resolucao=None):
+        """Série de contagens do recorte, pronta para o gráfico de tendência.
+
+        `filtros` mapeia bairro/tipo_crime -> valores aceitos (vazio = todos) e
+        `datas` é um intervalo (início, fim) inclusive, ou None para todo o
+        período. A resolução é escolhida pelo tamanho do intervalo, a menos que
+        `resolucao` seja informada. Devolve (série indexada pelo início de cada
+        período, resolução, número de períodos antes da redução para `pontos`).
+        """
+        if self.primeira is None:
+            return pd.Series(dtype=np.int64, index=pd.DatetimeIndex([], name="data"), name="count"), "dia", 0
+        if datas is None:
+            inicio, fim = self.primeira, self.ultima
+        else:
+            inicio = np.datetime64(datas[0], "D").astype("datetime64[ns]").astype(np.int64)
+            fim = (np.datetime64(datas[1], "D") + 1).astype("datetime64[ns]").astype(np.int64) - 1
+        resolucao = resolucao or self.resolucao_para(inicio, fim, pontos)
+        primeiro, ultimo = _periodos(np.array([inicio, fim], dtype=np.int64), resolucao)
+
+        mascara = self._mascara(filtros)
+        contagem = self._somar(resolucao, primeiro, ultimo, mascara)
+        if datas is not None and resolucao in ("semana", "mes"):
+            # Semanas e meses das pontas podem passar do intervalo pedido: essas
+            # pontas são recontadas pelos dias que caem dentro dele
+            dia_inicio, dia_fim = inicio // UM_DIA_NS, fim // UM_DIA_NS
+            for periodo in {primeiro, ultimo}:
+                primeiro_dia, ultimo_dia = _dias_do_periodo(periodo, resolucao)
+                dias = self._somar("dia", max(primeiro_dia, dia_inicio), min(ultimo_dia, dia_fim), mascara)
+                contagem[periodo - primeiro] = dias.sum()
+        periodos = np.arange(primeiro, ultimo + 1)
+
+        n_periodos = len(periodos)
+        if n_periodos > pontos:
+            posicoes = lttb(periodos, contagem, pontos)
+            periodos, contagem = periodos[posicoes], contagem[posicoes]
+        indice = pd.DatetimeIndex(_inicio_periodos(periodos, resolucao), name="data")
+        return pd.Series(contagem, index=indice, name="count"), resolucao, n_periodos
+
+    def _somar(self, resolucao, primeiro, ultimo, mascara):
+        # Contagem de cada período de [primeiro, ultimo], com zero nos períodos vazios
+        celulas = self._celulas_no_intervalo(resolucao, primeiro, ultimo)
+        selecionadas = mascara[celulas["chave"]]
+        return np.bincount(
+            celulas["periodo"][selecionadas] - primeiro,
+            weights=celulas["contagem"][selecionadas],
+            minlength=ultimo - primeiro + 1,
+        ).astype(np.int64)
+
+    def _celulas_no_intervalo(self, resolucao, primeiro, ultimo):
+        celulas, cauda = self.celulas[resolucao], self.cauda[resolucao]
+        i, j = np.searchsorted(celulas["periodo"], [primeiro, ultimo + 1])
+        principais = {chave: valores[i:j] for chave, valores in celulas.items()}
+        no_intervalo = (cauda["periodo"] >= primeiro) & (cauda["periodo"] <= ultimo)
+        return _concatenar_celulas(principais, {chave: valores[no_intervalo] for chave, valores in cauda.items()})
+
+    def _mascara(self, filtros):
+        # Máscara sobre os índices planos (bairro, tipo_crime) aceitos pelos filtros
+        mascaras = []
+        for dimensao, tamanho in zip(DIMENSOES, self.forma):
+            valores = (filtros or {}).get(dimensao)
+            if not valores:
+                mascaras.append(np.ones(tamanho, dtype=bool))
+                continue
+            mascara = np.zeros(tamanho, dtype=bool)
+            codigos = self.categorias[dimensao].get_indexer(list(valores))
+            mascara[codigos[codigos >= 0] + 1] = True
+            mascaras.append(mascara)
+        return np.logical_and.outer(*mascaras).ravel()
+
+
+def lttb(x, y, pontos):
+    """Posições dos `pontos` pontos escolhidos pelo Largest Triangle Three Buckets.
+
+    O primeiro e o último ponto ficam; os demais são divididos em `pontos` - 2
+    faixas e, de cada faixa, fica o ponto que forma o maior triângulo com o
+    ponto escolhido na faixa anterior e a média da faixa seguinte.
+    """
+    n = len(x)
+    if pontos >= n or pontos < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bordas = np.linspace(1, n - 1, pontos - 1).astype(np.int64)
+    escolhidos = np.empty(pontos, dtype=np.int64)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+    for faixa in range(pontos - 2):
+        inicio, fim = bordas[faixa], bordas[faixa + 1]
+        # A faixa seguinte da última é o próprio último ponto
+        proximo_fim = bordas[faixa + 2] if faixa + 2 < len(bordas) else n
+        media_x = x[fim:proximo_fim].mean()
+        media_y = y[fim:proximo_fim].mean()
+        areas = np.abs(
+            (x[anterior] - media_x) * (y[inicio:fim] - y[anterior])
+            - (x[anterior] - x[inicio:fim]) * (media_y - y[anterior])
+        )
+        anterior = inicio + int(np.argmax(areas))
+        escolhidos[faixa + 1] = anterior
+    return escolhidos
+
+
+def _periodos(datas_ns, resolucao):
+    # Número do período (hora, dia, semana ou mês desde 1970) de cada data em ns
+    if resolucao == "hora":
+        return datas_ns // UMA_HORA_NS
+    if resolucao == "dia":
+        return datas_ns // UM_DIA_NS
+    if resolucao == "semana":
+        # 1970-01-01 foi uma quinta-feira: +3 faz as semanas começarem na segunda
+        return (datas_ns // UM_DIA_NS + 3) // 7
+    return datas_ns.astype("datetime64[ns]").astype("datetime64[M]").astype(np.int64)
+
+
+def _inicio_periodos(periodos, resolucao):
+    if resolucao == "hora":
+        return (periodos * UMA_HORA_NS).astype("datetime64[ns]")
+    if resolucao == "dia":
+        return periodos.astype("datetime64[D]").astype("datetime64[ns]")
+    if resolucao == "semana":
+        return (periodos * 7 - 3).astype("datetime64[D]").astype("datetime64[ns]")
+    return periodos.astype("datetime64[M]").astype("datetime64[ns]")
+
+
+def _dias_do_periodo(periodo, resolucao):
+    # Primeiro e último dia (desde 1970) de uma semana ou mês
+    inicios = _inicio_periodos(np.array([periodo, periodo + 1]), resolucao).astype(np.int64) // UM_DIA_NS
+    return int(inicios[0]), int(inicios[1]) - 1
+
+
+def _celulas_vazias():
+    return {
+        "periodo": np.empty(0, dtype=np.int64),
+        "chave": np.empty(0, dtype=np.int64),
+        "contagem": np.empty(0, dtype=np.int64),
+    }
+
+
+def _agrupar_celulas(chaves, periodos, tamanho_chave):
+    # Uma célula por (período, bairro x tipo_crime), ordenadas por período
+    if len(periodos) == 0:
+        return _celulas_vazias()
+    primeiro = periodos.min()
+    combinadas, contagem = np.unique((periodos - primeiro) * tamanho_chave + chaves, return_counts=True)
+    return {
+        "periodo": combinadas // tamanho_chave + primeiro,
+        "chave": combinadas % tamanho_chave,
+        "contagem": contagem.astype(np.int64),
+    }
+
+
+def _concatenar_celulas(a, b):
+    return {chave: np.concatenate([a[chave], b[chave]]) for chave in a}
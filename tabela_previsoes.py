@@ -0,0 +1,196 @@
+"""Tabela materializada das previsões da página de Predição de Crimes.
+
+Uso (depois do treino; o `treinar_modelo.py` já chama ao publicar o modelo):
+    python tabela_previsoes.py --modelo modelo.pkl
+
+Com os filtros padrão da página a entrada do modelo só depende do bairro e do
+tipo de crime selecionados (modas e médias do histórico filtrado) e, ao longo
+do horizonte, do slot semanal. O job calcula o perfil de cada combinação
+bairro x tipo de crime (incluindo "todos" em cada eixo), pontua os 168 slots de
+todos os perfis de uma vez e grava as probabilidades no mesmo formato do
+armazenamento colunar: um binário float32 (perfis x slots x classes), lido por
+memory-map, e um `meta.json` com o hash do modelo, as classes e a chave de cada
+perfil.
+
+A página consulta a tabela quando os filtros são os padrão (no máximo um bairro
+e um tipo de crime) e o modelo carregado é o mesmo da tabela; nas demais
+combinações a previsão é calculada ao vivo. Ocorrências cadastradas depois da
+geração mudam pouco as modas e médias e só entram na tabela na próxima geração.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from dados import CAMINHO_CSV, Ocorrencias, ler_meta
+from filtros import IndiceFiltros, aplicar
+from preprocessamento import PipelineOcorrencias
+from previsao import N_SLOTS, entradas_por_slot, faixa_idade, perfil_entrada
+from registro_modelos import CAMINHO_MODELO, hash_arquivo
+from repositorio import CAMINHO_BANCO, RepositorioOcorrencias
+
+CAMINHO_TABELA = "previsoes.tabela"
+VERSAO_FORMATO = 1
+# Filtro de hora padrão da página (o dia inteiro)
+HORAS_PADRAO = (0, 23)
+
+
+class TabelaPrevisoes:
+    def __init__(self, destino, meta):
+        self.meta = meta
+        self.hash_modelo = meta["hash_modelo"]
+        self.classes = meta["classes"]
+        self.faixa_idade = tuple(meta["faixa_idade"])
+        self._posicoes = {
+            (perfil["bairro"], perfil["tipo_crime"]): i for i, perfil in enumerate(meta["perfis"])
+        }
+        forma = (len(meta["perfis"]), N_SLOTS, len(self.classes))
+        if not meta["perfis"]:
+            # Tabela vazia: o binário tem 0 bytes e não pode ser mapeado
+            self.probabilidades = np.empty(forma, dtype=np.float32)
+            return
+        caminho = os.path.join(destino, meta["arquivo"])
+        self.probabilidades = np.asarray(np.memmap(caminho, dtype=np.float32, mode="r", shape=forma))
+
+    def valida_para(self, hash_modelo, classes, faixa_idade):
+        """A tabela foi gerada com este modelo e com a mesma faixa de idade padrão da página?"""
+        return (
+            self.hash_modelo == hash_modelo
+            and self.classes == [str(classe) for classe in classes]
+            and self.faixa_idade == tuple(faixa_idade)
+        )
+
+    def consultar(self, bairro=None, tipo_crime=None):
+        """Matriz (168, n_classes) do perfil, ou None se ele não foi materializado.
+
+        None em `bairro` ou `tipo_crime` significa sem filtro naquele eixo.
+        """
+        posicao = self._posicoes.get((bairro, tipo_crime))
+        if posicao is None:
+            return None
+        return self.probabilidades[posicao]
+
+
+def ler_tabela(destino=CAMINHO_TABELA):
+    """`TabelaPrevisoes` em `destino`, ou None se ela não existe ou é de outro formato."""
+    meta = ler_meta(destino)
+    if meta is None or meta.get("versao_formato") != VERSAO_FORMATO:
+        return None
+    try:
+        return TabelaPrevisoes(destino, meta)
+    except (OSError, ValueError):
+        return None
+
+
+def filtros_perfil(bairro, tipo_crime, idades):
+    """Argumentos de `IndiceFiltros.consultar` equivalentes aos filtros padrão da página."""
+    return {
+        "categoricas": {
+            "bairro": [bairro] if bairro is not None else [],
+            "tipo_crime": [tipo_crime] if tipo_crime is not None else [],
+        },
+        "intervalos": {"idade_suspeito": idades, "hora_dia": HORAS_PADRAO},
+    }
+
+
+def gerar_tabela(pipeline, hash_modelo, df, indice_filtros, destino=CAMINHO_TABELA):
+    """Calcula e grava a tabela de todos os perfis bairro x tipo de crime.
+
+    Sem nenhum perfil com histórico suficiente (base vazia ou sem vítimas,
+    suspeitos e idades preenchidos) a tabela é gravada vazia e a página calcula
+    todas as previsões ao vivo.
+    """
+    idades = faixa_idade(df)
+    bairros = [None] + [str(b) for b in df["bairro"].dropna().unique()]
+    crimes = [None] + [str(c) for c in df["tipo_crime"].dropna().unique()]
+
+    perfis, entradas = [], []
+    for bairro in bairros:
+        for tipo_crime in crimes:
+            ids = indice_filtros.consultar(**filtros_perfil(bairro, tipo_crime, idades))
+            df_filtrado = aplicar(df, ids)
+            entrada = perfil_entrada(df_filtrado) if not df_filtrado.empty else None
+            if entrada is None:
+                continue
+            perfis.append({"bairro": bairro, "tipo_crime": tipo_crime, "entrada": _serializavel(entrada)})
+            entradas.append(entradas_por_slot(entrada))
+
+    if entradas:
+        # Todos os perfis numa única chamada ao modelo
+        probabilidades = pipeline.predict_proba(pd.concat(entradas, ignore_index=True)).astype(np.float32)
+    else:
+        probabilidades = np.empty((0, len(pipeline.classes_)), dtype=np.float32)
+
+    os.makedirs(destino, exist_ok=True)
+    # Um arquivo por modelo: processos que mapearam a tabela anterior continuam lendo o arquivo antigo
+    arquivo = f"probabilidades_{hash_modelo[:16]}.bin"
+    probabilidades.tofile(os.path.join(destino, arquivo))
+    meta = {
+        "versao_formato": VERSAO_FORMATO,
+        "hash_modelo": hash_modelo,
+        "classes": [str(classe) for classe in pipeline.classes_],
+        "faixa_idade": list(idades),
+        "linhas": len(df),
+        "gerada_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "arquivo": arquivo,
+        "perfis": perfis,
+    }
+    # O meta.json é gravado por último: sem ele a tabela é considerada incompleta
+    temporario = os.path.join(destino, "meta.json.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(temporario, os.path.join(destino, "meta.json"))
+
+    for antigo in os.listdir(destino):
+        if antigo.startswith("probabilidades_") and antigo != arquivo:
+            os.remove(os.path.join(destino, antigo))
+    return meta
+
+
+def _serializavel(entrada):
+    return {
+        chave: valor if isinstance(valor, (int, float)) else str(valor)
+        for chave, valor in entrada.items()
+    }
+
+
+def gerar_para_modelo(caminho_modelo=CAMINHO_MODELO, caminho_csv=CAMINHO_CSV, destino=CAMINHO_TABELA):
+    """Gera a tabela do pipeline publicado em `caminho_modelo` sobre os dados que a página usa."""
+    pipeline = PipelineOcorrencias.carregar(caminho_modelo)
+    # Mesmo frame da página: base colunar + ocorrências cadastradas no app
+    ocorrencias = Ocorrencias(caminho_csv, RepositorioOcorrencias(CAMINHO_BANCO))
+    ocorrencias.atualizar()
+    return gerar_tabela(
+        pipeline, hash_arquivo(caminho_modelo), ocorrencias.linhas(), ocorrencias.indice(IndiceFiltros), destino
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pré-calcula as previsões da página por perfil e slot semanal.")
+    parser.add_argument("--modelo", default=CAMINHO_MODELO, help="Pipeline publicado pelo treino")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV de ocorrências")
+    parser.add_argument("--destino", default=CAMINHO_TABELA, help="Diretório da tabela")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    inicio = time.perf_counter()
+    meta = gerar_para_modelo(args.modelo, args.dataset, args.destino)
+    if not meta["perfis"]:
+        print(f"⚠️ Nenhum perfil com histórico suficiente; tabela vazia em {args.destino} (previsões ao vivo)")
+        return 0
+    tamanho = os.path.getsize(os.path.join(args.destino, meta["arquivo"]))
+    print(
+        f"✅ {len(meta['perfis'])} perfis x {N_SLOTS} slots em {args.destino} "
+        f"({tamanho / 1e6:.1f} MB, {time.perf_counter() - inicio:.1f}s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Execução de análises pesadas fora da thread do script do Streamlit.
+
+Um rerun do Streamlit executa a página inteira na thread da sessão: um cálculo
+longo bloqueia o rerun e, se um widget muda no meio, o script recomeça e o
+trabalho é refeito. As páginas submetem esses cálculos ao `ExecutorTarefas`
+do processo (um pool de threads; numpy, pandas e scikit-learn liberam o GIL
+nos trechos pesados):
+
+- deduplicação: a tarefa é identificada pelo hash dos parâmetros
+  (`chave_parametros`); submeter a mesma chave devolve a tarefa em andamento ou
+  o resultado já calculado, para qualquer sessão;
+- progresso e resultados parciais: a função da tarefa recebe `progresso`
+  (fração concluída, parcial opcional) e a página mostra o parcial mais recente
+  enquanto a tarefa roda;
+- cancelamento: cada sessão acompanha uma tarefa por `grupo` (sessão + seção da
+  página). Quando os filtros mudam e a sessão submete outra chave no mesmo
+  grupo, a tarefa anterior sem outros interessados é cancelada. O cancelamento é
+  cooperativo: a próxima chamada a `progresso` levanta `TarefaCancelada`, e uma
+  tarefa que ainda não começou nem chega a rodar.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluída"
+CANCELADA = "cancelada"
+ERRO = "erro"
+
+MAX_TRABALHADORES = 4
+# Tarefas concluídas mantidas para a deduplicação (as mais antigas saem primeiro)
+MAX_TAREFAS = 64
+# Intervalo (s) com que as páginas verificam o andamento de uma tarefa
+INTERVALO_ATUALIZACAO = 0.5
+
+
+class TarefaCancelada(Exception):
+    """Levantada dentro da tarefa, no ponto de progresso seguinte ao cancelamento."""
+
+
+def chave_parametros(*partes):
+    """Hash dos parâmetros de uma tarefa (valores simples: textos, números, datas, tuplas e listas)."""
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()
+
+
+class Tarefa:
+    def __init__(self, chave, descricao=""):
+        self.chave = chave
+        self.descricao = descricao
+        self.estado = PENDENTE
+        self.progresso = 0.0
+        self.mensagem = ""
+        self.parcial = None
+        # Incrementada a cada parcial novo: a página sabe se o que exibiu está velho
+        self.versao = 0
+        self.resultado = None
+        self.erro = None
+        self.criada_em = time.time()
+        self.duracao = None
+        self.interessados = set()
+        self.futuro = None
+        self._cancelar = threading.Event()
+
+    def __repr__(self):
+        return f"Tarefa({self.descricao or self.chave[:12]}, {self.estado}, {self.progresso:.0%})"
+
+    @property
+    def ativa(self):
+        return self.estado in (PENDENTE, EXECUTANDO)
+
+    @property
+    def cancelamento_pedido(self):
+        return self._cancelar.is_set()
+
+    def informar(self, fracao, parcial=None, mensagem=None):
+        """Callback de progresso passado à função da tarefa; levanta `TarefaCancelada` se ela foi cancelada."""
+        if self._cancelar.is_set():
+            raise TarefaCancelada(self.chave)
+        self.progresso = min(max(float(fracao), 0.0), 1.0)
+        if mensagem is not None:
+            self.mensagem = mensagem
+        if parcial is not None:
+            self.parcial = parcial
+            self.versao += 1
+
+    def aguardar(self, segundos=None):
+        """Espera a tarefa terminar por até `segundos`; True se ela não está mais ativa."""
+        if self.futuro is not None and self.ativa:
+            try:
+                self.futuro.result(timeout=segundos)
+            except Exception:
+                pass
+        return not self.ativa
+
+    def cancelar(self):
+        self._cancelar.set()
+        # Se ainda estava na fila, não chega a rodar
+        if self.futuro is not None and self.futuro.cancel():
+            self.estado = CANCELADA
+
+
+class ExecutorTarefas:
+    def __init__(self, max_trabalhadores=None, max_tarefas=MAX_TAREFAS):
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_trabalhadores or min(MAX_TRABALHADORES, os.cpu_count() or 1),
+            thread_name_prefix="tarefa",
+        )
+        self.max_tarefas = max_tarefas
+        self._tarefas = OrderedDict()
+        self._grupos = {}
+        self._trava = threading.Lock()
+
+    def submeter(self, funcao, *args, chave, grupo=None, descricao="", **kwargs):
+        """Tarefa que executa `funcao(*args, progresso=..., **kwargs)` identificada por `chave`.
+
+        Se já existe uma tarefa com a chave (em andamento ou concluída) ela é
+        devolvida no lugar de uma nova. `grupo` identifica quem acompanha a
+        tarefa: a tarefa anterior do mesmo grupo é cancelada se mais ninguém a
+        acompanha.
+        """
+        with self._trava:
+            tarefa = self._tarefas.get(chave)
+            if tarefa is None or tarefa.estado in (CANCELADA, ERRO) or tarefa.cancelamento_pedido:
+                tarefa = Tarefa(chave, descricao)
+                self._tarefas[chave] = tarefa
+                tarefa.futuro = self._pool.submit(self._executar, tarefa, funcao, args, kwargs)
+            self._tarefas.move_to_end(chave)
+            if grupo is not None:
+                self._acompanhar(grupo, tarefa)
+            self._descartar_antigas()
+        return tarefa
+
+    def cancelar_grupo(self, grupo):
+        """O grupo deixa de acompanhar sua tarefa (cancelada se não houver outros interessados)."""
+        with self._trava:
+            self._acompanhar(grupo, None)
+
+    def tarefas(self):
+        with self._trava:
+            return list(self._tarefas.values())
+
+    def encerrar(self):
+        with self._trava:
+            for tarefa in self._tarefas.values():
+                if tarefa.ativa:
+                    tarefa.cancelar()
+        self._pool.shutdown(wait=True)
+
+    def _acompanhar(self, grupo, tarefa):
+        anterior = self._grupos.pop(grupo, None)
+        if anterior is not None and anterior is not tarefa:
+            anterior.interessados.discard(grupo)
+            if not anterior.interessados and anterior.ativa:
+                anterior.cancelar()
+        if tarefa is not None:
+            tarefa.interessados.add(grupo)
+            self._grupos[grupo] = tarefa
+
+    def _descartar_antigas(self):
+        # Só tarefas encerradas saem; as ativas ainda têm quem as acompanhe
+        excedente = len(self._tarefas) - self.max_tarefas
+        for chave in [chave for chave, tarefa in self._tarefas.items() if not tarefa.ativa][:max(excedente, 0)]:
+            del self._tarefas[chave]
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        if tarefa.cancelamento_pedido:
+            tarefa.estado = CANCELADA
+            return
+        tarefa.estado = EXECUTANDO
+        inicio = time.perf_counter()
+        try:
+            resultado = funcao(*args, progresso=tarefa.informar, **kwargs)
+        except TarefaCancelada:
+            tarefa.estado = CANCELADA
+        except Exception as erro:
+            tarefa.erro = erro
+            tarefa.estado = ERRO
+        else:
+            tarefa.resultado = resultado
+            tarefa.progresso = 1.0
+            tarefa.estado = CONCLUIDA
+        finally:
+            tarefa.duracao = time.perf_counter() - inicio
+
+
+_executor = None
+_trava_executor = threading.Lock()
+
+
+def executor_compartilhado():
+    """Instância única de `ExecutorTarefas` por processo, usada por todas as páginas."""
+    global _executor
+    with _trava_executor:
+        if _executor is None:
+            _executor = ExecutorTarefas()
+        return _executor
+
+
+def grupo_da_sessao(secao):
+    """Grupo de acompanhamento de uma seção da página na sessão atual do Streamlit."""
+    return (st.session_state.setdefault("id_sessao_tarefas", uuid.uuid4().hex), secao)
+
+
+def acompanhar(tarefa, versao_exibida):
+    """Barra de progresso de uma tarefa ativa, atualizada num fragmento.
+
+    Quando chega um parcial mais novo que `versao_exibida` ou a tarefa termina,
+    a página inteira é reexecutada para exibir o que mudou.
+    """
+    @st.fragment(run_every=INTERVALO_ATUALIZACAO)
+    def progresso():
+        if not tarefa.ativa or tarefa.versao != versao_exibida:
+            st.rerun()
+        texto = f"{tarefa.descricao}: {tarefa.progresso:.0%}" + (f" · {tarefa.mensagem}" if tarefa.mensagem else "")
+        st.progress(tarefa.progresso, text=texto)
+
+    progresso()
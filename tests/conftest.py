@@ -0,0 +1,62 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from busca import IndiceTexto  # noqa: E402
+from cubo import CuboContagens  # noqa: E402
+from dados import CAMINHO_CSV, Ocorrencias  # noqa: E402
+from espacial import IndiceEspacial  # noqa: E402
+from filtros import IndiceFiltros  # noqa: E402
+from repositorio import RepositorioOcorrencias  # noqa: E402
+from series import SeriesTemporais  # noqa: E402
+
+OBSERVACOES = ["suspeito fugiu de moto", "golpe pelo telefone", "", "arrombamento na janela"]
+
+
+def _registros(bruto, n, semente):
+    # Ocorrências novas com valores já conhecidos: ficam no segmento recente, sem compactar
+    rng = np.random.default_rng(semente)
+    registros = bruto.sample(n, random_state=semente).to_dict("records")
+    for registro in registros:
+        registro["observacoes"] = str(rng.choice(OBSERVACOES))
+        registro["data_ocorrencia"] = str(pd.Timestamp("2025-01-01") + pd.Timedelta(hours=int(rng.integers(0, 5000))))
+    return registros
+
+
+@pytest.fixture(scope="session", params=["base", "delta"])
+def ocorrencias(request, tmp_path_factory):
+    """Frame compartilhado sobre uma cópia do dataset; em "delta", com ocorrências novas na cauda."""
+    diretorio = tmp_path_factory.mktemp(request.param)
+    caminho_csv = shutil.copy(os.path.join(RAIZ, CAMINHO_CSV), diretorio)
+    repositorio = RepositorioOcorrencias(str(diretorio / "ocorrencias.db"))
+    ocorrencias = Ocorrencias(caminho_csv, repositorio)
+    if request.param == "delta":
+        bruto = pd.read_csv(caminho_csv)
+        # Os índices criados após o primeiro delta são estendidos pelo segundo
+        repositorio.inserir_lote(_registros(bruto, 40, semente=1))
+        ocorrencias.atualizar()
+        for tipo in (IndiceFiltros, CuboContagens, SeriesTemporais, IndiceEspacial, IndiceTexto):
+            ocorrencias.indice(tipo)
+        repositorio.inserir_lote(_registros(bruto, 25, semente=2))
+        ocorrencias.atualizar()
+        assert len(ocorrencias.recentes) > 0
+    return ocorrencias
+
+
+@pytest.fixture(scope="session")
+def periodo():
+    return pd.Timestamp("2024-06-01").date(), pd.Timestamp("2025-03-01").date()
+
+
+@pytest.fixture(scope="session")
+def no_periodo(periodo):
+    """Máscara pandas das linhas com data dentro de `periodo` (dias inteiros, inclusive)."""
+    inicio, fim = pd.Timestamp(periodo[0]), pd.Timestamp(periodo[1]) + pd.Timedelta(days=1)
+    return lambda df: ((df["data_ocorrencia"] >= inicio) & (df["data_ocorrencia"] < fim)).to_numpy()
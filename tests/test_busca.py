@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from busca import COLUNAS_BUSCA, IndiceTexto, termos
+
+
+def _varrer(df, predicado):
+    # Ids das linhas em que algum termo de alguma coluna de texto satisfaz o predicado
+    colunas = [coluna for coluna in COLUNAS_BUSCA if coluna in df.columns]
+    textos = zip(*(df[coluna].astype(object).where(df[coluna].notna(), "").astype(str) for coluna in colunas))
+    return np.flatnonzero([any(predicado(set(termos(texto))) for texto in linha) for linha in textos])
+
+
+@pytest.mark.parametrize("palavra", ["golpe", "telefonico", "moto", "fraude", "inexistente"])
+def test_consultar_palavra_igual_a_varredura(ocorrencias, palavra):
+    ids = ocorrencias.indice(IndiceTexto).consultar(palavra)
+
+    np.testing.assert_array_equal(ids, _varrer(ocorrencias.linhas(), lambda encontrados: palavra in encontrados))
+
+
+@pytest.mark.parametrize("prefixo", ["golp", "arromb", "tel"])
+def test_consultar_prefixo_igual_a_varredura(ocorrencias, prefixo):
+    ids = ocorrencias.indice(IndiceTexto).consultar(prefixo + "*")
+
+    esperados = _varrer(ocorrencias.linhas(), lambda encontrados: any(t.startswith(prefixo) for t in encontrados))
+    np.testing.assert_array_equal(ids, esperados)
+
+
+def test_consultar_varios_termos_intersecta(ocorrencias):
+    indice = ocorrencias.indice(IndiceTexto)
+
+    ids = indice.consultar("fraude online")
+
+    np.testing.assert_array_equal(ids, np.intersect1d(indice.consultar("fraude"), indice.consultar("online")))
+
+
+def test_consulta_sem_termos(ocorrencias):
+    assert ocorrencias.indice(IndiceTexto).consultar("  ,, ") is None
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import CuboContagens
+from dados import DIAS_SEMANA
+
+FILTROS = [None, {"tipo_crime": ["Furto", "Roubo"]}, {"bairro": ["Boa Viagem"], "hora_dia": (8, 17)}]
+
+
+def _recorte(df, filtros, no_periodo, com_datas):
+    mascara = np.ones(len(df), dtype=bool)
+    for coluna, valores in (filtros or {}).items():
+        if coluna == "hora_dia":
+            mascara &= df[coluna].between(*valores).to_numpy(dtype=bool)
+        else:
+            mascara &= df[coluna].isin(valores).to_numpy()
+    if com_datas:
+        mascara &= no_periodo(df)
+    return df[mascara]
+
+
+@pytest.mark.parametrize("por", ["bairro", "tipo_crime", "arma_utilizada"])
+@pytest.mark.parametrize("filtros", FILTROS)
+@pytest.mark.parametrize("com_datas", [False, True])
+def test_contar_igual_a_groupby(ocorrencias, no_periodo, periodo, por, filtros, com_datas):
+    df = ocorrencias.linhas()
+
+    obtido = ocorrencias.indice(CuboContagens).contar(por, filtros, periodo if com_datas else None)
+
+    esperado = _recorte(df, filtros, no_periodo, com_datas).groupby(por, observed=True).size()
+    esperado = esperado[esperado > 0]
+    esperado.index = esperado.index.astype(str)
+    pd.testing.assert_series_equal(
+        obtido.sort_index(), esperado.sort_index(), check_names=False, check_index_type=False, check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_contar_por_hora_e_dia_da_semana(ocorrencias, no_periodo, periodo, filtros):
+    cubo = ocorrencias.indice(CuboContagens)
+    recorte = _recorte(ocorrencias.linhas(), filtros, no_periodo, True)
+
+    por_hora = cubo.contar("hora_dia", filtros, periodo)
+    por_dia = cubo.contar("dia_semana", filtros, periodo)
+
+    esperado_hora = recorte["hora_dia"].value_counts().reindex(range(24), fill_value=0)
+    np.testing.assert_array_equal(por_hora.to_numpy(), esperado_hora.to_numpy())
+    esperado_dia = recorte["data_ocorrencia"].dt.dayofweek.value_counts().reindex(range(7), fill_value=0)
+    np.testing.assert_array_equal(por_dia.to_numpy(), esperado_dia.to_numpy())
+    assert list(por_dia.index) == DIAS_SEMANA
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_total_e_media_hora(ocorrencias, no_periodo, periodo, filtros):
+    cubo = ocorrencias.indice(CuboContagens)
+    recorte = _recorte(ocorrencias.linhas(), filtros, no_periodo, True)
+
+    assert cubo.total(filtros, periodo) == len(recorte)
+    media = cubo.media_hora("tipo_crime", filtros, periodo)
+    esperado = recorte.groupby("tipo_crime", observed=True)["hora_dia"].mean()
+    esperado.index = esperado.index.astype(str)
+    np.testing.assert_allclose(media.sort_index().to_numpy(), esperado.sort_index().to_numpy())
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from espacial import IndiceEspacial, dentro_poligono, distancia_metros
+
+PONTOS = [(-8.10, -34.90), (-8.05, -34.88), (-8.13, -34.92)]
+
+
+def _distancias(df, latitude, longitude):
+    return distancia_metros(
+        latitude, longitude,
+        df["latitude"].to_numpy(dtype=np.float64, na_value=np.nan),
+        df["longitude"].to_numpy(dtype=np.float64, na_value=np.nan),
+    )
+
+
+@pytest.mark.parametrize("latitude, longitude", PONTOS)
+@pytest.mark.parametrize("raio_m", [200, 1500, 5000])
+def test_no_raio_igual_a_forca_bruta(ocorrencias, latitude, longitude, raio_m):
+    distancias = _distancias(ocorrencias.linhas(), latitude, longitude)
+
+    ids, obtidas = ocorrencias.indice(IndiceEspacial).no_raio(latitude, longitude, raio_m)
+
+    esperados = np.flatnonzero(distancias <= raio_m)
+    np.testing.assert_array_equal(np.sort(ids), esperados)
+    np.testing.assert_allclose(obtidas[np.argsort(ids)], distancias[esperados])
+
+
+@pytest.mark.parametrize("latitude, longitude", PONTOS)
+@pytest.mark.parametrize("k", [1, 7, 50])
+def test_mais_proximas_igual_a_forca_bruta(ocorrencias, latitude, longitude, k):
+    distancias = _distancias(ocorrencias.linhas(), latitude, longitude)
+
+    ids, obtidas = ocorrencias.indice(IndiceEspacial).mais_proximas(latitude, longitude, k)
+
+    assert len(ids) == k
+    assert np.all(np.diff(obtidas) >= 0)
+    np.testing.assert_allclose(obtidas, np.sort(distancias[~np.isnan(distancias)])[:k])
+    np.testing.assert_allclose(distancias[ids], obtidas)
+
+
+def test_no_poligono_igual_a_forca_bruta(ocorrencias):
+    df = ocorrencias.linhas()
+    poligono = [(-8.14, -34.95), (-8.06, -34.93), (-8.04, -34.87), (-8.12, -34.88)]
+
+    ids = ocorrencias.indice(IndiceEspacial).no_poligono(poligono)
+
+    latitudes = df["latitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+    longitudes = df["longitude"].to_numpy(dtype=np.float64, na_value=np.nan)
+    np.testing.assert_array_equal(ids, np.flatnonzero(dentro_poligono(poligono, latitudes, longitudes)))
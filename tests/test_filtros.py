@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from filtros import IndiceFiltros
+
+CASOS = [
+    ({"bairro": ["Boa Viagem", "Pina"]}, None),
+    ({"tipo_crime": ["Furto", "Roubo"], "arma_utilizada": ["Faca"]}, None),
+    ({"bairro": ["Boa Viagem"]}, {"idade_suspeito": (20, 40)}),
+    ({}, {"hora_dia": (18, 23), "idade_suspeito": (30, 60)}),
+]
+
+
+@pytest.mark.parametrize("categoricas, intervalos", CASOS)
+@pytest.mark.parametrize("com_datas", [False, True])
+def test_consultar_igual_a_mascara_pandas(ocorrencias, no_periodo, periodo, categoricas, intervalos, com_datas):
+    df = ocorrencias.linhas()
+    datas = periodo if com_datas else None
+
+    ids = ocorrencias.indice(IndiceFiltros).consultar(categoricas, intervalos, datas)
+
+    mascara = np.ones(len(df), dtype=bool)
+    for coluna, valores in categoricas.items():
+        mascara &= df[coluna].isin(valores).to_numpy()
+    for coluna, (minimo, maximo) in (intervalos or {}).items():
+        mascara &= df[coluna].between(minimo, maximo).fillna(False).to_numpy(dtype=bool)
+    if com_datas:
+        mascara &= no_periodo(df)
+    if ids is None:
+        assert mascara.all()
+    else:
+        np.testing.assert_array_equal(ids, np.flatnonzero(mascara))
+
+
+def test_consultar_sem_filtros_nao_restringe(ocorrencias):
+    assert ocorrencias.indice(IndiceFiltros).consultar({}, None, None) is None
+
+
+def test_consultar_restrito_a_ids(ocorrencias):
+    df = ocorrencias.linhas()
+    ids = np.arange(0, len(df), 7)
+
+    obtidos = ocorrencias.indice(IndiceFiltros).consultar({"tipo_crime": ["Furto"]}, ids=ids)
+
+    np.testing.assert_array_equal(obtidos, ids[df["tipo_crime"].to_numpy()[ids] == "Furto"])
+
+
+def test_linhas_dos_ids_globais(ocorrencias):
+    ids = ocorrencias.indice(IndiceFiltros).consultar({"bairro": ["Pina"]})
+
+    recorte = ocorrencias.linhas(ids)
+
+    np.testing.assert_array_equal(recorte.index.to_numpy(), ids)
+    assert (recorte["bairro"] == "Pina").all()
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from floresta import FlorestaCompilada, compilar
+
+TOLERANCIA = 1e-6
+
+
+def _dados(n=2000, n_features=12, semente=0):
+    rng = np.random.default_rng(semente)
+    X = rng.normal(size=(n, n_features)).astype(np.float32)
+    # Metade das colunas binárias, como os dummies do pipeline
+    X[:, n_features // 2:] = X[:, n_features // 2:] > 0.5
+    ruido = rng.normal(scale=0.5, size=n)
+    classe = (X[:, 0] + 2 * X[:, 1] * X[:, 7] + ruido > 0).astype(int) + 2 * (X[:, 2] > 0.8)
+    return X, np.array(list("ABCD"))[classe]
+
+
+@pytest.mark.parametrize("modelo", [
+    RandomForestClassifier(n_estimators=30, random_state=0),
+    RandomForestClassifier(n_estimators=20, max_depth=5, min_samples_leaf=5, random_state=1),
+    ExtraTreesClassifier(n_estimators=20, random_state=2),
+], ids=["rf", "rf_raso", "extra_trees"])
+@pytest.mark.parametrize("n_linhas", [1, 168, 1000])
+def test_predict_proba_igual_ao_sklearn(modelo, n_linhas):
+    X, y = _dados()
+    modelo.fit(X[:1500], y[:1500])
+    compilada = FlorestaCompilada(modelo)
+    X_teste = X[1500:1500 + n_linhas] if n_linhas <= 500 else np.vstack([X[1500:], X[:n_linhas - 500]])
+
+    obtido = compilada.predict_proba(X_teste)
+
+    esperado = modelo.predict_proba(X_teste)
+    assert obtido.shape == esperado.shape
+    np.testing.assert_allclose(obtido, esperado, atol=TOLERANCIA, rtol=0)
+    np.testing.assert_array_equal(compilada.predict(X_teste), modelo.classes_[esperado.argmax(axis=1)])
+
+
+def test_limiares_nos_valores_exatos():
+    # Valores iguais ao limiar seguem para a esquerda (x <= limiar), como no scikit-learn
+    X, y = _dados(semente=3)
+    modelo = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    limiares = np.concatenate([e.tree_.threshold[e.tree_.feature == 0] for e in modelo.estimators_])[:200]
+    X_limite = np.tile(X[:1], (len(limiares), 1))
+    X_limite[:, 0] = limiares.astype(np.float32)
+
+    np.testing.assert_allclose(
+        FlorestaCompilada(modelo).predict_proba(X_limite), modelo.predict_proba(X_limite), atol=TOLERANCIA, rtol=0
+    )
+
+
+def test_compilar_ignora_modelos_que_nao_sao_florestas():
+    X, y = _dados(n=200)
+    assert compilar(LogisticRegression(max_iter=200).fit(X, y)) is None
@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from repositorio import RepositorioOcorrencias
+
+
+def _registro(id_ocorrencia, **campos):
+    return {"id_ocorrencia": id_ocorrencia, "bairro": "Pina", "tipo_crime": "Furto", **campos}
+
+
+@pytest.fixture
+def repositorio(tmp_path):
+    # Janela longa: os pedidos concorrentes caem no mesmo group commit
+    return RepositorioOcorrencias(str(tmp_path / "ocorrencias.db"), janela_commit=0.2)
+
+
+def _inserir_juntos(repositorio, lotes):
+    erros = [None] * len(lotes)
+
+    def inserir(i, lote):
+        try:
+            repositorio.inserir_lote(lote, timeout=5)
+        except Exception as erro:
+            erros[i] = erro
+
+    threads = [threading.Thread(target=inserir, args=(i, lote)) for i, lote in enumerate(lotes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return erros
+
+
+def test_valor_invalido_falha_so_o_proprio_pedido(repositorio):
+    erros = _inserir_juntos(repositorio, [
+        [_registro("OCR1")],
+        [_registro("OCR2", observacoes={"não": "serializável"})],
+        [_registro("OCR3"), _registro("OCR4")],
+    ])
+
+    assert erros[0] is None and erros[2] is None
+    assert erros[1] is not None
+    gravados = repositorio.ler_desde(0)["id_ocorrencia"].tolist()
+    assert sorted(gravados) == ["OCR1", "OCR3", "OCR4"]
+
+
+def test_registro_malformado_nao_derruba_o_escritor(repositorio):
+    erros = _inserir_juntos(repositorio, [[_registro("OCR1")], ["não é um dicionário"]])
+
+    assert erros[0] is None
+    assert isinstance(erros[1], AttributeError)
+    # A thread escritora continua atendendo pedidos
+    repositorio.inserir(_registro("OCR2"), timeout=5)
+    assert repositorio.ultimo_seq() == 2
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from preprocessamento import ALVO, PipelineOcorrencias
+from retreino import _rotulos, amostra_estratificada, modo_retreino, retreinar
+
+N_NOVAS = 200
+ARVORES = 10
+
+
+@pytest.fixture
+def df(ocorrencias):
+    return ocorrencias.linhas()
+
+
+@pytest.fixture
+def pipeline(df):
+    modelo = RandomForestClassifier(n_estimators=ARVORES, max_depth=6, random_state=0)
+    historico = df.iloc[:len(df) - N_NOVAS]
+    return PipelineOcorrencias(modelo).ajustar(historico, _rotulos(historico))
+
+
+def _modo(pipeline, novas, arvores_por_ciclo=5, max_arvores=100):
+    return modo_retreino(pipeline, novas, _rotulos(novas), arvores_por_ciclo, max_arvores)
+
+
+def test_amostra_estratificada_tem_todas_as_classes():
+    y = np.array(["A"] * 900 + ["B"] * 95 + ["C"] * 5)
+
+    posicoes = amostra_estratificada(y, 100, semente=0)
+
+    assert set(y[posicoes]) == {"A", "B", "C"}
+    assert 95 <= len(posicoes) <= 105
+    assert np.all(np.diff(posicoes) > 0)
+
+
+def test_amostra_estratificada_de_historico_vazio():
+    posicoes = amostra_estratificada(np.array([], dtype=str), 100)
+
+    assert len(posicoes) == 0
+    assert posicoes.dtype.kind == "i"
+
+
+def test_modo_incremental(pipeline, df):
+    assert _modo(pipeline, df.iloc[len(df) - N_NOVAS:]) == ("incremental", None)
+
+
+def test_modo_completo_com_classe_nova(pipeline, df):
+    novas = df.iloc[len(df) - N_NOVAS:].astype({ALVO: object})
+    novas.loc[novas.index[0], ALVO] = "Crime inédito"
+
+    assert _modo(pipeline, novas) == ("completo", "classes novas")
+
+
+def test_modo_completo_com_categoria_nova(pipeline, df):
+    novas = df.iloc[len(df) - N_NOVAS:].astype({"bairro": object})
+    novas.loc[novas.index[0], "bairro"] = "Bairro inédito"
+
+    assert _modo(pipeline, novas) == ("completo", "categorias novas em bairro")
+
+
+def test_modo_completo_sem_warm_start(df):
+    historico = df.iloc[:len(df) - N_NOVAS]
+    pipeline = PipelineOcorrencias(DecisionTreeClassifier(max_depth=4)).ajustar(historico, _rotulos(historico))
+
+    assert _modo(pipeline, df.iloc[len(df) - N_NOVAS:]) == ("completo", "modelo sem warm_start")
+
+
+def test_modo_completo_acima_do_maximo_de_arvores(pipeline, df):
+    modo, motivo = _modo(pipeline, df.iloc[len(df) - N_NOVAS:], arvores_por_ciclo=5, max_arvores=ARVORES + 4)
+
+    assert modo == "completo"
+    assert str(ARVORES + 4) in motivo
+
+
+def test_retreino_incremental_e_depois_completo(pipeline, df):
+    pipeline, modo, _ = retreinar(pipeline, df, N_NOVAS, arvores_por_ciclo=5, max_arvores=ARVORES + 5)
+
+    assert modo == "incremental"
+    assert len(pipeline.modelo.estimators_) == ARVORES + 5
+    assert pipeline.arvores_incrementais == 5
+    assert pipeline.floresta is not None
+    assert pipeline.predict_proba(df.iloc[:3]).shape == (3, len(pipeline.classes_))
+
+    # O próximo ciclo passaria do máximo: reajuste do zero com a floresta do ajuste completo
+    novo, modo, _ = retreinar(pipeline, df, N_NOVAS, arvores_por_ciclo=5, max_arvores=ARVORES + 5)
+
+    assert modo == "completo"
+    assert len(novo.modelo.estimators_) == ARVORES
+    assert novo.arvores_incrementais == 0
+
+
+def test_retreino_incremental_sem_historico(pipeline, df):
+    novas = df.iloc[len(df) - N_NOVAS:]
+
+    pipeline, modo, _ = retreinar(pipeline, novas, N_NOVAS, arvores_por_ciclo=5)
+
+    assert modo == "incremental"
+    assert len(pipeline.modelo.estimators_) == ARVORES + 5
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from series import RESOLUCOES, SeriesTemporais
+
+FILTROS = [None, {"tipo_crime": ["Furto"]}, {"bairro": ["Boa Viagem", "Pina"], "tipo_crime": ["Roubo"]}]
+
+
+def _mascara(df, filtros):
+    mascara = df["data_ocorrencia"].notna().to_numpy()
+    for coluna, valores in (filtros or {}).items():
+        mascara = mascara & df[coluna].isin(valores).to_numpy()
+    return mascara
+
+
+@pytest.mark.parametrize("resolucao", list(RESOLUCOES))
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_total_da_serie_igual_ao_recorte(ocorrencias, resolucao, filtros):
+    df = ocorrencias.linhas()
+
+    serie, obtida, periodos = ocorrencias.indice(SeriesTemporais).contar(filtros, None, 10**6, resolucao)
+
+    assert obtida == resolucao
+    assert len(serie) == periodos
+    assert serie.sum() == _mascara(df, filtros).sum()
+
+
+@pytest.mark.parametrize("filtros", FILTROS)
+def test_serie_diaria_no_periodo(ocorrencias, no_periodo, periodo, filtros):
+    df = ocorrencias.linhas()
+
+    serie, _, _ = ocorrencias.indice(SeriesTemporais).contar(filtros, periodo, 10**6, "dia")
+
+    recorte = df[_mascara(df, filtros) & no_periodo(df)]
+    esperado = recorte["data_ocorrencia"].dt.floor("D").value_counts()
+    obtido = serie[serie > 0]
+    np.testing.assert_array_equal(obtido.index.to_numpy(dtype="datetime64[ns]"), np.sort(esperado.index.to_numpy()))
+    np.testing.assert_array_equal(obtido.to_numpy(), esperado.sort_index().to_numpy())
+
+
+def test_serie_reduzida_preserva_pontas(ocorrencias):
+    serie, _, periodos = ocorrencias.indice(SeriesTemporais).contar(None, None, 50, "dia")
+
+    completa, _, _ = ocorrencias.indice(SeriesTemporais).contar(None, None, 10**6, "dia")
+    assert periodos > 50 and len(serie) <= 50
+    assert serie.index[0] == completa.index[0] and serie.index[-1] == completa.index[-1]
+    assert pd.Index(completa.index).is_monotonic_increasing
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from filtros import IndiceFiltros
+from previsao import N_SLOTS
+from preprocessamento import PipelineOcorrencias
+from tabela_previsoes import gerar_tabela, ler_tabela
+
+
+@pytest.fixture(scope="module")
+def pipeline(ocorrencias):
+    modelo = RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0)
+    return PipelineOcorrencias(modelo).ajustar(ocorrencias.linhas())
+
+
+def test_tabela_igual_a_previsao_ao_vivo(ocorrencias, pipeline, tmp_path):
+    df = ocorrencias.linhas()
+    meta = gerar_tabela(pipeline, "a" * 64, df, ocorrencias.indice(IndiceFiltros), str(tmp_path))
+    tabela = ler_tabela(str(tmp_path))
+
+    assert tabela is not None
+    assert len(meta["perfis"]) > 1
+    assert tabela.probabilidades.shape == (len(meta["perfis"]), N_SLOTS, len(pipeline.classes_))
+    todos = next(p for p in meta["perfis"] if p["bairro"] is None and p["tipo_crime"] is None)
+    np.testing.assert_allclose(tabela.consultar(), tabela.probabilidades[meta["perfis"].index(todos)])
+    assert tabela.consultar("bairro que não existe") is None
+
+
+@pytest.mark.parametrize("vazio", ["sem_linhas", "sem_idades"])
+def test_sem_perfis_grava_tabela_vazia(ocorrencias, pipeline, tmp_path, vazio):
+    df = ocorrencias.linhas()
+    if vazio == "sem_linhas":
+        df = df.iloc[:0]
+    else:
+        df = df.assign(idade_suspeito=np.nan)
+
+    meta = gerar_tabela(pipeline, "b" * 64, df, ocorrencias.indice(IndiceFiltros), str(tmp_path))
+    tabela = ler_tabela(str(tmp_path))
+
+    assert meta["perfis"] == []
+    assert tabela is not None
+    assert tabela.probabilidades.shape == (0, N_SLOTS, len(pipeline.classes_))
+    assert tabela.consultar() is None
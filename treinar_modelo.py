@@ -1,68 +1,303 @@
-import pandas as pd
-from sklearn.model_selection import train_test_split
+"""Treino do modelo de previsão de tipo de crime.
+
+Uso:
+    python treinar_modelo.py --dataset dataset_ocorrencias_delegacia_5.csv \\
+        --n-estimators 100 200 --max-depth 0 20 --processos 2 --orcamento 3600
+
+Cada combinação de hiperparâmetros é um candidato treinado em um pool de
+processos (todos os núcleos são divididos entre os candidatos em paralelo).
+Para cada candidato são medidos tempo de treino, pico de memória, tamanho do
+modelo em disco e latência de inferência por linha (do pipeline inteiro e só do
+modelo, sobre a matriz já codificada), junto das métricas de classificação. O
+melhor candidato (F1 macro) é publicado em `--saida` e, em seguida, a tabela de
+previsões da página é regenerada para ele (`tabela_previsoes.py`;
+`--sem-tabela` pula essa etapa).
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report
-import joblib
-
-# 1️⃣ Carregar o dataset
-df = pd.read_csv("dataset_ocorrencias_delegacia_5.csv")
-
-# 2️⃣ Tratar datas e criar colunas derivadas
-df['data_ocorrencia'] = pd.to_datetime(df['data_ocorrencia'])
-
-# Criar dia da semana em português
-df['dia_semana'] = df['data_ocorrencia'].dt.day_name().replace({
-    'Monday': 'Segunda',
-    'Tuesday': 'Terça',
-    'Wednesday': 'Quarta',
-    'Thursday': 'Quinta',
-    'Friday': 'Sexta',
-    'Saturday': 'Sábado',
-    'Sunday': 'Domingo'
-})
-
-# Criar hora do dia
-df['hora_dia'] = df['data_ocorrencia'].dt.hour
-
-# 3️⃣ Selecionar features e target
-X = df[[
-    "bairro",
-    "arma_utilizada",
-    "quantidade_vitimas",
-    "quantidade_suspeitos",
-    "sexo_suspeito",
-    "idade_suspeito",
-    "dia_semana",
-    "hora_dia",
-    "latitude",
-    "longitude"
-]]
-
-y = df["tipo_crime"]
-
-# 4️⃣ Tratar valores nulos
-X = X.fillna("Desconhecido")
-y = y.fillna("Desconhecido")
-
-# 5️⃣ One-hot encoding para variáveis categóricas
-X = pd.get_dummies(X, drop_first=True)
-
-# 6️⃣ Dividir em treino e teste
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.3, random_state=42, stratify=y
-)
-
-# 7️⃣ Treinar modelo Random Forest
-modelo = RandomForestClassifier(n_estimators=200, random_state=42)
-modelo.fit(X_train, y_train)
-
-# 8️⃣ Avaliar modelo
-y_pred = modelo.predict(X_test)
-print("✅ Relatório de classificação do modelo:")
-print(classification_report(y_test, y_pred))
-
-# 9️⃣ Salvar modelo e colunas
-joblib.dump(modelo, "modelo.pkl")
-joblib.dump(X.columns, "colunas.pkl")
-
-print("✅ Modelo e colunas salvos com sucesso!")
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import train_test_split
+
+from dados import CAMINHO_CSV, carregar_ocorrencias
+from preprocessamento import PipelineOcorrencias, ALVO, FEATURES_CATEGORICAS, FEATURES_NUMERICAS
+from registro_modelos import bytes_arrays
+from tabela_previsoes import CAMINHO_TABELA, gerar_para_modelo
+
+AMOSTRAS_LATENCIA = 200
+AMOSTRAS_LOTE = 30
+# Tamanho do lote que a página de predição pontua (um por slot semanal)
+TAMANHO_LOTE = 168
+
+# Dados do processo trabalhador, carregados uma vez pelo inicializador do pool
+_DADOS = {}
+
+
+def carregar_divisao(caminho_dataset, teste=0.3, semente=42):
+    # 1️⃣ Carregar o dataset (dia_semana e hora_dia já vêm da camada de dados)
+    df = carregar_ocorrencias(caminho_dataset)
+
+    # 2️⃣ Selecionar features e target
+    X = df[FEATURES_NUMERICAS + FEATURES_CATEGORICAS]
+    y = df[ALVO].astype(object).fillna("Desconhecido")
+
+    # 3️⃣ Dividir em treino e teste
+    return train_test_split(X, y, test_size=teste, random_state=semente, stratify=y)
+
+
+def _inicializar_trabalhador(caminho_dataset):
+    _DADOS["divisao"] = carregar_divisao(caminho_dataset)
+
+
+def _pico_memoria():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+def latencia_por_linha(pipeline, X, amostras=AMOSTRAS_LATENCIA, tamanho_lote=TAMANHO_LOTE):
+    """Latências p50/p99 (ms) de predições de uma linha e de lotes de `tamanho_lote` linhas."""
+    amostras = min(amostras, len(X))
+    tempos = []
+    for i in range(amostras):
+        linha = X.iloc[i:i + 1]
+        inicio = time.perf_counter()
+        pipeline.predict_proba(linha)
+        tempos.append(time.perf_counter() - inicio)
+
+    tamanho_lote = min(tamanho_lote, len(X))
+    tempos_lote = []
+    for i in range(AMOSTRAS_LOTE):
+        deslocamento = (i * tamanho_lote) % max(len(X) - tamanho_lote, 1)
+        lote = X.iloc[deslocamento:deslocamento + tamanho_lote]
+        inicio = time.perf_counter()
+        pipeline.predict_proba(lote)
+        tempos_lote.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    pipeline.predict_proba(X)
+    total = time.perf_counter() - inicio
+    return {
+        "latencia_linha_p50_ms": float(np.percentile(tempos, 50) * 1e3),
+        "latencia_linha_p99_ms": float(np.percentile(tempos, 99) * 1e3),
+        "latencia_lote_p50_ms": float(np.percentile(tempos_lote, 50) * 1e3),
+        "latencia_lote_p99_ms": float(np.percentile(tempos_lote, 99) * 1e3),
+        "latencia_lote_por_linha_ms": total / len(X) * 1e3,
+    }
+
+
+def latencia_modelo(pipeline, X, amostras=AMOSTRAS_LATENCIA, tamanho_lote=TAMANHO_LOTE):
+    """Latências p50/p99 (ms) só do modelo, sobre a matriz já codificada.
+
+    Mesmas linhas e lotes de `latencia_por_linha`, mas sem o `transformar` do
+    pipeline (como no `benchmark_floresta.py`): a codificação tem custo fixo
+    igual para todos os candidatos e esconde a diferença entre eles. Cada lote
+    vai para o estimador que o pipeline usaria (a floresta compilada nos lotes
+    pequenos).
+    """
+    matriz = pipeline.transformar(X)
+    amostras = min(amostras, len(matriz))
+    tempos = []
+    for i in range(amostras):
+        linha = matriz[i:i + 1]
+        inicio = time.perf_counter()
+        pipeline._estimador(linha).predict_proba(linha)
+        tempos.append(time.perf_counter() - inicio)
+
+    tamanho_lote = min(tamanho_lote, len(matriz))
+    tempos_lote = []
+    for i in range(AMOSTRAS_LOTE):
+        deslocamento = (i * tamanho_lote) % max(len(matriz) - tamanho_lote, 1)
+        lote = matriz[deslocamento:deslocamento + tamanho_lote]
+        inicio = time.perf_counter()
+        pipeline._estimador(lote).predict_proba(lote)
+        tempos_lote.append(time.perf_counter() - inicio)
+    return {
+        "latencia_modelo_linha_p50_ms": float(np.percentile(tempos, 50) * 1e3),
+        "latencia_modelo_linha_p99_ms": float(np.percentile(tempos, 99) * 1e3),
+        "latencia_modelo_lote_p50_ms": float(np.percentile(tempos_lote, 50) * 1e3),
+        "latencia_modelo_lote_p99_ms": float(np.percentile(tempos_lote, 99) * 1e3),
+    }
+
+
+def medir_pipeline(pipeline, diretorio_saida):
+    """Treina, avalia e mede custo de um pipeline sobre a divisão do trabalhador.
+
+    Devolve as métricas e o caminho do pipeline salvo (arquivo temporário em
+    `diretorio_saida`, que o chamador publica ou apaga).
+    """
+    X_train, X_test, y_train, y_test = _DADOS["divisao"]
+
+    # 4️⃣ Ajustar o pipeline (codificador categórico + modelo)
+    inicio = time.perf_counter()
+    pipeline.ajustar(X_train, y_train)
+    tempo_treino = time.perf_counter() - inicio
+
+    # 5️⃣ Avaliar modelo
+    y_pred = pipeline.predict(X_test)
+
+    # Inferência é medida com um só núcleo, como na página
+    if "n_jobs" in pipeline.modelo.get_params():
+        pipeline.modelo.set_params(n_jobs=1)
+    latencias = {**latencia_por_linha(pipeline, X_test), **latencia_modelo(pipeline, X_test)}
+
+    descritor, caminho_modelo = tempfile.mkstemp(suffix=".pkl", dir=diretorio_saida)
+    os.close(descritor)
+    pipeline.salvar(caminho_modelo)
+
+    # Memória do modelo carregado (como a página o carrega): soma dos arrays
+    # (nós e valores das árvores, floresta compilada, coeficientes), não a
+    # diferença de RSS, que oscila com o alocador
+    memoria_modelo = bytes_arrays(PipelineOcorrencias.carregar(caminho_modelo))
+
+    return {
+        "acuracia": accuracy_score(y_test, y_pred),
+        "f1_macro": f1_score(y_test, y_pred, average="macro"),
+        "tempo_treino_s": tempo_treino,
+        "pico_memoria_mb": _pico_memoria() / 1e6,
+        "tamanho_modelo_mb": os.path.getsize(caminho_modelo) / 1e6,
+        "memoria_modelo_mb": memoria_modelo / 1e6,
+        **latencias,
+        "caminho_modelo": caminho_modelo,
+        "relatorio": classification_report(y_test, y_pred, zero_division=0),
+    }
+
+
+def avaliar_candidato(parametros, n_jobs, diretorio_saida):
+    """Treina e mede um candidato; roda dentro do processo trabalhador."""
+    modelo = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **parametros)
+    return {"parametros": parametros, **medir_pipeline(PipelineOcorrencias(modelo), diretorio_saida)}
+
+
+def gerar_candidatos(args):
+    grade = itertools.product(args.n_estimators, args.max_depth, args.min_samples_leaf)
+    return [
+        {
+            "n_estimators": n_estimators,
+            # 0 na linha de comando significa profundidade ilimitada
+            "max_depth": max_depth or None,
+            "min_samples_leaf": min_samples_leaf,
+        }
+        for n_estimators, max_depth, min_samples_leaf in grade
+    ]
+
+
+def buscar(caminho_dataset, candidatos, processos, orcamento, diretorio_saida, avaliar=avaliar_candidato):
+    """Treina os candidatos em paralelo respeitando o orçamento de tempo.
+
+    Cada candidato é medido por `avaliar(candidato, n_jobs, diretorio_saida)`.
+    Candidatos que ainda não começaram quando o orçamento acaba são cancelados;
+    os que já estão treinando terminam normalmente.
+    """
+    processos = max(1, min(processos, len(candidatos)))
+    n_jobs = max(1, (os.cpu_count() or 1) // processos)
+    limite = time.monotonic() + orcamento
+
+    resultados = []
+    # max_tasks_per_child=1: cada candidato roda em um processo novo, então o
+    # pico de memória (ru_maxrss) medido é só dele
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        initializer=_inicializar_trabalhador,
+        initargs=(caminho_dataset,),
+        max_tasks_per_child=1,
+    ) as executor:
+        pendentes = {
+            executor.submit(avaliar, parametros, n_jobs, diretorio_saida): parametros
+            for parametros in candidatos
+        }
+        while pendentes:
+            restante = limite - time.monotonic() if orcamento != float("inf") else None
+            if restante is not None and restante <= 0:
+                cancelados = [f for f in pendentes if f.cancel()]
+                for futuro in cancelados:
+                    print(f"⏱️ Orçamento esgotado, candidato cancelado: {pendentes.pop(futuro)}")
+                restante = None
+            concluidos, _ = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                parametros = pendentes.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                except Exception as erro:
+                    print(f"❌ Candidato {parametros} falhou: {erro}")
+                    continue
+                resultados.append(resultado)
+                print(
+                    f"✔️ {parametros}: F1 {resultado['f1_macro']:.3f} | "
+                    f"treino {resultado['tempo_treino_s']:.1f}s | "
+                    f"{resultado['tamanho_modelo_mb']:.1f} MB | "
+                    f"p50 {resultado['latencia_linha_p50_ms']:.2f} ms/linha "
+                    f"(só o modelo {resultado['latencia_modelo_linha_p50_ms']:.3f} ms)"
+                )
+    return resultados
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Treina e seleciona o modelo de previsão de crimes.")
+    parser.add_argument("--dataset", default=CAMINHO_CSV, help="CSV de ocorrências")
+    parser.add_argument("--saida", default="modelo.pkl", help="Arquivo do pipeline publicado")
+    parser.add_argument("--relatorio", default="relatorio_treino.json", help="Métricas de todos os candidatos")
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[200])
+    parser.add_argument("--max-depth", type=int, nargs="+", default=[0], help="0 = sem limite")
+    parser.add_argument("--min-samples-leaf", type=int, nargs="+", default=[1])
+    parser.add_argument("--processos", type=int, default=1, help="Candidatos treinados em paralelo")
+    parser.add_argument("--orcamento", type=float, default=float("inf"), help="Orçamento total em segundos")
+    parser.add_argument("--tabela", default=CAMINHO_TABELA, help="Diretório da tabela de previsões")
+    parser.add_argument("--sem-tabela", action="store_true", help="Não regenerar a tabela de previsões")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    candidatos = gerar_candidatos(args)
+    diretorio_saida = os.path.dirname(os.path.abspath(args.saida))
+
+    inicio = time.perf_counter()
+    resultados = buscar(args.dataset, candidatos, args.processos, args.orcamento, diretorio_saida)
+    if not resultados:
+        print("❌ Nenhum candidato terminou dentro do orçamento.")
+        return 1
+
+    # Melhor F1; em empate, o de menor latência
+    melhor = max(resultados, key=lambda r: (r["f1_macro"], -r["latencia_linha_p50_ms"]))
+    print("✅ Relatório de classificação do melhor modelo:", melhor["parametros"])
+    print(melhor["relatorio"])
+
+    # 6️⃣ Publicar o melhor pipeline e descartar os demais
+    os.replace(melhor["caminho_modelo"], args.saida)
+    for resultado in resultados:
+        if resultado is not melhor and os.path.exists(resultado["caminho_modelo"]):
+            os.remove(resultado["caminho_modelo"])
+
+    relatorio = {
+        "dataset": args.dataset,
+        "tempo_total_s": time.perf_counter() - inicio,
+        "melhor": melhor["parametros"],
+        "candidatos": [
+            {k: v for k, v in r.items() if k not in ("caminho_modelo", "relatorio")}
+            for r in resultados
+        ],
+    }
+    with open(args.relatorio, "w", encoding="utf-8") as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Pipeline salvo em {args.saida} e métricas em {args.relatorio}")
+
+    # 7️⃣ Materializar as previsões da página para o modelo publicado
+    if not args.sem_tabela:
+        meta = gerar_para_modelo(args.saida, args.dataset, args.tabela)
+        print(f"✅ Tabela de previsões com {len(meta['perfis'])} perfis em {args.tabela}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())